@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# Stage timings and peak memory of the gcv2hocr2 hot path on synthetic
+# pages, from sparse pages to 50k-word pages with many blocks:
+#
+#   json_load     json.load of the saved response file
+#   build         fromResponse and building the page tree (includes the
+#                 maximize_bbox passes, which are also timed on their own)
+#   maximize_bbox re-running the line, paragraph and carea passes on the tree
+#   render        GCVAnnotation.render of the page to one string
+#   write         fromResponse and streaming the document to a file on disk,
+#                 as gvision does
+#
+# Results are printed as JSON (and saved with --output) so that commits can
+# be compared:
+#
+#   python benchmarks/bench_convert.py --output /tmp/after.json
+#   git show HEAD~:gcv2hocr2.py > /tmp/old_gcv2hocr2.py
+#   python benchmarks/bench_convert.py --module /tmp/old_gcv2hocr2.py --output /tmp/before.json
+#   python benchmarks/bench_convert.py --compare /tmp/before.json
+
+import argparse
+import gc
+import importlib.util
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+from synthetic import make_response
+
+# Layouts passed to synthetic.make_response
+SCENARIOS = {
+    'sparse': dict(words=40, words_per_line=4, lines_per_par=2, pars_per_block=1),
+    'letter': dict(words=400),
+    'dense': dict(words=5000, words_per_line=12, lines_per_par=8, pars_per_block=3),
+    'no-breaks': dict(words=5000, missing_breaks=True),
+    'huge': dict(words=50000, words_per_line=10, lines_per_par=4, pars_per_block=2),
+}
+
+STAGES = ('json_load', 'build', 'maximize_bbox', 'render', 'write')
+
+
+def load_module(path):
+    if not path:
+        import gcv2hocr2
+        return gcv2hocr2
+    spec = importlib.util.spec_from_file_location('gcv2hocr2_under_test', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def maximized_elements(element):
+    """The elements _build_page maximizes, children before parents."""
+    for child in element.content if isinstance(element.content, list) else ():
+        if hasattr(child, 'maximize_bbox'):
+            yield from maximized_elements(child)
+    if element.ocr_class in ('ocr_line', 'ocr_par', 'ocr_carea'):
+        yield element
+
+
+class Scenario:
+    """Runs the stages on one synthetic response saved to a temporary file."""
+
+    def __init__(self, gcv2hocr2, layout, engine, workdir, line_mode='breaks'):
+        self.gcv2hocr2 = gcv2hocr2
+        self.engine = engine
+        self.line_mode = line_mode
+        self.json_path = os.path.join(workdir, 'response.json')
+        self.hocr_path = os.path.join(workdir, 'page.hocr')
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'responses': [make_response(**layout)]}, f)
+        self.response = self.json_load()
+        self.page = self.build()
+
+    def convert(self, response):
+        kwargs = dict(image_dpi_x=300, image_dpi_y=300)
+        if self.engine != 'python':
+            kwargs['engine'] = self.engine
+        if self.line_mode != 'breaks':
+            # Words within a synthetic line are at most 4 px apart, lines 45 px
+            kwargs.update(line_mode=self.line_mode, baseline_tolerance=10)
+        return self.gcv2hocr2.fromResponse(response, 'bench', **kwargs)
+
+    def json_load(self):
+        with open(self.json_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def build(self):
+        result = self.convert(self.response)
+        # Documents build their pages lazily
+        return next(iter(result)) if hasattr(result, 'page_count') else result
+
+    def maximize_bbox(self):
+        for element in maximized_elements(self.page):
+            element.maximize_bbox()
+
+    def render(self):
+        return self.page.render()
+
+    def write(self):
+        result = self.convert(self.response)
+        with open(self.hocr_path, 'w', encoding='utf-8') as f:
+            if hasattr(result, 'write'):
+                result.write(f)
+            else:
+                f.write(result.render())
+
+    def timed(self, stage, repeat):
+        function = getattr(self, stage)
+        times = []
+        for _ in range(repeat):
+            gc.collect()
+            started = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - started)
+        return times
+
+    def peak(self, stage):
+        """Peak memory allocated while the stage runs, in bytes."""
+        function = getattr(self, stage)
+        gc.collect()
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        result = function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        return peak - before
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    gcv2hocr2 = load_module(args.module)
+    logging.getLogger().setLevel(logging.ERROR)
+    report = {
+        'module': os.path.abspath(args.module or gcv2hocr2.__file__),
+        'revision': None if args.module else git_revision(),
+        'python': platform.python_version(),
+        'engine': args.engine,
+        'line_mode': args.line_mode,
+        'repeat': args.repeat,
+        'scenarios': {},
+    }
+    for name in args.scenarios:
+        layout = SCENARIOS[name]
+        with tempfile.TemporaryDirectory(prefix='bench-convert-') as workdir:
+            scenario = Scenario(gcv2hocr2, layout, args.engine, workdir, args.line_mode)
+            result = {'words': layout['words'], 'json_bytes': os.path.getsize(scenario.json_path), 'stages': {}}
+            for stage in STAGES:
+                times = scenario.timed(stage, args.repeat)
+                result['stages'][stage] = {
+                    'min_ms': round(min(times) * 1000, 3),
+                    'median_ms': round(statistics.median(times) * 1000, 3),
+                    'peak_bytes': scenario.peak(stage),
+                }
+            result['hocr_bytes'] = os.path.getsize(scenario.hocr_path)
+        report['scenarios'][name] = result
+        print(f"{name:>10}: " + ", ".join(f"{stage} {values['min_ms']:.1f} ms"
+                                           for stage, values in result['stages'].items()), file=sys.stderr)
+    return report
+
+
+def compare(baseline, report):
+    """Prints the change of every stage's minimum time and peak memory against a baseline report."""
+    for name, result in report['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if not before:
+            continue
+        for stage, values in result['stages'].items():
+            old = before['stages'].get(stage)
+            if not old or not old['min_ms']:
+                continue
+            time_ratio = values['min_ms'] / old['min_ms']
+            memory_ratio = values['peak_bytes'] / old['peak_bytes'] if old['peak_bytes'] else float('nan')
+            print(f"{name:>10} {stage:>14}: {old['min_ms']:9.2f} -> {values['min_ms']:9.2f} ms "
+                  f"(x{time_ratio:.2f}), peak x{memory_ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the stages of the gcv2hocr2 conversion on synthetic pages.')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help='Page layouts to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions per stage; the minimum is compared')
+    parser.add_argument('--engine', default='python', help='gcv2hocr2 geometry engine')
+    parser.add_argument('--line-mode', default='breaks', help='gcv2hocr2 line mode (breaks or geometry)')
+    parser.add_argument('--module', help='Path of an alternative gcv2hocr2.py to measure')
+    parser.add_argument('--output', help='Also save the JSON report to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare with a report saved with --output')
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# Peak RSS of converting a saved multi-page GCV response file with the
+# gcv2hocr2 command line, against the size of the file:
+#
+#   load    json.load of the whole file, then fromResponse (the old path)
+#   stream  fromStream, reading one page at a time with ijson (whatever
+#           the file size; the command line streams files of at least
+#           gcv2hocr2.STREAM_THRESHOLD bytes)
+#
+#   python benchmarks/bench_ingest.py --pages 10 40 160 --words 3000
+#
+# Each conversion runs in a fresh process, whose peak RSS is read from
+# wait4(); the baseline is the RSS of a process that only imports gcv2hocr2.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+from synthetic import make_response
+
+
+def write_response(path, pages, words):
+    # Written one response at a time, so that the benchmark itself never holds the whole file
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"responses": [')
+        for i in range(pages):
+            if i:
+                f.write(', ')
+            json.dump(make_response(words=words, seed=i), f)
+        f.write(']}')
+
+
+def child(mode, path):
+    import gcv2hocr2
+    if mode == 'import':
+        return
+    with open(path, 'rb') as f, open(os.devnull, 'w', encoding='utf-8') as sink:
+        if mode == 'load':
+            document = gcv2hocr2.fromResponse(json.load(f), 'bench', image_dpi_x=300, image_dpi_y=300)
+        else:
+            gcv2hocr2.STREAM_THRESHOLD = 0
+            document = gcv2hocr2.fromStream(f, 'bench', image_dpi_x=300, image_dpi_y=300)
+        document.write(sink)
+
+
+def measure(mode, path):
+    """Returns (peak RSS in bytes, seconds) of converting path in a new process."""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', mode, path])
+    _, status, usage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        raise RuntimeError(f"{mode} conversion of {path} failed with status {process.returncode}")
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024), seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak RSS of gcv2hocr2 against the size of the response file.')
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 40, 160], help='Pages in each response file')
+    parser.add_argument('--words', type=int, default=3000, help='Words per page')
+    parser.add_argument('--modes', nargs='+', choices=['load', 'stream'], default=['load', 'stream'])
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    mib = 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline, _ = measure('import', os.devnull)
+        print(f"baseline RSS {baseline / mib:.1f} MiB")
+        print(f"{'pages':>6} {'input MiB':>10} " + ' '.join(f"{mode + ' MiB':>11} {mode + ' s':>8}" for mode in args.modes))
+        for pages in args.pages:
+            path = os.path.join(tmp, f'response-{pages}.json')
+            write_response(path, pages, args.words)
+            row = f"{pages:>6} {os.path.getsize(path) / mib:>10.1f} "
+            for mode in args.modes:
+                rss, seconds = measure(mode, path)
+                row += f"{(rss - baseline) / mib:>11.1f} {seconds:>8.2f} "
+            print(row)
+            os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
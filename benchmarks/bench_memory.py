@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# Memory held by the gcv2hocr2 page tree for a synthetic page.
+#
+#   python benchmarks/bench_memory.py --words 20000
+#   git show HEAD~:gcv2hocr2.py > /tmp/old_gcv2hocr2.py
+#   python benchmarks/bench_memory.py --words 20000 --module /tmp/old_gcv2hocr2.py
+#
+# With --pages N, a document of N such pages is streamed to a null sink
+# instead and the peak is reported; it should stay close to one page.
+
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import sys
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+from synthetic import make_response
+
+
+def load_module(path):
+    if not path:
+        import gcv2hocr2
+        return gcv2hocr2
+    spec = importlib.util.spec_from_file_location('gcv2hocr2_under_test', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure memory retained by the gcv2hocr2 page tree.')
+    parser.add_argument('--words', type=int, default=20000, help='Words on the synthetic page')
+    parser.add_argument('--module', help='Path of an alternative gcv2hocr2.py to measure')
+    parser.add_argument('--pages', type=int, help='Stream a document of this many pages and report the peak')
+    args = parser.parse_args()
+
+    gcv2hocr2 = load_module(args.module)
+    if args.pages:
+        return stream_document(gcv2hocr2, args.words, args.pages)
+    response = {'responses': [make_response(words=args.words)]}
+    gcv2hocr2.logging.getLogger().setLevel(gcv2hocr2.logging.WARNING)
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = gcv2hocr2.fromResponse(response, 'bench', image_dpi_x=300, image_dpi_y=300)
+    # Documents build their pages lazily; keep the page tree to measure it
+    page = next(iter(result)) if hasattr(result, 'page_count') else result
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(json.dumps({
+        'words': args.words,
+        'retained_bytes': retained - before,
+        'peak_bytes': peak - before,
+        'retained_bytes_per_word': round((retained - before) / args.words, 1),
+    }, indent=2))
+    del page, result
+
+
+def stream_document(gcv2hocr2, words, pages):
+    response = {'responses': [make_response(words=words, seed=i) for i in range(pages)]}
+    gcv2hocr2.logging.getLogger().setLevel(gcv2hocr2.logging.WARNING)
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    with open(os.devnull, 'w', encoding='utf-8') as sink:
+        gcv2hocr2.fromResponse(response, 'bench', image_dpi_x=300, image_dpi_y=300).write(sink)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(json.dumps({
+        'words_per_page': words,
+        'pages': pages,
+        'peak_bytes': peak - before,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# Times the NumPy and Python geometry engines of gcv2hocr2 on a large
+# synthetic page. tests/test_numpy_parity.py checks that they agree.
+#
+#   python benchmarks/bench_numpy.py --words 20000
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import gcv2hocr2
+from synthetic import make_response
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the NumPy and Python geometry engines of gcv2hocr2.')
+    parser.add_argument('--words', type=int, default=20000, help='Words on the synthetic page')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    if not gcv2hocr2._numpy_available():
+        sys.exit("NumPy is not installed")
+
+    wrapped = {'responses': [make_response(words=args.words)]}
+    # Materialize the walker output so that the page build can be timed on its own
+    width, height, blocks = next(gcv2hocr2._dict_pages(wrapped['responses'][0]['fullTextAnnotation']))
+    blocks = [[(vertices, list(words)) for vertices, words in block] for block in blocks]
+    context = gcv2hocr2.ConversionContext(300, 300)
+    for engine, build_page in (('python', gcv2hocr2._build_page), ('numpy', gcv2hocr2._build_page_numpy)):
+        build = min(_timed(lambda: build_page(0, width, height, blocks, 'page', 'unknown', context))
+                    for _ in range(args.repeat))
+        # Documents build their pages lazily; iterating builds them, as writing the document would
+        total = min(_timed(lambda: list(gcv2hocr2.fromResponse(wrapped, 'page', image_dpi_x=300, image_dpi_y=300,
+                                                               engine=engine)))
+                    for _ in range(args.repeat))
+        print(f"{engine:>6}: page build {build * 1000:.0f} ms, fromResponse and build {total * 1000:.0f} ms "
+              f"({args.words} words)")
+
+
+def _timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    main()
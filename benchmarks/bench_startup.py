@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Cold-start cost of the plugin: the time a fresh interpreter spends
+# importing gvision and registering its options on top of importing
+# ocrmypdf, which every ocrmypdf process pays (even for --help), plus the
+# per-call cost of the language helpers.
+#
+#   python benchmarks/bench_startup.py --runs 15
+#   git worktree add /tmp/gvision-old HEAD~
+#   python benchmarks/bench_startup.py --runs 15 --plugin-dir /tmp/gvision-old
+#
+# Run it twice and use the second result; the first run also measures the
+# disk cache being filled.
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Prints the seconds spent on the plugin after ocrmypdf is imported, and the
+# heavy modules it left behind
+_IMPORT_PROBE = '''
+import json, sys, time
+import ocrmypdf
+from argparse import ArgumentParser
+started = time.perf_counter()
+sys.path.insert(0, {plugin_dir!r})
+import gvision
+gvision.add_options(ArgumentParser())
+elapsed = time.perf_counter() - started
+heavy = [name for name in ('google.cloud.vision', 'grpc', 'numpy') if name in sys.modules]
+print(json.dumps({{'elapsed': elapsed, 'heavy': heavy}}))
+'''
+
+
+def import_times(plugin_dir, runs):
+    probe = _IMPORT_PROBE.format(plugin_dir=plugin_dir)
+    times = []
+    heavy = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True)
+        measured = json.loads(result.stdout.splitlines()[-1])
+        times.append(measured['elapsed'])
+        heavy = measured['heavy']
+    return times, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the startup cost of the Google Vision plugin.')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters to start')
+    parser.add_argument('--plugin-dir', default=os.path.dirname(HERE),
+                        help='Directory holding the gvision.py to measure')
+    parser.add_argument('--calls', type=int, default=1000, help='Calls of the language mapping to time')
+    args = parser.parse_args()
+
+    times, heavy = import_times(os.path.abspath(args.plugin_dir), args.runs)
+    report = {
+        'plugin_dir': os.path.abspath(args.plugin_dir),
+        'runs': args.runs,
+        'import_ms_median': round(statistics.median(times) * 1000, 1),
+        'import_ms_min': round(min(times) * 1000, 1),
+        'heavy_modules_loaded': heavy,
+    }
+
+    sys.path.insert(0, os.path.abspath(args.plugin_dir))
+    import logging
+    from argparse import Namespace
+    import gvision
+    logging.getLogger().setLevel(logging.ERROR)
+    options = Namespace(language='eng+deu+fra')
+    report['map_languages_us_per_call'] = round(
+        timeit.timeit(lambda: gvision.GVisionOcrEngine._map_languages_for_gcv(options), number=args.calls)
+        / args.calls * 1e6, 2)
+
+    # Needs Tesseract; the first call starts it, later calls should not
+    if shutil.which('tesseract'):
+        first = timeit.timeit(lambda: gvision.GVisionOcrEngine.languages(options), number=1)
+        again = timeit.timeit(lambda: gvision.GVisionOcrEngine.languages(options), number=10) / 10
+        report['languages_ms_first_call'] = round(first * 1000, 2)
+        report['languages_ms_later_calls'] = round(again * 1000, 3)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# End-to-end throughput of GVisionOcrEngine against the local fake Vision
+# API (gcv_fake_server.py), without network access or API costs. Synthetic
+# page images are OCR'd by a pool of worker processes, as ocrmypdf -j does,
+# with the plugin options given after "--":
+#
+#   python benchmarks/bench_throughput.py --pages 200 --jobs 8 \
+#       --latency lognormal:0.4,0.5 --quota-error-rate 0.05 -- --gcv-max-rps 20
+#
+# Prints pages per second, page latency percentiles, the plugin's run
+# statistics and the fake server's counters as JSON.
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import pathlib
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import Namespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_DIR = os.path.dirname(HERE)
+sys.path.insert(0, PLUGIN_DIR)
+
+import gvision
+import gcv_stats
+
+log = logging.getLogger('bench_throughput')
+
+def make_pages(directory, count, dpi=300, size=(2550, 3300)):
+    from PIL import Image, ImageDraw
+    paths = []
+    for number in range(1, count + 1):
+        image = Image.new('L', size, 255)
+        ImageDraw.Draw(image).text((100, 100), f"page {number}", fill=0)
+        path = os.path.join(directory, f"{number:06d}_ocr.png")
+        image.save(path, dpi=(dpi, dpi))
+        paths.append(path)
+    return paths
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1.0):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Fake Vision API did not start on port {port}")
+
+
+def ocr_page(path, options):
+    """Runs in a worker process: OCR one page, return its latency in seconds or None if it failed."""
+    started = time.perf_counter()
+    try:
+        gvision.GVisionOcrEngine(options).generate_hocr(
+            pathlib.Path(path), pathlib.Path(path + '.hocr'), pathlib.Path(path + '.txt'), options)
+    except Exception:
+        # A broken configuration fails every page; say why
+        log.exception(f"OCR of {os.path.basename(path)} failed")
+        return None
+    return time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCR synthetic pages through the plugin against the fake Vision API.')
+    parser.add_argument('--pages', type=int, default=100, help='Page images to OCR')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Worker processes')
+    parser.add_argument('--words', type=int, default=300, help='Words in each synthesized response')
+    parser.add_argument('--latency', default='lognormal:0.3,0.5', help='Fake server latency distribution')
+    parser.add_argument('--quota-error-rate', default='0', help='Share of calls failing with 429')
+    parser.add_argument('--deadline-error-rate', default='0', help='Share of calls left to time out')
+    parser.add_argument('--unavailable-rate', default='0', help='Share of calls failing with UNAVAILABLE')
+    parser.add_argument('--seed', default='1', help='Seed of the fake server')
+    parser.add_argument('plugin_args', nargs=argparse.REMAINDER, help='Plugin options after "--"')
+    args = parser.parse_args()
+    plugin_args = args.plugin_args[1:] if args.plugin_args[:1] == ['--'] else args.plugin_args
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(PLUGIN_DIR, 'gcv_fake_server.py'), '--port', str(port),
+         '--words', str(args.words), '--latency', args.latency, '--seed', args.seed,
+         '--quota-error-rate', args.quota_error_rate, '--deadline-error-rate', args.deadline_error_rate,
+         '--unavailable-rate', args.unavailable_rate],
+        stderr=subprocess.PIPE, text=True)
+    try:
+        wait_for_port(port)
+        plugin_parser = argparse.ArgumentParser()
+        gvision.add_options(plugin_parser)
+        options = plugin_parser.parse_args(
+            ['--gcv-endpoint', f"127.0.0.1:{port}", '--gcv-insecure'] + plugin_args,
+            namespace=Namespace(language='eng'))
+        logging.basicConfig(level=logging.ERROR)
+        gvision.check_options(options)
+
+        with tempfile.TemporaryDirectory(prefix='bench-throughput-') as workdir:
+            # The workdir stands in for ocrmypdf's work folder, where validate puts the run directory
+            gvision._create_run_dir(options, pathlib.Path(workdir))
+            paths = make_pages(workdir, args.pages)
+            started = time.perf_counter()
+            with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                latencies = list(pool.map(ocr_page, paths, [options] * len(paths)))
+            wall = time.perf_counter() - started
+            stats = gcv_stats.totals(options.gcv_run_dir)
+    finally:
+        server.send_signal(signal.SIGINT)  # the server logs its counters on Ctrl-C
+        _, server_log = server.communicate()
+
+    done = sorted(latency for latency in latencies if latency is not None)
+    server_stats = {}
+    for line in server_log.splitlines():
+        if 'Fake Vision API statistics:' in line:
+            for item in line.split('statistics:', 1)[1].split(','):
+                name, _, value = item.strip().partition('=')
+                if value:
+                    server_stats[name] = int(value)
+    print(json.dumps({
+        'pages': args.pages,
+        'jobs': args.jobs,
+        'plugin_args': plugin_args,
+        'failed_pages': len(latencies) - len(done),
+        'wall_s': round(wall, 3),
+        'pages_per_s': round(len(done) / wall, 2) if wall else None,
+        'latency_s': {name: round(value, 3) if value is not None else None
+                      for name, value in (('p50', percentile(done, 0.5)), ('p95', percentile(done, 0.95)),
+                                          ('p99', percentile(done, 0.99)), ('max', done[-1] if done else None))},
+        'plugin_stats': stats,
+        'server_stats': server_stats,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
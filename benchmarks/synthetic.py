@@ -0,0 +1,49 @@
+# Synthetic Google Vision responses for the benchmarks in this directory.
+# The layout is regular (fixed words per line, lines per paragraph and
+# paragraphs per block) and the word texts include characters that need
+# escaping, so the hOCR writer is exercised as on real pages.
+
+import random
+
+
+def make_response(words=300, width=2550, height=3300, seed=1,
+                  words_per_line=8, lines_per_par=5, pars_per_block=2,
+                  missing_breaks=False):
+    """
+    Returns one AnnotateImageResponse as a JSON-style dict with the given
+    number of words. With missing_breaks, no symbol carries a line break, as
+    on pages where GCV drops them.
+    """
+    rnd = random.Random(seed)
+    blocks = []
+    n = 0
+    y = 100
+    while n < words:
+        block = {'paragraphs': [], 'boundingBox': {'vertices': []}}
+        for _ in range(pars_per_block):
+            par = {'words': [], 'boundingBox': {'vertices': []}}
+            for _ in range(lines_per_par):
+                x = 100
+                for w in range(words_per_line):
+                    if n >= words:
+                        break
+                    length = rnd.randint(2, 9)
+                    word_width = length * 18
+                    word_height = 30 + rnd.randint(-2, 2)
+                    symbols = [{'text': rnd.choice('abcdefghij<&>"\'')} for _ in range(length)]
+                    ends_line = w == words_per_line - 1 and not missing_breaks
+                    symbols[-1]['property'] = {'detectedBreak': {'type': 'EOL_SURE_SPACE' if ends_line else 'SPACE'}}
+                    vertices = [{'x': x, 'y': y}, {'x': x + word_width, 'y': y},
+                                {'x': x + word_width, 'y': y + word_height}, {'x': x, 'y': y + word_height}]
+                    par['words'].append({'boundingBox': {'vertices': vertices}, 'symbols': symbols})
+                    x += word_width + 15
+                    n += 1
+                y += 45
+                if y > height - 100:
+                    y = 100
+            par['boundingBox']['vertices'] = [{'x': 100, 'y': 100}, {'x': 2000, 'y': 100},
+                                              {'x': 2000, 'y': y}, {'x': 100, 'y': y}]
+            block['paragraphs'].append(par)
+        blocks.append(block)
+    return {'fullTextAnnotation': {'pages': [{'width': width, 'height': height, 'blocks': blocks}],
+                                   'text': 'x'}}
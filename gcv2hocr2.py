@@ -1,66 +1,186 @@
 #!/usr/bin/env python3
 
 import sys
+import io
 import json
 import argparse
-from string import Template
+import bisect
+import concurrent.futures
+import contextlib
+import glob
+import hashlib
 import logging
 import math
+import os
+import shutil
+import tempfile
+import time
 
 try:
     from html import escape
 except ImportError:
     from cgi import escape
 
+# NumPy is optional and takes longer to import than everything else here,
+# so it is loaded by the first conversion that asks for it, see _numpy_available
+_np = None
+_np_checked = False
+
+# ijson is optional too; fromStream falls back to reading the whole response, see _ijson_available
+_ijson = None
+_ijson_checked = False
+
+ENGINES = ('python', 'numpy')
+
+# fromStream parses responses of at least this many bytes incrementally
+STREAM_THRESHOLD = 16 * 1024 * 1024
+
 log = logging.getLogger(__name__)
 
-class GCVAnnotation:
-    page_height = None
-    page_width = None
-    dpi_x = 72.0
-    dpi_y = 72.0
 
+class ConversionContext:
+    """
+    Settings of one conversion: the resolution of the GCV image and the size
+    of the page being built. Every element of a page tree is built with the
+    context of its own conversion, so conversions may run in parallel threads.
+
+    scale_x/scale_y is the size of the image sent to GCV divided by the size
+    of the original image; a resized image's pixels correspond to a
+    proportionally different resolution.
+    """
+    __slots__ = ('dpi_x', 'dpi_y', 'scale_x', 'scale_y', 'page_width_px', 'page_height_px')
+
+    def __init__(self, image_dpi_x=None, image_dpi_y=None, scale_x=1.0, scale_y=1.0,
+                 page_width_px=0, page_height_px=0):
+        self.dpi_x = image_dpi_x if image_dpi_x and image_dpi_x > 0 else 72.0
+        self.dpi_y = image_dpi_y if image_dpi_y and image_dpi_y > 0 else 72.0
+        self.scale_x = scale_x
+        self.scale_y = scale_y
+        if scale_x and scale_x > 0:
+            self.dpi_x *= scale_x
+        if scale_y and scale_y > 0:
+            self.dpi_y *= scale_y
+        self.page_width_px = page_width_px
+        self.page_height_px = page_height_px
+
+    def for_page(self, page_width_px, page_height_px):
+        """Returns a copy of this context for a page of the given size in pixels."""
+        page_context = ConversionContext.__new__(ConversionContext)
+        page_context.dpi_x = self.dpi_x
+        page_context.dpi_y = self.dpi_y
+        page_context.scale_x = self.scale_x
+        page_context.scale_y = self.scale_y
+        page_context.page_width_px = page_width_px
+        page_context.page_height_px = page_height_px
+        return page_context
+
+    @property
+    def page_width_pt(self):
+        return (self.page_width_px or 0) * 72.0 / self.dpi_x
+
+    @property
+    def page_height_pt(self):
+        return (self.page_height_px or 0) * 72.0 / self.dpi_y
+
+
+def _box_to_points(box, context, ocr_class, htmlid):
+    """
+    Converts GCV vertices (pixels, top-left origin) to an (x0, y0, x1, y1)
+    box in points with a bottom-left origin, using the context's DPI.
+    """
+    try:
+        effective_page_height = context.page_height_px if context.page_height_px is not None else 0
+        if effective_page_height <= 0 and ocr_class != 'ocr_page':
+             # log.warning(f"Page height zero/None for {ocr_class} {htmlid}. Coords may be wrong.")
+             return 0, 0, 0, 0
+
+        if not box or len(box) < 4:
+             # if ocr_class != 'ocr_page' and ocr_class != 'ocr_carea':
+             #      log.debug(f"No vertices provided for {ocr_class} {htmlid}. Using 0s.")
+             return 0, 0, 0, 0
+
+        x_coords = [v[0] for v in box]
+        y_coords = [v[1] for v in box]
+
+        gcv_x_min = min(x_coords)
+        gcv_y_min = min(y_coords)
+        gcv_x_max = max(x_coords)
+        gcv_y_max = max(y_coords)
+
+        dpi_x = context.dpi_x
+        dpi_y = context.dpi_y
+
+        pt_x0 = gcv_x_min * 72.0 / dpi_x
+        pt_x1 = gcv_x_max * 72.0 / dpi_x
+        page_h_pt = effective_page_height * 72.0 / dpi_y
+        pt_y_bottom = page_h_pt - (gcv_y_max * 72.0 / dpi_y)
+        pt_y_top = page_h_pt - (gcv_y_min * 72.0 / dpi_y)
+
+        x0 = max(0, pt_x0)
+        y0 = max(0, pt_y_bottom)
+        x1 = max(0, pt_x1)
+        y1 = max(0, pt_y_top)
+
+        if y1 < y0:
+            log.warning(f"Calculated invalid point height for {ocr_class} {htmlid} (y1 < y0): {y1} < {y0}. Setting y1=y0.")
+            y1 = y0
+        if x1 < x0:
+             log.warning(f"Calculated invalid point width for {ocr_class} {htmlid} (x1 < x0): {x1} < {x0}. Setting x1=x0.")
+             x1 = x0
+        return x0, y0, x1, y1
+
+    except (ValueError, TypeError, IndexError, KeyError) as e:
+        log.error(f"Error processing boundingBox for {ocr_class} {htmlid}: {box}. Error: {e}", exc_info=True)
+        return 0, 0, 0, 0
+
+
+class _HocrElement:
+    __slots__ = ()
+
+    def render(self):
+        """Returns the hOCR markup as one string. Prefer write() for large pages."""
+        buffer = io.StringIO()
+        self.write(buffer)
+        return buffer.getvalue()
+
+
+class GCVAnnotation(_HocrElement):
+    # Opening and closing markup for each class, as precomputed format
+    # strings. The element's content is written between the two.
     templates = {
-        'ocr_page': Template("""<?xml version="1.0" encoding="UTF-8"?>
-<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
-<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="$lang" lang="$lang">
-  <head>
-    <title>HOCR File</title>
-    <meta http-equiv="Content-Type" content="text/html;charset=utf-8" />
-    <meta name='ocr-system' content='gcv2hocr.py' />
-    <meta name='ocr-langs' content='$lang' />
-    <meta name='ocr-number-of-pages' content='1' />
-    <meta name='ocr-capabilities' content='ocr_page ocr_carea ocr_par ocr_line ocrx_word ocrp_lang'/>
-  </head>
-  <body>
-    <div class='ocr_page' lang='$lang' title='image "$title";bbox 0 0 $page_width_pt $page_height_pt'>
-        <div class='ocr_carea' lang='$lang' title='bbox $x0 $y0 $x1 $y1'>$content</div>
-    </div>
-  </body>
-</html>
-    """),
+        # The document head and tail are written by GCVDocument
+        'ocr_page': ("""
+    <div class='ocr_page' lang='{lang}' title='image "{title}";bbox 0 0 {page_width_pt} {page_height_pt}'>
+        <div class='ocr_carea' lang='{lang}' title='bbox {x0} {y0} {x1} {y1}'>""",
+                     """</div>
+    </div>"""),
         # Updated baseline value in title
-        'ocr_line': Template("""
-            <span class='ocr_line' id='$htmlid' title='bbox $x0 $y0 $x1 $y1; baseline $baseline_str; x_fsize $fsize'>$content
+        'ocr_line': ("""
+            <span class='ocr_line' id='{htmlid}' title='bbox {x0} {y0} {x1} {y1}; baseline {baseline_str}; x_fsize {fsize}'>""",
+                     """
             </span>"""),
-        'ocrx_word': Template("""
-                <span class='ocrx_word' id='$htmlid' title='bbox $x0 $y0 $x1 $y1'>$content</span>"""),
-        'ocr_carea':Template("""
-                <div class='ocr_carea' id='$htmlid' title='bbox $x0 $y0 $x1 $y1'>$content</div>"""),
-        'ocr_par': Template("""
-                <p class='ocr_par' dir='ltr' id='$htmlid' title='bbox $x0 $y0 $x1 $y1'>$content</p>""")
+        'ocrx_word': ("""
+                <span class='ocrx_word' id='{htmlid}' title='bbox {x0} {y0} {x1} {y1}'>""",
+                      """</span>"""),
+        'ocr_carea': ("""
+                <div class='ocr_carea' id='{htmlid}' title='bbox {x0} {y0} {x1} {y1}'>""",
+                      """</div>"""),
+        'ocr_par': ("""
+                <p class='ocr_par' dir='ltr' id='{htmlid}' title='bbox {x0} {y0} {x1} {y1}'>""",
+                    """</p>""")
     }
 
+    __slots__ = ('htmlid', 'ocr_class', 'lang', 'context',
+                 'content', 'title', 'x0', 'y0', 'x1', 'y1')
+
     def __init__(self,
                  htmlid=None,
                  ocr_class=None,
                  lang='unknown',
                  # baseline="0 0", # Baseline calculated in render now
-                 page_height_px=None,
-                 page_width_px=None,
+                 context=None,
                  content=None,
-                 box=None, # GCV vertices in pixels
-                 raw_vertices=None, # Store raw vertices for baseline calc if needed
+                 box=None, # GCV vertices in pixels, as (x, y) pairs
                  title='',
                  savefile=False):
         if content is None: self.content = []
@@ -68,66 +188,18 @@ class GCVAnnotation:
         self.title = title
         self.htmlid = htmlid
         # self.baseline = baseline # Removed, calculated later
-        self.page_height_px = page_height_px
-        self.page_width_px = page_width_px
+        self.context = context if context is not None else ConversionContext()
         self.lang = lang
         self.ocr_class = ocr_class
-        # Store raw vertices if this is a word, needed for baseline calc
-        self.raw_vertices = raw_vertices if ocr_class == 'ocrx_word' else None
-
-        # --- Bounding Box Processing (Convert Pixels to Points) ---
-        try:
-            effective_page_height = self.page_height_px if self.page_height_px is not None else 0
-            if effective_page_height <= 0 and ocr_class != 'ocr_page':
-                 # log.warning(f"Page height zero/None for {ocr_class} {htmlid}. Coords may be wrong.")
-                 self.x0, self.y0, self.x1, self.y1 = 0, 0, 0, 0
-                 # Don't return early if it's the page itself, box might be maximized later
-                 if ocr_class != 'ocr_page': return
-
-
-            if not box or len(box) < 4:
-                 self.x0, self.y0, self.x1, self.y1 = 0, 0, 0, 0
-                 # if ocr_class != 'ocr_page' and ocr_class != 'ocr_carea':
-                 #      log.debug(f"No vertices provided for {ocr_class} {htmlid}. Using 0s.")
-                 return
-
-            x_coords = [int(float(v.get('x', 0))) for v in box if v and 'x' in v]
-            y_coords = [int(float(v.get('y', 0))) for v in box if v and 'y' in v]
-
-            if not x_coords or not y_coords:
-                 log.warning(f"Could not extract valid coords for {ocr_class} {htmlid}. Using 0s.")
-                 self.x0, self.y0, self.x1, self.y1 = 0, 0, 0, 0
-            else:
-                 gcv_x_min = min(x_coords)
-                 gcv_y_min = min(y_coords)
-                 gcv_x_max = max(x_coords)
-                 gcv_y_max = max(y_coords)
-
-                 dpi_x = GCVAnnotation.dpi_x if GCVAnnotation.dpi_x and GCVAnnotation.dpi_x > 0 else 72.0
-                 dpi_y = GCVAnnotation.dpi_y if GCVAnnotation.dpi_y and GCVAnnotation.dpi_y > 0 else 72.0
-
-                 pt_x0 = gcv_x_min * 72.0 / dpi_x
-                 pt_x1 = gcv_x_max * 72.0 / dpi_x
-                 page_h_pt = effective_page_height * 72.0 / dpi_y
-                 pt_y_bottom = page_h_pt - (gcv_y_max * 72.0 / dpi_y)
-                 pt_y_top = page_h_pt - (gcv_y_min * 72.0 / dpi_y)
+        self.x0, self.y0, self.x1, self.y1 = _box_to_points(box, self.context, ocr_class, htmlid)
 
-                 self.x0 = max(0, pt_x0)
-                 self.y0 = max(0, pt_y_bottom)
-                 self.x1 = max(0, pt_x1)
-                 self.y1 = max(0, pt_y_top)
-
-                 if self.y1 < self.y0:
-                     log.warning(f"Calculated invalid point height for {ocr_class} {htmlid} (y1 < y0): {self.y1} < {self.y0}. Setting y1=y0.")
-                     self.y1 = self.y0
-                 if self.x1 < self.x0:
-                      log.warning(f"Calculated invalid point width for {ocr_class} {htmlid} (x1 < x0): {self.x1} < {self.x0}. Setting x1=x0.")
-                      self.x1 = self.x0
-
-        except (ValueError, TypeError, IndexError, KeyError) as e:
-            log.error(f"Error processing boundingBox for {ocr_class} {htmlid}: {box}. Error: {e}", exc_info=True)
-            self.x0, self.y0, self.x1, self.y1 = 0, 0, 0, 0
+    @property
+    def page_width_px(self):
+        return self.context.page_width_px
 
+    @property
+    def page_height_px(self):
+        return self.context.page_height_px
 
     def maximize_bbox(self):
         """ Recalculates the bounding box (in points) based on child content """
@@ -156,239 +228,1053 @@ class GCVAnnotation:
         content_repr = self.content if isinstance(self.content, str) else f"[{len(self.content)} items]"
         return f"<{self.ocr_class} id={self.htmlid} bbox=[{self.x0:.1f} {self.y0:.1f} {self.x1:.1f} {self.y1:.1f}]>{content_repr}</{self.ocr_class}>"
 
-    def render(self):
-        rendered_content = ""
+    def write(self, out):
+        """
+        Streams the hOCR markup of this element and its children to the text
+        file object out, one element at a time, without building the nested
+        strings in memory. An element whose tag cannot be formatted is
+        skipped together with its children.
+        """
+        try:
+            start_tag = self.__class__.templates[self.ocr_class][0].format_map(self._template_vars())
+        except KeyError as e:
+            log.error(f"Template key error for class: {self.ocr_class}. Missing key: {e}.")
+            return
+        except Exception as e:
+            log.error(f"Error rendering template for {self.ocr_class} {self.htmlid}: {e}", exc_info=True)
+            return
+
+        out.write(start_tag)
         if isinstance(self.content, list):
-            rendered_content = "".join(map(lambda x: x.render(), self.content))
+            for child in self.content:
+                child.write(out)
         elif isinstance(self.content, str):
-            rendered_content = escape(str(self.content))
+            out.write(escape(str(self.content)))
+        out.write(self.__class__.templates[self.ocr_class][1])
+
+    def font_size_pt(self):
+        """Estimated font size of a line in points, from its height."""
+        line_height_pt = self.y1 - self.y0
+        return max(1, math.ceil(line_height_pt / 1.3)) if line_height_pt > 0 else 1
+
+    def baseline_pt(self):
+        """
+        Y of a line's baseline in points (bottom-left origin): the average
+        bottom edge of its words. None if no word has usable vertices.
+        """
+        if not isinstance(self.content, list):
+            return None
+        # Word bottoms were computed when the words were built
+        word_bottoms_px = [word.bottom_px for word in self.content
+                           if word.ocr_class == 'ocrx_word' and word.bottom_px is not None]
+        if not word_bottoms_px:
+            return None
+        avg_word_bottom_y_px = sum(word_bottoms_px) / len(word_bottoms_px)
+        # Transform this average baseline Y (pixels) to points (bottom-left origin)
+        return self.context.page_height_pt - (avg_word_bottom_y_px * 72.0 / self.context.dpi_y)
 
-        page_width_pt = (self.page_width_px or 0) * 72.0 / (GCVAnnotation.dpi_x or 72.0)
-        page_height_pt = (self.page_height_px or 0) * 72.0 / (GCVAnnotation.dpi_y or 72.0)
+    def _template_vars(self):
+        context = self.context
+        page_width_pt = context.page_width_pt
+        page_height_pt = context.page_height_pt
 
         template_vars = {
             'lang': self.lang if self.lang else 'unknown',
             'title': self.title if self.title else '',
-            'page_width_pt': page_width_pt,
-            'page_height_pt': page_height_pt,
-            'page_width': self.page_width_px if self.page_width_px is not None else 0,
-            'page_height': self.page_height_px if self.page_height_px is not None else 0,
-            'x0': self.x0, 'y0': self.y0, 'x1': self.x1, 'y1': self.y1,
             'htmlid': self.htmlid if self.htmlid else '',
-            # 'baseline': self.baseline if self.baseline else "0 0", # Replaced by baseline_str
-            'content': rendered_content
+            # Coordinates and font size are integers in the output
+            'x0': int(round(self.x0)), 'y0': int(round(self.y0)),
+            'x1': int(round(self.x1)), 'y1': int(round(self.y1)),
+            'page_width_pt': int(round(page_width_pt)),
+            'page_height_pt': int(round(page_height_pt)),
         }
 
         # --- Add estimated font size and baseline for ocr_line ---
         if self.ocr_class == 'ocr_line':
-             line_height_pt = self.y1 - self.y0
-             estimated_fsize_pt = max(1, math.ceil(line_height_pt / 1.3)) if line_height_pt > 0 else 1
-             template_vars['fsize'] = estimated_fsize_pt
+             template_vars['fsize'] = int(round(self.font_size_pt()))
 
              # --- Calculate Baseline ---
              baseline_offset = 0 # Default offset
-             avg_word_bottom_y_px = 0
-             word_count = 0
-             if isinstance(self.content, list):
-                  word_bottoms_px = []
-                  for word in self.content:
-                       if word.ocr_class == 'ocrx_word' and word.raw_vertices and len(word.raw_vertices) >= 4:
-                            # GCV vertices: 0=TL, 1=TR, 2=BR, 3=BL
-                            # Average the Y of bottom-right (2) and bottom-left (3) vertices
-                            try:
-                                 bottom_y = (int(float(word.raw_vertices[2].get('y',0))) + int(float(word.raw_vertices[3].get('y',0)))) / 2.0
-                                 word_bottoms_px.append(bottom_y)
-                            except (ValueError, TypeError, IndexError, KeyError):
-                                 pass # Ignore words with bad vertices
-
-                  if word_bottoms_px:
-                       avg_word_bottom_y_px = sum(word_bottoms_px) / len(word_bottoms_px)
-                       # Transform this average baseline Y (pixels) to points (bottom-left origin)
-                       page_h_pt_eff = (self.page_height_px or 0) * 72.0 / (GCVAnnotation.dpi_y or 72.0)
-                       avg_baseline_y_pt = page_h_pt_eff - (avg_word_bottom_y_px * 72.0 / (GCVAnnotation.dpi_y or 72.0))
-                       # Baseline offset is distance from line's bottom edge (y0)
-                       baseline_offset = avg_baseline_y_pt - self.y0
-                       # log.debug(f"Line {self.htmlid}: Avg bottom Y px={avg_word_bottom_y_px:.1f}, Avg baseline Y pt={avg_baseline_y_pt:.1f}, y0={self.y0:.1f}, offset={baseline_offset:.1f}")
-
+             baseline_y_pt = self.baseline_pt()
+             if baseline_y_pt is not None:
+                  # Baseline offset is distance from line's bottom edge (y0)
+                  baseline_offset = baseline_y_pt - self.y0
 
              # Format baseline string: "slope offset" (slope is 0 for horizontal text)
-             template_vars['baseline_str'] = f"0 {baseline_offset:.2f}" # Use float format
-
+             template_vars['baseline_str'] = f"0 {baseline_offset:.2f}" # Baseline offset remains float
         else:
              template_vars['fsize'] = 0
              template_vars['baseline_str'] = "0 0" # Default for non-lines
 
+        return template_vars
+
+
+class GCVWord(_HocrElement):
+    """
+    Compact record for one recognized word (ocrx_word). It keeps only what
+    the output needs: the text, the box already converted to points and the
+    bottom edge in pixels that the line baseline is averaged from.
+    """
+    __slots__ = ('htmlid', 'content', 'x0', 'y0', 'x1', 'y1', 'bottom_px')
+    ocr_class = 'ocrx_word'
+
+    def __init__(self, htmlid, content, box, context):
+        self.htmlid = htmlid
+        self.content = content
+        self.x0, self.y0, self.x1, self.y1 = _box_to_points(box, context, 'ocrx_word', htmlid)
+        # GCV vertices: 0=TL, 1=TR, 2=BR, 3=BL
+        # Average the Y of bottom-right (2) and bottom-left (3) vertices
+        self.bottom_px = (box[2][1] + box[3][1]) / 2.0 if box and len(box) >= 4 else None
+
+    @classmethod
+    def from_points(cls, htmlid, content, points, bottom_px):
+        """Builds a word whose box (in points) and bottom edge were computed elsewhere."""
+        word = cls.__new__(cls)
+        word.htmlid = htmlid
+        word.content = content
+        word.x0, word.y0, word.x1, word.y1 = points
+        word.bottom_px = bottom_px
+        return word
+
+    def __repr__(self):
+        return f"<ocrx_word id={self.htmlid} bbox=[{self.x0:.1f} {self.y0:.1f} {self.x1:.1f} {self.y1:.1f}]>{self.content}</ocrx_word>"
+
+    def write(self, out):
+        start_tag, end_tag = GCVAnnotation.templates['ocrx_word']
+        out.write(start_tag.format(htmlid=self.htmlid or '',
+                                   x0=int(round(self.x0)), y0=int(round(self.y0)),
+                                   x1=int(round(self.x1)), y1=int(round(self.y1))))
+        out.write(escape(self.content))
+        out.write(end_tag)
+
+
+# --- Response walkers ---
+# fromResponse (JSON dicts) and fromAnnotation (protobuf objects) share one
+# page builder. Each walker yields, per page, (width, height, blocks) where
+# blocks is an iterable of paragraph lists, a paragraph is
+# (vertices, words) and a word is (vertices, text, ends_line). Vertices are
+# lists of integer (x, y) pixel pairs, parsed exactly once.
+
+LINE_BREAK_TYPES = ("LINE_BREAK", "EOL_SURE_SPACE")
+# Same break types as TextAnnotation.DetectedBreak.BreakType enum values
+LINE_BREAK_TYPE_VALUES = (5, 3)
+
+# How words are grouped into lines: by GCV's detected line breaks, or by the
+# vertical position of the words (see _geometric_lines)
+LINE_MODES = ('breaks', 'geometry')
+# With line_mode='geometry', a word is on a line if its vertical centre is
+# within this share of the line's median word height of the line's median
+# centre; descenders and slight skew move a centre far less than that
+GEOMETRY_LINE_SHARE = 0.5
+
+
+def _word_bottom(vertices):
+    if len(vertices) >= 4:
+        return (vertices[2][1] + vertices[3][1]) / 2.0
+    return max((y for _, y in vertices), default=0)
+
+
+def _word_top(vertices):
+    if len(vertices) >= 4:
+        return (vertices[0][1] + vertices[1][1]) / 2.0
+    return min((y for _, y in vertices), default=0)
+
+
+def _median(sorted_values):
+    middle = len(sorted_values) // 2
+    if len(sorted_values) % 2:
+        return sorted_values[middle]
+    return (sorted_values[middle - 1] + sorted_values[middle]) / 2.0
+
+
+def _geometric_lines(words, baseline_tolerance):
+    """
+    Regroups a paragraph's words into lines by geometry, ignoring GCV's line
+    breaks: the words are sorted by the vertical centre of their boxes and
+    swept in that order. A word joins the current line if its centre is
+    within GEOMETRY_LINE_SHARE of the line's median word height (and at
+    least baseline_tolerance pixels) of the line's median centre, and starts
+    a new line otherwise. Comparing with the line rather than the previous
+    word keeps descenders and skew from splitting lines or chaining rows
+    together. Sorting makes this O(n log n) for pages of short lines. Lines
+    are yielded top to bottom, the words of each in GCV's reading order.
+    """
+    words = list(words)
+    tops = [_word_top(vertices) for vertices, _, _ in words]
+    bottoms = [_word_bottom(vertices) for vertices, _, _ in words]
+    centres = [(top + bottom) / 2.0 for top, bottom in zip(tops, bottoms)]
+    lines = []
+    line_centres = line_heights = None
+    for index in sorted(range(len(words)), key=centres.__getitem__):
+        height = max(0.0, bottoms[index] - tops[index])
+        if lines:
+            tolerance = max(baseline_tolerance, GEOMETRY_LINE_SHARE * _median(line_heights))
+            if abs(centres[index] - _median(line_centres)) <= tolerance:
+                lines[-1].append(index)
+                bisect.insort(line_centres, centres[index])
+                bisect.insort(line_heights, height)
+                continue
+        lines.append([index])
+        line_centres, line_heights = [centres[index]], [height]
+    for line in lines:
+        line.sort()
+        last = line[-1]
+        for index in line:
+            vertices, text, _ = words[index]
+            yield vertices, text, index == last
+
+
+def _line_words(words, line_mode, baseline_tolerance):
+    return _geometric_lines(words, baseline_tolerance) if line_mode == 'geometry' else words
+
+
+def _dict_vertices(bounding_box):
+    # The JSON encoding omits coordinates that are 0
+    return [(int(float(v.get('x', 0))), int(float(v.get('y', 0))))
+            for v in (bounding_box or {}).get('vertices', [])]
+
+
+def _dict_words(paragraph_json):
+    for word_json in paragraph_json.get('words', []):
+        symbols = word_json.get('symbols', [])
+        text = ''.join([symbol.get('text', '') for symbol in symbols])
+        ends_line = False
+        for symbol in symbols:
+            break_type = symbol.get('property', {}).get('detectedBreak', {}).get('type')
+            if break_type in LINE_BREAK_TYPES or break_type in LINE_BREAK_TYPE_VALUES:
+                ends_line = True
+                break
+        yield _dict_vertices(word_json.get('boundingBox')), text, ends_line
+
+
+def _dict_page(page_json, line_mode='breaks', baseline_tolerance=2):
+    blocks = ([(_dict_vertices(paragraph_json.get('boundingBox')),
+                _line_words(_dict_words(paragraph_json), line_mode, baseline_tolerance))
+               for paragraph_json in block_json.get('paragraphs', [])]
+              for block_json in page_json.get('blocks', []))
+    return page_json.get('width'), page_json.get('height'), blocks
+
+
+def _dict_pages(annotation, line_mode='breaks', baseline_tolerance=2):
+    for page_json in annotation.get('pages', []):
+        yield _dict_page(page_json, line_mode, baseline_tolerance)
+
+
+def _proto_vertices(bounding_box):
+    return [(v.x, v.y) for v in bounding_box.vertices]
+
+
+def _proto_words(paragraph):
+    for word in paragraph.words:
+        symbols = word.symbols
+        text = ''.join([symbol.text for symbol in symbols])
+        ends_line = False
+        for symbol in symbols:
+            if symbol.property.detected_break.type_ in LINE_BREAK_TYPE_VALUES:
+                ends_line = True
+                break
+        yield _proto_vertices(word.bounding_box), text, ends_line
+
+
+def _proto_pages(annotation, line_mode='breaks', baseline_tolerance=2):
+    for page in annotation.pages:
+        blocks = ([(_proto_vertices(paragraph.bounding_box),
+                    _line_words(_proto_words(paragraph), line_mode, baseline_tolerance))
+                   for paragraph in block.paragraphs]
+                  for block in page.blocks)
+        yield page.width, page.height, blocks
+
+
+def _empty_page(file_name, htmlid, context=None):
+    context = (context or ConversionContext()).for_page(0, 0)
+    return GCVAnnotation(ocr_class='ocr_page', htmlid=htmlid, box=None, title=file_name, context=context)
+
+
+def _build_page(page_id, current_page_width_px, current_page_height_px, blocks, file_name, lang, context):
+    log.debug(f"Processing page {page_id}: width={current_page_width_px}px, height={current_page_height_px}px")
+    context = context.for_page(current_page_width_px, current_page_height_px)
+
+    page_box_vertices = [(0, 0), (current_page_width_px, 0),
+                         (current_page_width_px, current_page_height_px), (0, current_page_height_px)]
+
+    page = GCVAnnotation(
+        ocr_class='ocr_page',
+        htmlid=f'page_{page_id + 1}',
+        box=page_box_vertices,
+        title=file_name,
+        context=context,
+        lang=lang
+    )
+
+    page_carea = GCVAnnotation(ocr_class='ocr_carea', htmlid=f'carea_page_{page_id + 1}', box=page_box_vertices, context=context)
+    page.content.append(page_carea)
+
+    # --- Block Loop ---
+    for block_id, paragraphs in enumerate(blocks):
+        # --- Paragraph Loop ---
+        for paragraph_id, (par_box_vertices, words) in enumerate(paragraphs):
+            par = GCVAnnotation(ocr_class='ocr_par', htmlid=f"par_{page_id + 1}_{block_id + 1}_{paragraph_id + 1}", box=par_box_vertices, context=context)
+            page_carea.content.append(par)
+
+            current_line = None
+
+            # --- Word Loop ---
+            for word_id, (word_box_vertices, word_text, ends_line) in enumerate(words):
+                # --- Line Handling Logic ---
+                if current_line is None:
+                     current_line = GCVAnnotation(ocr_class='ocr_line', htmlid=f"line_{par.htmlid}_{word_id + 1}", box=word_box_vertices, context=context)
+                     par.content.append(current_line)
+
+                word = GCVWord(f"word_{current_line.htmlid}_{word_id + 1}", word_text, word_box_vertices, context)
+                current_line.content.append(word)
+
+                if ends_line:
+                    current_line.maximize_bbox()
+                    current_line = None
+
+            if current_line:
+                current_line.maximize_bbox()
+
+    # Maximize paragraph boxes after processing all their lines/words
+    for p in page_carea.content:
+         if p.ocr_class == 'ocr_par':
+              p.maximize_bbox()
+
+    # Maximize the main carea box
+    page_carea.maximize_bbox()
+    return page
+
+
+def _positive(values):
+    # Same as max(0, v) for each value
+    return _np.where(values > 0, values, 0.0)
+
+
+def _build_page_numpy(page_id, current_page_width_px, current_page_height_px, blocks, file_name, lang, context):
+    """
+    Same result as _build_page, but the geometry of the whole page (pixel to
+    point conversion, line, paragraph and carea boxes) is computed with NumPy
+    array operations instead of one word at a time.
+    """
+    log.debug(f"Processing page {page_id} with NumPy: width={current_page_width_px}px, height={current_page_height_px}px")
+    context = context.for_page(current_page_width_px, current_page_height_px)
+
+    # --- Flatten the page: one row per word, words of a line and lines of a paragraph are contiguous ---
+    vertices = []    # four (x, y) pairs per word
+    irregular = []   # (word index, vertices) of words without exactly four vertices
+    texts = []
+    line_starts = []       # index of the first word of each line
+    line_word_ids = []     # position of that word in its paragraph, used in the line id
+    paragraphs = []        # (block_id, paragraph_id, vertices, first line, end line)
+    for block_id, block_paragraphs in enumerate(blocks):
+        for paragraph_id, (par_box_vertices, words) in enumerate(block_paragraphs):
+            first_line = len(line_starts)
+            new_line = True
+            for word_id, (word_box_vertices, word_text, ends_line) in enumerate(words):
+                if new_line:
+                    line_starts.append(len(texts))
+                    line_word_ids.append(word_id)
+                    new_line = False
+                if len(word_box_vertices) == 4:
+                    vertices.extend(word_box_vertices)
+                else:
+                    vertices.extend(((0, 0),) * 4)
+                    irregular.append((len(texts), word_box_vertices))
+                texts.append(word_text)
+                if ends_line:
+                    new_line = True
+            paragraphs.append((block_id, paragraph_id, par_box_vertices, first_line, len(line_starts)))
+
+    # --- Word geometry, same arithmetic as _box_to_points ---
+    word_count = len(texts)
+    points = _np.asarray(vertices, dtype=_np.float64).reshape(word_count, 4, 2)
+    xs = points[:, :, 0]
+    ys = points[:, :, 1]
+    bottoms = ((ys[:, 2] + ys[:, 3]) / 2.0).tolist()
+    page_height = context.page_height_px if context.page_height_px is not None else 0
+    if page_height > 0:
+        page_h_pt = page_height * 72.0 / context.dpi_y
+        x0 = _positive(xs.min(axis=1) * 72.0 / context.dpi_x)
+        x1 = _positive(xs.max(axis=1) * 72.0 / context.dpi_x)
+        y0 = _positive(page_h_pt - (ys.max(axis=1) * 72.0 / context.dpi_y))
+        y1 = _positive(page_h_pt - (ys.min(axis=1) * 72.0 / context.dpi_y))
+    else:
+        x0, y0, x1, y1 = _np.zeros((4, word_count))
+    for word_index, word_box_vertices in irregular:
+        x0[word_index], y0[word_index], x1[word_index], y1[word_index] = \
+            _box_to_points(word_box_vertices, context, 'ocrx_word', None)
+        bottoms[word_index] = ((word_box_vertices[2][1] + word_box_vertices[3][1]) / 2.0
+                               if len(word_box_vertices) >= 4 else None)
+
+    # --- Lines: reductions over each line's run of words ---
+    if line_starts:
+        starts = _np.asarray(line_starts)
+        line_x0 = _np.minimum.reduceat(x0, starts)
+        line_y0 = _np.minimum.reduceat(y0, starts)
+        line_x1 = _np.maximum.reduceat(x1, starts)
+        line_y1 = _np.maximum.reduceat(y1, starts)
+    else:
+        line_x0 = line_y0 = line_x1 = line_y1 = _np.zeros(0)
+
+    # --- Paragraphs with lines: reductions over their run of lines ---
+    filled = [(first, end) for _, _, _, first, end in paragraphs if end > first]
+    if filled:
+        starts = _np.asarray([first for first, _ in filled])
+        par_boxes = iter(zip(_np.minimum.reduceat(line_x0, starts).tolist(),
+                             _np.minimum.reduceat(line_y0, starts).tolist(),
+                             _np.maximum.reduceat(line_x1, starts).tolist(),
+                             _np.maximum.reduceat(line_y1, starts).tolist()))
+
+    # --- Build the tree with the computed geometry ---
+    page_box_vertices = [(0, 0), (current_page_width_px, 0),
+                         (current_page_width_px, current_page_height_px), (0, current_page_height_px)]
+    page = GCVAnnotation(ocr_class='ocr_page', htmlid=f'page_{page_id + 1}', box=page_box_vertices,
+                         title=file_name, context=context, lang=lang)
+    page_carea = GCVAnnotation(ocr_class='ocr_carea', htmlid=f'carea_page_{page_id + 1}', box=page_box_vertices, context=context)
+    page.content.append(page_carea)
+
+    word_boxes = list(zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist()))
+    line_boxes = list(zip(line_x0.tolist(), line_y0.tolist(), line_x1.tolist(), line_y1.tolist()))
+    line_ends = line_starts[1:] + [word_count]
+    for block_id, paragraph_id, par_box_vertices, first_line, end_line in paragraphs:
+        par = GCVAnnotation(ocr_class='ocr_par', htmlid=f"par_{page_id + 1}_{block_id + 1}_{paragraph_id + 1}",
+                            box=None if end_line > first_line else par_box_vertices, context=context)
+        if end_line > first_line:
+            par.x0, par.y0, par.x1, par.y1 = next(par_boxes)
+        page_carea.content.append(par)
+        for line_index in range(first_line, end_line):
+            line = GCVAnnotation(ocr_class='ocr_line', htmlid=f"line_{par.htmlid}_{line_word_ids[line_index] + 1}", context=context)
+            line.x0, line.y0, line.x1, line.y1 = line_boxes[line_index]
+            word_id = line_word_ids[line_index]
+            for word_index in range(line_starts[line_index], line_ends[line_index]):
+                word_id += 1
+                line.content.append(GCVWord.from_points(f"word_{line.htmlid}_{word_id}", texts[word_index],
+                                                        word_boxes[word_index], bottoms[word_index]))
+            par.content.append(line)
+
+    page_carea.maximize_bbox()
+    return page
+
+
+class GCVDocument:
+    """
+    A multi-page hOCR document. Pages are built one at a time while the
+    document is written or iterated, so only one page tree is in memory at
+    any time. page_items is a callable returning a fresh iterator of
+    (width, height, blocks, lang) tuples, or None for a page without text.
+    """
+    templates = ("""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="{lang}" lang="{lang}">
+  <head>
+    <title>HOCR File</title>
+    <meta http-equiv="Content-Type" content="text/html;charset=utf-8" />
+    <meta name='ocr-system' content='gcv2hocr.py' />
+    <meta name='ocr-langs' content='{lang}' />
+    <meta name='ocr-number-of-pages' content='{page_count}' />
+    <meta name='ocr-capabilities' content='ocr_page ocr_carea ocr_par ocr_line ocrx_word ocrp_lang'/>
+  </head>
+  <body>""",
+                 """
+  </body>
+</html>
+    """)
+
+    _FAILED = object()  # page_items raised; stands for one error page
+
+    def __init__(self, file_name, page_items, context, engine='python', lang='unknown', page_count=None):
+        self.file_name = file_name
+        self.context = context
+        self.engine = engine
+        self.lang = lang
+        self._page_items = page_items
+        if page_count is None:
+            # Counting only walks the page list, not the words
+            page_count = sum(1 for _ in self._items())
+        self.page_count = max(1, page_count)
+
+    def _items(self):
         try:
-            # Ensure coordinates and fsize are integers for the template
-            template_vars['x0'] = int(round(template_vars['x0']))
-            template_vars['y0'] = int(round(template_vars['y0']))
-            template_vars['x1'] = int(round(template_vars['x1']))
-            template_vars['y1'] = int(round(template_vars['y1']))
-            template_vars['page_width_pt'] = int(round(template_vars['page_width_pt']))
-            template_vars['page_height_pt'] = int(round(template_vars['page_height_pt']))
-            template_vars['fsize'] = int(round(template_vars['fsize']))
-            # Baseline offset remains float in the string
-
-            return self.__class__.templates[self.ocr_class].substitute(template_vars)
-        except KeyError as e:
-            # Handle potential missing keys if templates differ
-            if str(e) == "'baseline_str'" and self.ocr_class != 'ocr_line':
-                 del template_vars['baseline_str'] # Remove if not needed
-                 return self.__class__.templates[self.ocr_class].substitute(template_vars)
-            elif str(e) == "'fsize'" and self.ocr_class != 'ocr_line':
-                 del template_vars['fsize'] # Remove if not needed
-                 return self.__class__.templates[self.ocr_class].substitute(template_vars)
-            else:
-                 log.error(f"Template key error for class: {self.ocr_class}. Missing key: {e}. Vars: {template_vars.keys()}")
-                 return ""
+            yield from self._page_items()
         except Exception as e:
-            log.error(f"Error rendering template for {self.ocr_class} {self.htmlid}: {e}", exc_info=True)
-            return ""
+            log.error(f"Error reading GCV response pages for {self.file_name}: {e}", exc_info=True)
+            yield self._FAILED
 
+    def __iter__(self):
+        """Builds and yields the pages (ocr_page GCVAnnotation trees) in order."""
+        build_page = _build_page_numpy if self.engine == 'numpy' else _build_page
+        page_id = -1
+        for page_id, item in enumerate(self._items()):
+            if item is self._FAILED:
+                yield _empty_page(self.file_name, 'page_error', self.context)
+                continue
+            if item is None:
+                log.warning(f"No text annotation for page {page_id + 1} of {self.file_name}. Generating empty page.")
+                yield _empty_page(self.file_name, f'page_{page_id + 1}', self.context)
+                continue
+            current_page_width_px, current_page_height_px, blocks, lang = item
+            if current_page_height_px is None or current_page_width_px is None:
+                log.error(f"Missing page dimensions (pixels) for page {page_id}. Cannot process.")
+                yield _empty_page(self.file_name, f'page_{page_id + 1}', self.context)
+                continue
+            try:
+                yield build_page(page_id, current_page_width_px, current_page_height_px, blocks,
+                                 self.file_name, lang, self.context)
+            except Exception as e:
+                log.error(f"Error converting page {page_id} of {self.file_name}: {e}", exc_info=True)
+                yield _empty_page(self.file_name, 'page_error', self.context)
+        if page_id < 0:
+            log.warning(f"No pages in GCV response for {self.file_name}, creating empty fallback.")
+            yield _empty_page(self.file_name, 'page_fallback', self.context)
 
-# --- Modified fromResponse to accept and set DPI ---
-def fromResponse(resp, file_name, baseline_tolerance=2, image_dpi_x=None, image_dpi_y=None, **kwargs):
-    page = None
-    # Set DPI at class level for access in GCVAnnotation constructor
-    GCVAnnotation.dpi_x = image_dpi_x if image_dpi_x and image_dpi_x > 0 else 72.0
-    GCVAnnotation.dpi_y = image_dpi_y if image_dpi_y and image_dpi_y > 0 else 72.0
-    log.debug(f"Using DPI for hOCR conversion: dx={GCVAnnotation.dpi_x}, dy={GCVAnnotation.dpi_y}")
+    def write(self, out, timings=None):
+        """
+        Streams the document to the text file object out, one page at a time.
+        If a timings dict is given, the seconds spent building the page trees
+        and writing their markup are added to it as 'hocr_build' and 'render'.
+        """
+        out.write(self.templates[0].format(lang=self.lang or 'unknown', page_count=self.page_count))
+        if timings is None:
+            for page in self:
+                page.write(out)
+                del page  # free this page's tree before the next one is built
+        else:
+            pages = iter(self)
+            while True:
+                started = time.perf_counter()
+                page = next(pages, None)
+                built = time.perf_counter()
+                timings['hocr_build'] = timings.get('hocr_build', 0.0) + built - started
+                if page is None:
+                    break
+                page.write(out)
+                del page
+                timings['render'] = timings.get('render', 0.0) + time.perf_counter() - built
+        out.write(self.templates[1])
 
-    try:
-        if 'responses' not in resp or not resp['responses']:
-             log.warning(f"Invalid GCV response structure for {file_name}. Generating empty page.")
-             page = GCVAnnotation(ocr_class='ocr_page', htmlid='page_0', box=None, title=file_name, page_width_px=0, page_height_px=0)
-             return page
+    def render(self):
+        """Returns the whole document as one string. Prefer write() for long documents."""
+        buffer = io.StringIO()
+        self.write(buffer)
+        return buffer.getvalue()
+
+
+def _image_responses(resp):
+    """
+    Yields the per-image responses of a batch or file annotation result.
+    File results (BatchAnnotateFilesResponse, async output files) nest one
+    'responses' list per file.
+    """
+    for response in resp.get('responses') or []:
+        if 'fullTextAnnotation' not in response and 'responses' in response:
+            yield from _image_responses(response)
+        else:
+            yield response
 
-        annotation = resp['responses'][0].get('fullTextAnnotation')
+
+def _dict_page_items(resp, line_mode='breaks', baseline_tolerance=2):
+    for response in _image_responses(resp):
+        annotation = response.get('fullTextAnnotation')
         if not annotation:
-             log.warning(f"No 'fullTextAnnotation' found in GCV response for {file_name}. Generating empty page.")
-             page = GCVAnnotation(ocr_class='ocr_page', htmlid='page_0', box=None, title=file_name, page_width_px=0, page_height_px=0)
-             return page
-
-        # --- Page Loop ---
-        for page_id, page_json in enumerate(annotation.get('pages', [])):
-            current_page_height_px = page_json.get('height')
-            current_page_width_px = page_json.get('width')
-            if current_page_height_px is None or current_page_width_px is None:
-                 log.error(f"Missing page dimensions (pixels) for page {page_id}. Cannot process.")
-                 continue
-
-            log.debug(f"Processing page {page_id}: width={current_page_width_px}px, height={current_page_height_px}px")
-
-            page_box_vertices = [{"x": 0, "y": 0}, {"x": current_page_width_px, "y": 0},
-                                 {"x": current_page_width_px, "y": current_page_height_px}, {"x": 0, "y": current_page_height_px}]
-
-            page = GCVAnnotation(
-                ocr_class='ocr_page',
-                htmlid=f'page_{page_id + 1}',
-                box=page_box_vertices,
-                title=file_name,
-                page_width_px=current_page_width_px,
-                page_height_px=current_page_height_px,
-                lang=annotation.get('language', 'unknown')
-            )
-
-            page_carea = GCVAnnotation(ocr_class='ocr_carea', htmlid=f'carea_page_{page_id + 1}', box=page_box_vertices, page_width_px=current_page_width_px, page_height_px=current_page_height_px)
-            page.content.append(page_carea)
-
-            # --- Block Loop ---
-            for block_id, block_json in enumerate(page_json.get('blocks', [])):
-                # --- Paragraph Loop ---
-                for paragraph_id, paragraph_json in enumerate(block_json.get('paragraphs', [])):
-                    par_box_vertices = paragraph_json.get('boundingBox', {}).get('vertices', [])
-                    par = GCVAnnotation(ocr_class='ocr_par', htmlid=f"par_{page_id + 1}_{block_id + 1}_{paragraph_id + 1}", box=par_box_vertices, page_width_px=current_page_width_px, page_height_px=current_page_height_px)
-                    page_carea.content.append(par)
+            yield None
+            continue
+        lang = annotation.get('language', 'unknown')
+        pages = _dict_pages(annotation, line_mode, baseline_tolerance)
+        page = next(pages, None)
+        if page is None:
+            yield None
+            continue
+        yield page + (lang,)
+        for page in pages:
+            yield page + (lang,)
 
-                    current_line = None
 
-                    # --- Word Loop ---
-                    for word_id, word_json in enumerate(paragraph_json.get('words', [])):
-                        word_box_vertices = word_json.get('boundingBox', {}).get('vertices', [])
-                        word_text = ''.join([
-                            symbol.get('text', '') for symbol in word_json.get('symbols', [])
-                        ])
+def _event_map(events):
+    """
+    Builds the JSON object whose start_map event was just read from the
+    parser events, consuming them up to its end_map. Simpler and about twice
+    as fast as ijson's ObjectBuilder.
+    """
+    stack = []
+    top = {}
+    key = None
+    for _, event, value in events:
+        if event == 'map_key':
+            key = value
+        elif event == 'start_map' or event == 'start_array':
+            new = {} if event == 'start_map' else []
+            if type(top) is dict:
+                top[key] = new
+            else:
+                top.append(new)
+            stack.append(top)
+            top = new
+        elif event == 'end_map' or event == 'end_array':
+            if not stack:
+                return top
+            top = stack.pop()
+        elif type(top) is dict:
+            top[key] = value
+        else:
+            top.append(value)
+    return top
+
 
-                        # --- Line Handling Logic ---
-                        if current_line is None:
-                             current_line = GCVAnnotation(ocr_class='ocr_line', htmlid=f"line_{par.htmlid}_{word_id + 1}", box=word_box_vertices, page_width_px=current_page_width_px, page_height_px=current_page_height_px)
-                             par.content.append(current_line)
+def _skip_map(events):
+    """Consumes the events of the JSON object whose start_map was just read."""
+    depth = 0
+    for _, event, _ in events:
+        if event == 'start_map' or event == 'start_array':
+            depth += 1
+        elif event == 'end_map' or event == 'end_array':
+            if not depth:
+                return
+            depth -= 1
 
-                        # Store raw vertices with the word object
-                        word = GCVAnnotation(ocr_class='ocrx_word', htmlid=f"word_{current_line.htmlid}_{word_id + 1}", content=word_text, box=word_box_vertices, raw_vertices=word_box_vertices, page_width_px=current_page_width_px, page_height_px=current_page_height_px)
-                        current_line.content.append(word)
 
-                        line_break_detected = False
-                        for symbol in word_json.get('symbols', []):
-                            detected_break = symbol.get('property', {}).get('detectedBreak', {})
-                            break_type = detected_break.get('type')
-                            if break_type in ["LINE_BREAK", "EOL_SURE_SPACE"]:
-                                line_break_detected = True
-                                break
+def _event_page_items(events, line_mode='breaks', baseline_tolerance=2, languages=None, build=True):
+    """
+    Same items as _dict_page_items, from the (prefix, event, value) events of
+    an incremental JSON parser over a response file: only the page being
+    yielded is built as a dict. The language of a response may come after
+    its pages, so it is read from languages, a list of the language of each
+    response in the file. With build=False, pages are skipped instead of
+    built, languages is filled in, and pages are yielded as (None, None,
+    None, number of their response in languages), for counting them.
+    """
+    events = iter(events)
+    responses = []  # [prefix, number, pages seen, has 'responses', has 'fullTextAnnotation'] of the open responses
+    started = 0
+    lang = 'unknown'
+    for prefix, event, value in events:
+        if event == 'start_map':
+            if prefix.endswith('fullTextAnnotation.pages.item') and responses:
+                responses[-1][2] += 1
+                if build:
+                    yield _dict_page(_event_map(events), line_mode, baseline_tolerance) + (lang,)
+                else:
+                    _skip_map(events)
+                    yield None, None, None, responses[-1][1]
+            elif prefix == '' or prefix.endswith('responses.item'):
+                responses.append([prefix, started, 0, False, False])
+                if build:
+                    lang = languages[started] if languages and started < len(languages) else 'unknown'
+                elif languages is not None:
+                    languages.append('unknown')
+                started += 1
+        elif not responses:
+            continue
+        elif event == 'map_key' and prefix == responses[-1][0]:
+            if value == 'responses':
+                responses[-1][3] = True
+            elif value == 'fullTextAnnotation':
+                responses[-1][4] = True
+        elif event == 'string' and not build and languages is not None and prefix.endswith('fullTextAnnotation.language') \
+                and prefix == (responses[-1][0] + '.' if responses[-1][0] else '') + 'fullTextAnnotation.language':
+            languages[responses[-1][1]] = value
+        elif event == 'end_map' and prefix == responses[-1][0]:
+            response_prefix, _, pages_seen, has_responses, has_annotation = responses.pop()
+            # A batch or file result holding responses; the top level is one when it has a 'responses' list
+            nested = has_responses and (response_prefix == '' or not has_annotation)
+            if not nested and not pages_seen:
+                yield None
 
-                        if line_break_detected:
-                            if current_line:
-                                 current_line.maximize_bbox()
-                            current_line = None
 
-                    if current_line:
-                        current_line.maximize_bbox()
+def _numpy_available():
+    global _np, _np_checked
+    if not _np_checked:
+        try:
+            import numpy as _np
+        except ImportError:
+            _np = None
+        _np_checked = True
+    return _np is not None
+
+
+def _ijson_available():
+    global _ijson, _ijson_checked
+    if not _ijson_checked:
+        try:
+            import ijson as _ijson
+        except ImportError:
+            _ijson = None
+        _ijson_checked = True
+    return _ijson is not None
+
+
+def _check_line_mode(line_mode):
+    if line_mode not in LINE_MODES:
+        raise ValueError(f"Unknown line mode '{line_mode}', expected one of {', '.join(LINE_MODES)}")
+    return line_mode
+
+
+def _check_engine(engine):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown geometry engine '{engine}', expected one of {', '.join(ENGINES)}")
+    if engine == 'numpy' and not _numpy_available():
+        log.warning("NumPy is not installed, using the Python geometry engine")
+        return 'python'
+    return engine
+
+
+def fromResponse(resp, file_name, baseline_tolerance=2, image_dpi_x=None, image_dpi_y=None,
+                 scale_x=1.0, scale_y=1.0, engine='python', line_mode='breaks', **kwargs):
+    """
+    Converts a GCV result in its JSON (dict) form, as saved by the API or CLI
+    tools, to a GCVDocument with one page per image response and file page.
+    resp is a {'responses': [...]} batch or file annotation result.
+    engine='numpy' computes the page geometry with NumPy; the output is the same.
+    line_mode='geometry' builds lines from the words' positions, within half
+    a line height and at least baseline_tolerance pixels, instead of GCV's
+    line breaks (see _geometric_lines).
+    """
+    engine = _check_engine(engine)
+    line_mode = _check_line_mode(line_mode)
+    context = ConversionContext(image_dpi_x, image_dpi_y, scale_x, scale_y)
+    log.debug(f"Using DPI for hOCR conversion: dx={context.dpi_x}, dy={context.dpi_y}")
+
+    if 'responses' not in resp or not resp['responses']:
+         log.warning(f"Invalid GCV response structure for {file_name}. Generating empty page.")
+
+    first = next((response.get('fullTextAnnotation') for response in _image_responses(resp)), None)
+    return GCVDocument(file_name, lambda: _dict_page_items(resp, line_mode, baseline_tolerance), context, engine,
+                       lang=first.get('language', 'unknown') if first else 'unknown')
+
+
+def fromStream(stream, file_name, baseline_tolerance=2, image_dpi_x=None, image_dpi_y=None,
+               scale_x=1.0, scale_y=1.0, engine='python', line_mode='breaks', **kwargs):
+    """
+    Like fromResponse, but reads the JSON response from the binary file
+    object stream incrementally with ijson: each page is parsed, converted
+    and written before the next one is read, so memory holds one page rather
+    than the whole response. The stream is read twice (the page count comes
+    first in the hOCR header); one that cannot seek, such as STDIN, is first
+    copied to a temporary file. The stream must stay open until the document
+    has been written. Responses smaller than STREAM_THRESHOLD, or all of
+    them without ijson, are loaded whole like fromResponse, which is faster.
+    """
+    if not stream.seekable():
+        spool = tempfile.TemporaryFile()
+        shutil.copyfileobj(stream, spool)
+        stream = spool
+        stream.seek(0)
+    start = stream.tell()
+    size = stream.seek(0, io.SEEK_END) - start
+    stream.seek(start)
+    if size < STREAM_THRESHOLD or not _ijson_available():
+        if size >= STREAM_THRESHOLD:
+            log.warning("ijson is not installed, reading the whole GCV response into memory")
+        return fromResponse(_wrap_response(json.load(stream)), file_name, baseline_tolerance, image_dpi_x,
+                            image_dpi_y, scale_x, scale_y, engine, line_mode, **kwargs)
+    engine = _check_engine(engine)
+    line_mode = _check_line_mode(line_mode)
+    context = ConversionContext(image_dpi_x, image_dpi_y, scale_x, scale_y)
+    log.debug(f"Using DPI for hOCR conversion: dx={context.dpi_x}, dy={context.dpi_y}")
+
+    languages = []
+
+    def page_items(build=True):
+        stream.seek(start)
+        return _event_page_items(_ijson.parse(stream, use_float=True), line_mode, baseline_tolerance,
+                                 languages, build)
+
+    # A pass over the events without building the pages, for the page count and
+    # languages; it also finds malformed JSON before anything is written
+    page_count = 0
+    first = None
+    try:
+        for item in page_items(build=False):
+            if page_count == 0:
+                first = item
+            page_count += 1
+    except _ijson.JSONError as e:
+        # yajl's messages point at the error on further lines
+        raise ValueError(f"Invalid JSON in GCV response {file_name}: {str(e).splitlines()[0]}") from e
+    if not page_count:
+        log.warning(f"Invalid GCV response structure for {file_name}. Generating empty page.")
+    return GCVDocument(file_name, page_items, context, engine,
+                       lang=languages[first[3]] if first else 'unknown', page_count=page_count)
+
+
+def fromAnnotation(annotation, file_name, baseline_tolerance=2, image_dpi_x=None, image_dpi_y=None,
+                   scale_x=1.0, scale_y=1.0, engine='python', line_mode='breaks', **kwargs):
+    """
+    Converts a response's full_text_annotation (a vision TextAnnotation) to
+    a GCVDocument by reading the protobuf objects directly, without a JSON
+    round trip. engine and line_mode are as for fromResponse.
+    """
+    engine = _check_engine(engine)
+    line_mode = _check_line_mode(line_mode)
+    context = ConversionContext(image_dpi_x, image_dpi_y, scale_x, scale_y)
+    log.debug(f"Using DPI for hOCR conversion: dx={context.dpi_x}, dy={context.dpi_y}")
+
+    if annotation is None:
+         log.warning(f"No full_text_annotation given for {file_name}. Generating empty page.")
+         return GCVDocument(file_name, lambda: iter(()), context, engine)
+
+    # Walk the raw protobuf message rather than the proto-plus wrapper, which
+    # would build a wrapper object on every attribute access
+    to_pb = getattr(type(annotation), 'pb', None)
+    if to_pb is not None:
+        annotation = to_pb(annotation)
+    return GCVDocument(file_name, lambda: (page + ('unknown',)
+                                           for page in _proto_pages(annotation, line_mode, baseline_tolerance)),
+                       context, engine)
+
+
+def blankDocument(file_name, width_px, height_px, image_dpi_x=None, image_dpi_y=None, engine='python'):
+    """
+    A GCVDocument of one page without text, of the given size in pixels, for
+    page images that are not sent to GCV.
+    """
+    engine = _check_engine(engine)
+    context = ConversionContext(image_dpi_x, image_dpi_y)
+    return GCVDocument(file_name, lambda: iter(((width_px, height_px, [], 'unknown'),)), context, engine)
+
+
+# --- Command line: one file, or a batch converted by a pool of processes ---
 
-            # Maximize paragraph boxes after processing all their lines/words
-            for p in page_carea.content:
-                 if p.ocr_class == 'ocr_par':
-                      p.maximize_bbox()
+BATCH_SKIP_MODES = ('mtime', 'hash', 'none')
 
-            # Maximize the main carea box
-            page_carea.maximize_bbox()
 
-            break # Process only the first page
+def _wrap_response(resp):
+    # A single image response, or a batch / file annotation result holding many
+    return resp if 'responses' in resp else {"responses": [resp]}
 
+
+def _write_document(document, output_path):
+    """Writes the document to output_path through a temporary file, so that a failed write leaves no partial output."""
+    directory = os.path.dirname(output_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.hocr')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as outfile:
+            document.write(outfile)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _source_digest(source, settings):
+    """
+    Hash of a response (bytes, or a binary file read in chunks) and the
+    conversion settings, kept next to the output with --skip hash.
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, bytes):
+        digest.update(source)
+    else:
+        for chunk in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(chunk)
+    digest.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _convert_batch_item(item):
+    """
+    Converts one response of a batch; runs in a worker process. item is
+    (name, source path or None, NDJSON line or None, output path, settings,
+    skip mode). Returns (name, outcome, pages, seconds, error) with outcome
+    'converted', 'skipped' or 'failed'.
+    """
+    name, source_path, line, output_path, settings, skip = item
+    started = time.perf_counter()
+    try:
+        if skip == 'mtime' and source_path is not None and os.path.exists(output_path) \
+                and os.path.getmtime(output_path) >= os.path.getmtime(source_path):
+            return name, 'skipped', 0, time.perf_counter() - started, None
+        # Files are parsed as a stream, NDJSON records are small enough to load
+        source = open(source_path, 'rb') if source_path is not None else line.encode('utf-8')
+        try:
+            # NDJSON records have no mtime of their own; they are always compared by hash
+            digest_path = output_path + '.sha256'
+            by_hash = skip == 'hash' or (skip == 'mtime' and source_path is None)
+            if by_hash:
+                digest = _source_digest(source, settings)
+                try:
+                    with open(digest_path, 'r', encoding='ascii') as f:
+                        if f.read().strip() == digest and os.path.exists(output_path):
+                            return name, 'skipped', 0, time.perf_counter() - started, None
+                except FileNotFoundError:
+                    pass
+            file_name = os.path.splitext(os.path.basename(output_path))[0]
+            if source_path is not None:
+                source.seek(0)
+                document = fromStream(source, file_name, **settings)
+            else:
+                document = fromResponse(_wrap_response(json.loads(source)), file_name, **settings)
+            _write_document(document, output_path)
+        finally:
+            if source_path is not None:
+                source.close()
+        if by_hash:
+            with open(digest_path, 'w', encoding='ascii') as f:
+                f.write(digest + '\n')
+        return name, 'converted', document.page_count, time.perf_counter() - started, None
     except Exception as e:
-        log.error(f"Error in fromResponse function: {e}", exc_info=True)
-        page = GCVAnnotation(ocr_class='ocr_page', htmlid='page_error', box=None, title=file_name, page_width_px=0, page_height_px=0)
+        log.debug(f"Converting {name} failed", exc_info=True)
+        return name, 'failed', 0, time.perf_counter() - started, f"{type(e).__name__}: {e}"
 
-    if page is None:
-         log.warning("fromResponse resulted in None page, creating empty fallback.")
-         page = GCVAnnotation(ocr_class='ocr_page', htmlid='page_fallback', box=None, title=file_name, page_width_px=0, page_height_px=0)
 
-    return page
+def _batch_items(inputs, ndjson, output_dir, settings, skip):
+    """
+    Yields the work items for the batch inputs: directories (all .json files
+    below them), glob patterns, files, or with ndjson, files ('-' for STDIN)
+    holding one response per line. Outputs go next to their input, or to the
+    same relative place below output_dir.
+    """
+    for source in inputs:
+        if ndjson:
+            stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+            stem = 'stdin' if source == '-' else os.path.splitext(os.path.basename(source))[0]
+            target_dir = output_dir or (os.getcwd() if source == '-' else os.path.dirname(os.path.abspath(source)))
+            try:
+                for number, line in enumerate(stream, 1):
+                    if line.strip():
+                        name = f"{stem}-{number:06d}"
+                        yield (f"{source}:{number}", None, line, os.path.join(target_dir, name + '.hocr'), settings, skip)
+            finally:
+                if stream is not sys.stdin:
+                    stream.close()
+            continue
+        if os.path.isdir(source):
+            root = source
+            paths = sorted(glob.glob(os.path.join(glob.escape(source), '**', '*.json'), recursive=True))
+        elif glob.has_magic(source):
+            # Relative paths are kept below the part of the pattern without wildcards
+            root = os.path.dirname(source.split('*', 1)[0].split('?', 1)[0].split('[', 1)[0]) or '.'
+            paths = sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+        else:
+            root = os.path.dirname(source) or '.'
+            paths = [source]
+        for path in paths:
+            relative = os.path.relpath(path, root) if output_dir else path
+            output_path = os.path.splitext(os.path.join(output_dir or '', relative))[0] + '.hocr'
+            yield path, path, None, output_path, settings, skip
 
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser()
-    parser.add_argument('gcv_file', help='GCV JSON file, "-" for STDIN')
+def run_batch(inputs, ndjson=False, output_dir=None, jobs=None, skip='mtime', **settings):
+    """
+    Converts many saved GCV responses across a pool of worker processes and
+    logs each failure. Returns a summary dict with the number of responses
+    converted, skipped and failed, the failures and the throughput.
+    """
+    if skip not in BATCH_SKIP_MODES:
+        raise ValueError(f"Unknown skip mode '{skip}', expected one of {', '.join(BATCH_SKIP_MODES)}")
+    jobs = jobs or os.cpu_count() or 1
+    items = _batch_items(inputs, ndjson, output_dir, settings, skip)
+    counts = {'converted': 0, 'skipped': 0, 'failed': 0}
+    failures = []
+    pages = 0
+    started = time.perf_counter()
+
+    def record(result):
+        nonlocal pages
+        name, outcome, page_count, seconds, error = result
+        counts[outcome] += 1
+        pages += page_count
+        if error:
+            failures.append((name, error))
+            log.error(f"{name}: {error}")
+        else:
+            log.info(f"{name}: {outcome} ({seconds * 1000:.0f} ms)")
+
+    if jobs == 1:
+        for item in items:
+            record(_convert_batch_item(item))
+    else:
+        # A bounded number of items in flight, so that a long NDJSON stream is not read ahead
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            pending = set()
+            for item in items:
+                pending.add(pool.submit(_convert_batch_item, item))
+                if len(pending) >= jobs * 4:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        record(future.result())
+            for future in concurrent.futures.as_completed(pending):
+                record(future.result())
+
+    seconds = time.perf_counter() - started
+    return dict(counts, pages=pages, seconds=seconds, failures=failures,
+                responses_per_second=counts['converted'] / seconds if seconds else 0.0,
+                pages_per_second=pages / seconds if seconds else 0.0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert saved Google Cloud Vision responses to hOCR. Given a directory, a glob "
+                    "pattern, several files, --ndjson or --output-dir, converts them all in batch mode.")
+    parser.add_argument('gcv_file', nargs='+', help='GCV JSON file, "-" for STDIN, or in batch mode directories, '
+                                                    'glob patterns (quoted) or NDJSON files')
     parser.add_argument("--baseline","-B", help="Baseline offset", metavar="pn pn-1 ...", default="0 0")
-    parser.add_argument("--baseline-tolerance", "-T", help="Y Tolerance to recognize same line. Default: 2", metavar="INT", type=int, default=2)
+    parser.add_argument("--baseline-tolerance", "-T", help="Least Y tolerance in pixels to recognize the same line with --line-mode geometry; the tolerance grows with the line height. Default: 2", metavar="INT", type=int, default=2)
+    parser.add_argument("--line-mode", help="Build lines from GCV's line breaks, or from the words' positions. Default: breaks", choices=LINE_MODES, default='breaks')
     parser.add_argument("--savefile", help="Save to this file instead of outputting to stdout")
     parser.add_argument("--dpi-x", help="Image DPI X", type=float, default=72.0)
     parser.add_argument("--dpi-y", help="Image DPI Y", type=float, default=72.0)
+    parser.add_argument("--scale-x", help="Width of the image sent to GCV divided by the original width", type=float, default=1.0)
+    parser.add_argument("--scale-y", help="Height of the image sent to GCV divided by the original height", type=float, default=1.0)
+    parser.add_argument("--engine", help="Page geometry engine. Default: python", choices=ENGINES, default='python')
+    parser.add_argument("--ndjson", action='store_true', help="Batch mode: the inputs hold one JSON response per line")
+    parser.add_argument("--output-dir", "-o", help="Batch mode: write the .hocr files here instead of next to their inputs")
+    parser.add_argument("--jobs", "-j", type=int, help="Batch mode: worker processes. Default: number of CPUs")
+    parser.add_argument("--skip", choices=BATCH_SKIP_MODES, default='mtime',
+                        help="Batch mode: skip inputs whose output is newer (mtime) or was made from the same "
+                             "response and settings (hash, kept in a .sha256 file next to the output). Default: mtime")
+    parser.add_argument("--log-level", choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='WARNING',
+                        help="Logging level. Default: WARNING")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
-    logging.basicConfig(level=logging.DEBUG)
+    logging.basicConfig(level=getattr(logging, args.log_level))
 
+    settings = dict(image_dpi_x=args.dpi_x, image_dpi_y=args.dpi_y, scale_x=args.scale_x, scale_y=args.scale_y,
+                    engine=args.engine, line_mode=args.line_mode, baseline_tolerance=args.baseline_tolerance)
+    batch = (args.ndjson or args.output_dir or len(args.gcv_file) > 1
+             or any(os.path.isdir(name) or glob.has_magic(name) for name in args.gcv_file))
+    if batch:
+        if args.savefile:
+            parser.error("--savefile cannot be used in batch mode")
+        summary = run_batch(args.gcv_file, ndjson=args.ndjson, output_dir=args.output_dir, jobs=args.jobs,
+                            skip=args.skip, **settings)
+        print(f"{summary['converted']} converted, {summary['skipped']} skipped, {summary['failed']} failed "
+              f"in {summary['seconds']:.1f}s ({summary['responses_per_second']:.1f} responses/s, "
+              f"{summary['pages_per_second']:.1f} pages/s)", file=sys.stderr)
+        for name, error in summary['failures']:
+            print(f"  failed: {name}: {error}", file=sys.stderr)
+        return 1 if summary['failed'] else 0
+
+    gcv_file = args.gcv_file[0]
     try:
-        instream = sys.stdin if (args.gcv_file == '-') else open(args.gcv_file, 'r', encoding='utf-8' )
-        resp_main = json.load(instream)
-        resp_wrapped = {"responses": [resp_main]}
-        page = fromResponse(resp_wrapped, str(args.gcv_file.rsplit('.',1)[0]),
-                            image_dpi_x=args.dpi_x, image_dpi_y=args.dpi_y, **args.__dict__)
-
-        if page:
-            rendered_hocr = page.render()
+        instream = contextlib.nullcontext(sys.stdin.buffer) if (gcv_file == '-') else open(gcv_file, 'rb')
+        with instream as f:
+            # Pages are read from the stream while the document is written
+            document = fromStream(f, str(gcv_file.rsplit('.',1)[0]), **settings)
+
             if args.savefile:
                 with open(args.savefile, 'w', encoding="utf-8") as outfile:
-                    outfile.write(rendered_hocr)
-                log.info(f"hOCR saved to {args.savefile}")
+                    document.write(outfile)
+                log.info(f"hOCR ({document.page_count} pages) saved to {args.savefile}")
             else:
-                 print(rendered_hocr)
-        else:
-             log.error("Failed to generate hOCR page object.")
+                 document.write(sys.stdout)
+                 sys.stdout.write("\n")
 
     except FileNotFoundError:
-        log.error(f"Input file not found: {args.gcv_file}")
-    except json.JSONDecodeError:
-         log.error(f"Invalid JSON in file: {args.gcv_file}")
+        log.error(f"Input file not found: {gcv_file}")
+        return 1
+    except ValueError:
+         log.error(f"Invalid JSON in file: {gcv_file}")
+         return 1
     except Exception as e:
          log.error(f"An unexpected error occurred: {e}", exc_info=True)
+         return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
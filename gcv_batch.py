@@ -0,0 +1,165 @@
+# Cross-worker request batching for the Google Vision plugin.
+# ocrmypdf runs one page per worker at a time, so page requests from all
+# workers are collected in a shared spool directory. Whichever worker takes
+# the leader lock groups the pending requests into one batch call and writes
+# each response back for the worker that submitted it.
+
+import logging
+import os
+import time
+import uuid
+from typing import Callable, List
+
+from gcv_locking import FileLock, atomic_write
+
+log = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 16  # Vision API limit for images per batch_annotate_images call
+
+
+class BatchError(Exception):
+    """Raised in the submitting worker when its batch failed or never completed."""
+
+
+class BatchSpool:
+    """
+    File-based request spool shared by all workers of one ocrmypdf run.
+
+    Files in the spool directory:
+      <id>.req      serialized request waiting for a batch
+      <id>.claimed  request taken by a leader and currently being sent
+      <id>.resp     serialized response for the submitter to collect
+      <id>.err      error message if the batch call failed
+    """
+
+    def __init__(self, spool_dir, batch_size: int = MAX_BATCH_SIZE,
+                 flush_seconds: float = 0.5, timeout: float = 600.0,
+                 poll_interval: float = 0.02):
+        self.spool_dir = os.fspath(spool_dir)
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.flush_seconds = flush_seconds
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._leader_lock_path = os.path.join(self.spool_dir, 'leader.lock')
+
+    def _path(self, request_id: str, suffix: str) -> str:
+        return os.path.join(self.spool_dir, f"{request_id}.{suffix}")
+
+    def _pending(self) -> List[os.DirEntry]:
+        """Returns queued requests, oldest first."""
+        pending = []
+        with os.scandir(self.spool_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.req'):
+                    continue
+                try:
+                    pending.append((entry.stat().st_mtime, entry))
+                except FileNotFoundError:
+                    continue  # submitter gave up on it
+        pending.sort(key=lambda item: item[0])
+        return [entry for _, entry in pending]
+
+    def submit(self, payload: bytes, send_batch: Callable[[List[bytes]], List[bytes]]) -> bytes:
+        """
+        Queues one serialized request and returns its serialized response.
+
+        send_batch receives a list of serialized requests and must return the
+        serialized responses in the same order. It is called by whichever
+        worker is leading when the batch fills up or the oldest queued request
+        has waited flush_seconds.
+        """
+        request_id = uuid.uuid4().hex
+        atomic_write(self._path(request_id, 'req'), payload)
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            response_path = self._path(request_id, 'resp')
+            if os.path.exists(response_path):
+                with open(response_path, 'rb') as f:
+                    response = f.read()
+                os.unlink(response_path)
+                return response
+            error_path = self._path(request_id, 'err')
+            if os.path.exists(error_path):
+                with open(error_path, 'rb') as f:
+                    message = f.read().decode('utf-8', 'replace')
+                os.unlink(error_path)
+                raise BatchError(message)
+            if time.monotonic() > deadline:
+                for suffix in ('req', 'claimed'):
+                    try:
+                        os.unlink(self._path(request_id, suffix))
+                    except FileNotFoundError:
+                        pass
+                raise BatchError(f"No batch response after {self.timeout:.0f}s")
+
+            if not self._lead(send_batch):
+                time.sleep(self.poll_interval)
+
+    def _lead(self, send_batch: Callable[[List[bytes]], List[bytes]]) -> bool:
+        """
+        Tries to become leader and send one batch. Returns False if another
+        worker is leading or nothing is queued.
+        """
+        lock = FileLock(self._leader_lock_path)
+        if not lock.acquire(blocking=False):
+            return False
+        try:
+            pending = self._pending()
+            if not pending:
+                return False
+            # Wait for the batch to fill, but never past the flush time of the oldest request
+            while len(pending) < self.batch_size:
+                waited = time.time() - pending[0].stat().st_mtime
+                if waited >= self.flush_seconds:
+                    break
+                time.sleep(min(self.poll_interval, self.flush_seconds - waited))
+                pending = self._pending()
+
+            claimed = []
+            for entry in pending[:self.batch_size]:
+                request_id = entry.name[:-len('.req')]
+                try:
+                    os.rename(entry.path, self._path(request_id, 'claimed'))
+                except FileNotFoundError:
+                    continue  # submitter gave up on it
+                claimed.append(request_id)
+        finally:
+            # Release before the API call so the next batch can form meanwhile
+            lock.release()
+
+        # Every claim still on disk gets a .resp or .err file, whatever happens
+        outcomes = {}
+        failure = b"Batch leader stopped before sending the request"
+        try:
+            sent, payloads = [], []
+            for request_id in claimed:
+                try:
+                    with open(self._path(request_id, 'claimed'), 'rb') as f:
+                        payloads.append(f.read())
+                except FileNotFoundError:
+                    continue  # submitter timed out and removed it
+                sent.append(request_id)
+            if sent:
+                log.debug(f"Sending batch of {len(sent)} GCV requests")
+                responses = send_batch(payloads)
+                if len(responses) != len(payloads):
+                    raise BatchError(f"Batch returned {len(responses)} responses for {len(payloads)} requests")
+                outcomes.update(zip(sent, responses))
+        except Exception as e:
+            failure = str(e).encode('utf-8')
+        finally:
+            for request_id in claimed:
+                claimed_path = self._path(request_id, 'claimed')
+                if not os.path.exists(claimed_path):
+                    continue
+                if request_id in outcomes:
+                    atomic_write(self._path(request_id, 'resp'), outcomes[request_id])
+                else:
+                    atomic_write(self._path(request_id, 'err'), failure)
+                try:
+                    os.unlink(claimed_path)
+                except FileNotFoundError:
+                    pass
+        return True
@@ -0,0 +1,128 @@
+# Circuit breaker over the GCV API, shared by all workers of an ocrmypdf run.
+# Like the rate limiter, its state lives in a small JSON file in the run
+# directory guarded by a file lock. After a number of consecutive failed (or
+# too slow) GCV calls the circuit opens: for a cool-off period no page is
+# sent to GCV and the plugin uses Tesseract instead. Once the cool-off has
+# passed, one worker probes GCV with its next page; if that call succeeds
+# the circuit closes again, otherwise it stays open for another cool-off.
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from gcv_locking import FileLock, atomic_write
+
+log = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Cross-process circuit breaker. Times are in seconds."""
+
+    def __init__(self, state_dir, failure_threshold: int = 5, cooloff: float = 60.0,
+                 latency_threshold: Optional[float] = None, probe_timeout: Optional[float] = None):
+        self.failure_threshold = failure_threshold
+        self.cooloff = cooloff
+        self.latency_threshold = latency_threshold
+        # A probe that never reports back (its worker died) is given up after this long
+        self.probe_timeout = probe_timeout if probe_timeout is not None else max(cooloff, 60.0)
+        os.makedirs(os.fspath(state_dir), exist_ok=True)
+        self._state_path = os.path.join(os.fspath(state_dir), 'breaker.json')
+        self._lock_path = os.path.join(os.fspath(state_dir), 'breaker.lock')
+
+    def _load(self) -> dict:
+        try:
+            with open(self._state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'state': CLOSED, 'failures': 0, 'opened_until': 0.0, 'probe_started': None, 'probe_owner': None}
+
+    def _save(self, state: dict):
+        atomic_write(self._state_path, json.dumps(state).encode('utf-8'))
+
+    @staticmethod
+    def _owner() -> str:
+        return f"{os.getpid()}:{threading.get_ident()}"
+
+    def state(self) -> str:
+        with FileLock(self._lock_path):
+            return self._load()['state']
+
+    def allow(self) -> bool:
+        """
+        Whether the next call may go to GCV. While the circuit is open this is
+        False, except for the single caller that gets to probe GCV once the
+        cool-off has passed.
+        """
+        with FileLock(self._lock_path):
+            state = self._load()
+            if state['state'] == CLOSED:
+                return True
+            now = time.time()
+            if state['state'] == OPEN and now < state['opened_until']:
+                return False
+            probe_started = state.get('probe_started')
+            if state['state'] == HALF_OPEN and probe_started is not None and now - probe_started < self.probe_timeout:
+                return False  # another worker is probing
+            state['state'] = HALF_OPEN
+            state['probe_started'] = now
+            state['probe_owner'] = self._owner()
+            self._save(state)
+            log.info("GCV circuit breaker: cool-off over, probing the API")
+            return True
+
+    def release(self):
+        """
+        Gives back the probe slot if this thread holds it but its page never
+        reached GCV (e.g. it was served from the cache), so that the next
+        call probes instead of waiting for the probe timeout. A no-op once
+        on_success or on_failure has been called.
+        """
+        with FileLock(self._lock_path):
+            state = self._load()
+            if state['state'] == HALF_OPEN and state.get('probe_owner') == self._owner():
+                state['probe_started'] = None
+                state['probe_owner'] = None
+                self._save(state)
+                log.debug("GCV circuit breaker: probe page did not reach the API, releasing the probe")
+
+    def on_success(self, latency: float) -> bool:
+        """Records a completed call. A call slower than the latency threshold counts as a failure. Returns True if this opened the circuit."""
+        if self.latency_threshold and latency > self.latency_threshold:
+            log.debug(f"GCV call took {latency:.2f}s, above the circuit breaker threshold")
+            return self.on_failure()
+        with FileLock(self._lock_path):
+            state = self._load()
+            if state['state'] != CLOSED:
+                log.info("GCV circuit breaker: probe succeeded, sending pages to GCV again")
+            if state['state'] != CLOSED or state['failures']:
+                self._save({'state': CLOSED, 'failures': 0, 'opened_until': 0.0, 'probe_started': None,
+                            'probe_owner': None})
+        return False
+
+    def on_failure(self) -> bool:
+        """Records a failed call. Returns True if this opened the circuit."""
+        with FileLock(self._lock_path):
+            state = self._load()
+            state['failures'] += 1
+            if state['state'] == OPEN:
+                # A call that was already under way when the circuit opened
+                self._save(state)
+                return False
+            if state['state'] == HALF_OPEN or state['failures'] >= self.failure_threshold:
+                state['state'] = OPEN
+                state['opened_until'] = time.time() + self.cooloff
+                state['probe_started'] = None
+                state['probe_owner'] = None
+                self._save(state)
+                log.warning(f"GCV circuit breaker opened after {state['failures']} failed or slow calls; "
+                            f"using Tesseract for {self.cooloff:g}s")
+                return True
+            self._save(state)
+            return False
@@ -0,0 +1,163 @@
+# Persistent, content-addressed cache of Google Cloud Vision responses.
+# Shared safely between concurrent ocrmypdf worker processes through SQLite.
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Iterable, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+CACHE_FILENAME = 'gcv_cache.sqlite3'
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def cache_key(content, language_hints: Iterable[str], feature: str, version: str) -> str:
+    """
+    Returns the hex digest identifying one GCV request. Everything that can
+    change the response is part of the key: the exact image bytes, the
+    language hints, the feature type and the plugin version.
+    """
+    digest = hashlib.sha256()
+    digest.update(content)
+    for part in ('+'.join(language_hints), feature, version):
+        digest.update(b'\0')
+        digest.update(part.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache with a size cap and LRU eviction.
+
+    Entries hold serialized AnnotateImageResponse protobufs. A separate
+    'inflight' table lets one process claim a key while it calls the API, so
+    identical pages submitted concurrently by other workers wait for that
+    result instead of sending a second request.
+    """
+
+    def __init__(self, cache_dir, max_bytes: int = DEFAULT_MAX_BYTES,
+                 claim_timeout: float = 300.0, poll_interval: float = 0.1):
+        self.cache_dir = os.fspath(cache_dir)
+        self.path = os.path.join(self.cache_dir, CACHE_FILENAME)
+        self.max_bytes = max_bytes
+        self.claim_timeout = claim_timeout
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._owner_prefix = uuid.uuid4().hex
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                                key TEXT PRIMARY KEY,
+                                payload BLOB NOT NULL,
+                                size INTEGER NOT NULL,
+                                last_used REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used)")
+            conn.execute("""CREATE TABLE IF NOT EXISTS inflight (
+                                key TEXT PRIMARY KEY,
+                                owner TEXT NOT NULL,
+                                started REAL NOT NULL)""")
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections must not cross a fork or be shared between
+        # threads (ocrmypdf --use-threads), so keep one per process and thread.
+        if getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    @property
+    def _owner(self) -> str:
+        return f"{self._owner_prefix}:{os.getpid()}:{threading.get_ident()}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the cached payload for key, or None, and marks it recently used."""
+        conn = self._connect()
+        row = conn.execute("SELECT payload FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        return bytes(row[0])
+
+    def put(self, key: str, payload: bytes):
+        """Stores payload under key, then evicts least recently used entries over the cap."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR REPLACE INTO entries (key, payload, size, last_used) VALUES (?, ?, ?, ?)",
+                         (key, payload, len(payload), time.time()))
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        log.debug(f"Evicted {len(evicted)} GCV cache entries to stay under {self.max_bytes} bytes.")
+
+    def _claim(self, key: str) -> bool:
+        """Marks key as being fetched by this process. False if another live owner holds it."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT owner, started FROM inflight WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] != self._owner and now - row[1] < self.claim_timeout:
+                conn.execute("COMMIT")
+                return False
+            conn.execute("INSERT OR REPLACE INTO inflight (key, owner, started) VALUES (?, ?, ?)",
+                         (key, self._owner, now))
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _release(self, key: str):
+        self._connect().execute("DELETE FROM inflight WHERE key = ? AND owner = ?", (key, self._owner))
+
+    def _contains(self, key: str) -> bool:
+        return self._connect().execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def _is_claimed(self, key: str) -> bool:
+        row = self._connect().execute("SELECT started FROM inflight WHERE key = ?", (key,)).fetchone()
+        return row is not None and time.time() - row[0] < self.claim_timeout
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], bytes]) -> Tuple[bytes, bool]:
+        """
+        Returns (payload, hit). On a miss, either calls fetch() and stores its
+        result, or waits for another process that is already fetching the same
+        key. If fetch() raises, nothing is stored and the claim is dropped so a
+        waiting process can try on its own.
+        """
+        while True:
+            payload = self.get(key)
+            if payload is not None:
+                return payload, True
+            if self._claim(key):
+                try:
+                    payload = fetch()
+                    self.put(key, payload)
+                    return payload, False
+                finally:
+                    self._release(key)
+            log.debug(f"Waiting for another worker to fetch GCV response {key[:12]}...")
+            while self._is_claimed(key) and not self._contains(key):
+                time.sleep(self.poll_interval)
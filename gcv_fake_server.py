@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# Local stand-in for the Google Vision ImageAnnotator API, for load tests and
+# offline runs. It serves BatchAnnotateImages over gRPC, which is also what
+# the client's annotate_image calls, so the plugin can be pointed at it with
+# --gcv-endpoint localhost:PORT --gcv-insecure.
+#
+# Responses are replayed from a directory of recorded responses keyed by the
+# SHA-256 of the image bytes: <hash>.pb (serialized AnnotateImageResponse) or
+# <hash>.json (as the API returns it). Other images get a synthesized
+# response with a configurable number of words. With --record, images
+# missing from the replay directory are sent to the real API once and their
+# responses saved there. Latency and errors can be injected:
+#
+#   python gcv_fake_server.py --port 50051 --replay-dir responses/ \
+#       --latency lognormal:0.4,0.5 --quota-error-rate 0.05 --deadline-error-rate 0.01
+#
+# The server can also run inside a test or benchmark, see FakeVisionServer.
+
+import argparse
+import hashlib
+import io
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent import futures
+from typing import Callable, Dict, Optional
+
+import grpc
+from google.cloud import vision
+
+from gcv_locking import atomic_write
+
+log = logging.getLogger(__name__)
+
+SERVICE_NAME = 'google.cloud.vision.v1.ImageAnnotator'
+
+# Page size used when a synthesized response is for an image that cannot be decoded
+DEFAULT_PAGE_SIZE = (2550, 3300)
+
+_LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parses a latency distribution, in seconds, into a function drawing one
+    delay from a random.Random:
+
+      none                  no delay
+      fixed:S               always S
+      uniform:A,B           uniform between A and B
+      exponential:MEAN      exponential with the given mean
+      lognormal:MEDIAN,SIGMA  log-normal, a long-tailed fit for API latencies
+    """
+    name, _, args = spec.partition(':')
+    try:
+        values = [float(value) for value in args.split(',')] if args else []
+    except ValueError:
+        raise ValueError(f"Invalid latency parameters in '{spec}'") from None
+    if any(value < 0 for value in values):
+        raise ValueError(f"Latency parameters must not be negative: '{spec}'")
+    if name == 'none' and not values:
+        return lambda rnd: 0.0
+    if name == 'fixed' and len(values) == 1:
+        return lambda rnd: values[0]
+    if name == 'uniform' and len(values) == 2:
+        return lambda rnd: rnd.uniform(values[0], values[1])
+    if name == 'exponential' and len(values) == 1 and values[0] > 0:
+        return lambda rnd: rnd.expovariate(1.0 / values[0])
+    if name == 'lognormal' and len(values) == 2 and values[0] > 0:
+        mu = math.log(values[0])
+        return lambda rnd: rnd.lognormvariate(mu, values[1])
+    raise ValueError(f"Invalid latency distribution '{spec}', expected none, fixed:S, uniform:A,B, "
+                     "exponential:MEAN or lognormal:MEDIAN,SIGMA")
+
+
+def image_hash(content: bytes) -> str:
+    """Key of a recorded response: the SHA-256 of the image bytes as uploaded."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def synthesize_response(content: bytes, words: int) -> 'vision.AnnotateImageResponse':
+    """
+    Returns a DOCUMENT_TEXT_DETECTION response with the given number of
+    words laid out in lines, paragraphs and blocks across the image. The
+    words depend only on the image bytes, so repeated requests agree.
+    """
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(content)) as img:
+            width, height = img.size
+    except Exception:
+        width, height = DEFAULT_PAGE_SIZE
+    rnd = random.Random(content)
+    line_height = max(4, height // 100)
+    margin = max(line_height, width // 20)
+    space = line_height // 2
+    break_types = vision.TextAnnotation.DetectedBreak.BreakType
+
+    blocks = []
+    paragraph = None
+    texts = []
+    x, y = margin, margin
+    lines_in_paragraph = 0
+    for index in range(words):
+        text = ''.join(rnd.choice(_LETTERS) for _ in range(rnd.randint(2, 9)))
+        word_width = len(text) * line_height * 6 // 10
+        if paragraph is None or x + word_width > width - margin:
+            if paragraph is not None:
+                paragraph['words'][-1]['symbols'][-1]['property']['detected_break']['type_'] = break_types.EOL_SURE_SPACE
+                x = margin
+                y += line_height * 3 // 2
+                lines_in_paragraph += 1
+            if y + line_height > height - margin:
+                y = margin  # full page, start over on top of it
+            if paragraph is None or lines_in_paragraph == 5:
+                paragraph = {'words': []}
+                lines_in_paragraph = 0
+                if not blocks or len(blocks[-1]['paragraphs']) == 2:
+                    blocks.append({'paragraphs': []})
+                blocks[-1]['paragraphs'].append(paragraph)
+        box = {'vertices': [{'x': x, 'y': y}, {'x': x + word_width, 'y': y},
+                            {'x': x + word_width, 'y': y + line_height}, {'x': x, 'y': y + line_height}]}
+        symbols = [{'text': letter} for letter in text]
+        last = index + 1 == words
+        symbols[-1]['property'] = {'detected_break': {'type_': break_types.LINE_BREAK if last else break_types.SPACE}}
+        paragraph['words'].append({'bounding_box': box, 'symbols': symbols})
+        texts.append(text)
+        x += word_width + space
+
+    for block in blocks:
+        block_box = _enclosing_box(word['bounding_box'] for paragraph in block['paragraphs'] for word in paragraph['words'])
+        block['bounding_box'] = block_box
+        for paragraph in block['paragraphs']:
+            paragraph['bounding_box'] = _enclosing_box(word['bounding_box'] for word in paragraph['words'])
+    annotation = {
+        'text': ' '.join(texts) + '\n' if texts else '',
+        'pages': [{'width': width, 'height': height, 'blocks': blocks}],
+    }
+    return vision.AnnotateImageResponse(full_text_annotation=annotation)
+
+
+def _enclosing_box(boxes):
+    xs, ys = [], []
+    for box in boxes:
+        xs.extend(vertex['x'] for vertex in box['vertices'])
+        ys.extend(vertex['y'] for vertex in box['vertices'])
+    return {'vertices': [{'x': min(xs), 'y': min(ys)}, {'x': max(xs), 'y': min(ys)},
+                         {'x': max(xs), 'y': max(ys)}, {'x': min(xs), 'y': max(ys)}]}
+
+
+class FakeVisionServer:
+    """
+    gRPC server answering ImageAnnotator.BatchAnnotateImages.
+
+    Each call is first delayed by a draw from latency, then may fail as a
+    whole: with RESOURCE_EXHAUSTED (what the API returns as 429) at
+    quota_error_rate, UNAVAILABLE at unavailable_rate, or at
+    deadline_error_rate by not answering until the caller's deadline has
+    passed. Otherwise every image is answered from replay_dir if it holds a
+    recorded response, from the real API if record is set (saving the
+    response in replay_dir), or with a synthesized response of words words.
+    """
+
+    def __init__(self, replay_dir: Optional[str] = None, record: bool = False, words: int = 200,
+                 latency: Optional[Callable[[random.Random], float]] = None,
+                 quota_error_rate: float = 0.0, deadline_error_rate: float = 0.0,
+                 unavailable_rate: float = 0.0, seed: Optional[int] = None, max_workers: int = 32):
+        if record and not replay_dir:
+            raise ValueError("Recording needs a replay directory to save responses in")
+        self.replay_dir = replay_dir
+        self.record = record
+        self.words = words
+        self.latency = latency or parse_latency('none')
+        self.quota_error_rate = quota_error_rate
+        self.deadline_error_rate = deadline_error_rate
+        self.unavailable_rate = unavailable_rate
+        self.max_workers = max_workers
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self._upstream = None
+        self._upstream_lock = threading.Lock()
+        self._server = None
+        self.endpoint = None
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Starts serving and returns the endpoint, host:port. Port 0 picks a free port."""
+        handler = grpc.method_handlers_generic_handler(SERVICE_NAME, {
+            'BatchAnnotateImages': grpc.unary_unary_rpc_method_handler(
+                self._batch_annotate_images,
+                request_deserializer=vision.BatchAnnotateImagesRequest.deserialize,
+                response_serializer=vision.BatchAnnotateImagesResponse.serialize,
+            ),
+        })
+        self._server = grpc.server(futures.ThreadPoolExecutor(max_workers=self.max_workers),
+                                   options=[("grpc.max_receive_message_length", -1),
+                                            ("grpc.max_send_message_length", -1)])
+        self._server.add_generic_rpc_handlers((handler,))
+        bound_port = self._server.add_insecure_port(f"{host}:{port}")
+        self._server.start()
+        self.endpoint = f"{host}:{bound_port}"
+        log.info(f"Fake Vision API listening on {self.endpoint}")
+        return self.endpoint
+
+    def stop(self, grace: Optional[float] = None):
+        if self._server is not None:
+            self._server.stop(grace).wait()
+            self._server = None
+
+    def wait(self):
+        self._server.wait_for_termination()
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of requests, images and how they were answered."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[name] = self._stats.get(name, 0) + amount
+
+    def _draw(self):
+        with self._random_lock:
+            return self.latency(self._random), self._random.random()
+
+    def _batch_annotate_images(self, request, context):
+        self._count('requests')
+        self._count('images', len(request.requests))
+        delay, roll = self._draw()
+
+        if roll < self.deadline_error_rate:
+            self._count('deadline_errors')
+            remaining = context.time_remaining()
+            if remaining is not None and remaining < 3600:
+                time.sleep(remaining + 0.05)
+            context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, "Deadline exceeded (injected by the fake server)")
+        roll -= self.deadline_error_rate
+
+        if delay:
+            time.sleep(delay)
+        if roll < self.quota_error_rate:
+            self._count('quota_errors')
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Quota exceeded (injected by the fake server)")
+        roll -= self.quota_error_rate
+        if roll < self.unavailable_rate:
+            self._count('unavailable_errors')
+            context.abort(grpc.StatusCode.UNAVAILABLE, "Service unavailable (injected by the fake server)")
+
+        return vision.BatchAnnotateImagesResponse(
+            responses=[self._annotate(image_request) for image_request in request.requests])
+
+    def _annotate(self, image_request) -> 'vision.AnnotateImageResponse':
+        content = image_request.image.content
+        if not content:
+            self._count('synthesized')
+            return synthesize_response(b'', self.words)
+        key = image_hash(content)
+        response = self._replay(key)
+        if response is not None:
+            self._count('replayed')
+            return response
+        if self.record:
+            response = self._record(key, image_request)
+            self._count('recorded')
+            return response
+        self._count('synthesized')
+        return synthesize_response(content, self.words)
+
+    def _replay(self, key: str) -> Optional['vision.AnnotateImageResponse']:
+        if not self.replay_dir:
+            return None
+        path = os.path.join(self.replay_dir, key)
+        try:
+            with open(path + '.pb', 'rb') as f:
+                return vision.AnnotateImageResponse.deserialize(f.read())
+        except FileNotFoundError:
+            pass
+        try:
+            with open(path + '.json', encoding='utf-8') as f:
+                return vision.AnnotateImageResponse.from_json(f.read(), ignore_unknown_fields=True)
+        except FileNotFoundError:
+            return None
+
+    def _record(self, key: str, image_request) -> 'vision.AnnotateImageResponse':
+        with self._upstream_lock:
+            if self._upstream is None:
+                # Application Default Credentials, as the plugin uses without a key file
+                self._upstream = vision.ImageAnnotatorClient()
+        response = self._upstream.batch_annotate_images(requests=[image_request]).responses[0]
+        if not response.error.message:
+            os.makedirs(self.replay_dir, exist_ok=True)
+            atomic_write(os.path.join(self.replay_dir, key + '.pb'), vision.AnnotateImageResponse.serialize(response))
+        return response
+
+
+def _rate(value: str) -> float:
+    rate = float(value)
+    if not 0 <= rate <= 1:
+        raise argparse.ArgumentTypeError("rates must be between 0 and 1")
+    return rate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake Google Vision API for load tests and offline runs.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on. Default: 127.0.0.1")
+    parser.add_argument('--port', type=int, default=50051, help="Port to listen on, 0 for any free port. Default: 50051")
+    parser.add_argument('--replay-dir', help="Directory of recorded responses, <sha256 of image>.pb or .json")
+    parser.add_argument('--record', action='store_true',
+                        help="Send images without a recorded response to the real API (using Application "
+                             "Default Credentials) and save the responses in --replay-dir")
+    parser.add_argument('--words', type=int, default=200, help="Words in synthesized responses. Default: 200")
+    parser.add_argument('--latency', type=parse_latency, default=parse_latency('none'), metavar='DIST',
+                        help="Delay before each answer: none, fixed:S, uniform:A,B, exponential:MEAN or "
+                             "lognormal:MEDIAN,SIGMA, in seconds. Default: none")
+    parser.add_argument('--quota-error-rate', type=_rate, default=0.0,
+                        help="Share of calls failing with RESOURCE_EXHAUSTED (429)")
+    parser.add_argument('--deadline-error-rate', type=_rate, default=0.0,
+                        help="Share of calls left unanswered until the client's deadline passes")
+    parser.add_argument('--unavailable-rate', type=_rate, default=0.0,
+                        help="Share of calls failing with UNAVAILABLE")
+    parser.add_argument('--seed', type=int, help="Seed for latencies and injected errors")
+    parser.add_argument('--workers', type=int, default=32, help="Calls served concurrently. Default: 32")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        server = FakeVisionServer(
+            replay_dir=args.replay_dir, record=args.record, words=args.words, latency=args.latency,
+            quota_error_rate=args.quota_error_rate, deadline_error_rate=args.deadline_error_rate,
+            unavailable_rate=args.unavailable_rate, seed=args.seed, max_workers=args.workers,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    endpoint = server.start(args.host, args.port)
+    print(f"Use: ocrmypdf --plugin gvision.py --gcv-endpoint {endpoint} --gcv-insecure ...", file=sys.stderr)
+    try:
+        server.wait()
+    except KeyboardInterrupt:
+        server.stop(grace=1.0)
+    summary = ", ".join(f"{name}={value}" for name, value in sorted(server.stats().items()))
+    log.info(f"Fake Vision API statistics: {summary or 'no requests'}")
+
+
+if __name__ == '__main__':
+    main()
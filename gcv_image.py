@@ -0,0 +1,124 @@
+# Page images for the Google Vision plugin, read once per page operation.
+# The DPI probe, the blank page check, upload preprocessing, the cache key
+# and the request payload all need the page image; gvision loads it with
+# loaded() around a page operation, and every stage gets the same buffer
+# from page_image(). Large files are memory-mapped instead of read.
+
+import contextlib
+import io
+import mmap
+import os
+import pathlib
+import threading
+from typing import Optional, Union
+
+from PIL import Image
+
+import gcv_trace
+
+# Files at least this large are memory-mapped
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+# The page image of the page operation running on the current thread
+_local = threading.local()
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only file object over a bytes-like buffer, for Image.open, without copying the buffer."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        count = max(0, min(len(target), len(self._view) - self._position))
+        target[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+class PageImage:
+    """The bytes of one page image file, read or memory-mapped on first use."""
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = pathlib.Path(path)
+        self.bytes_read = 0
+        self._data: Optional[Union[bytes, mmap.mmap]] = None
+
+    @property
+    def data(self) -> Union[bytes, mmap.mmap]:
+        """The file's bytes: a bytes object, or an mmap for large files. Both support the buffer protocol."""
+        if self._data is None:
+            with gcv_trace.stage('image_read'):
+                with open(self.path, 'rb') as f:
+                    size = os.fstat(f.fileno()).st_size
+                    if size >= MMAP_THRESHOLD:
+                        self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    else:
+                        self._data = f.read()
+            self.bytes_read += len(self._data)
+        return self._data
+
+    def open(self) -> Image.Image:
+        """Opens the image with Pillow from the shared buffer."""
+        return Image.open(BufferReader(self.data))
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            try:
+                self._data.close()
+            except BufferError:
+                pass  # still exported, e.g. by an unclosed image; closed when collected
+        self._data = None
+
+
+@contextlib.contextmanager
+def loaded(path: Union[str, os.PathLike]):
+    """
+    Makes the image at path the current thread's page image for the with
+    block, so that page_image() hands every stage the same buffer.
+    """
+    outer = getattr(_local, 'page', None)
+    page = PageImage(path)
+    _local.page = page
+    try:
+        yield page
+    finally:
+        _local.page = outer
+        page.close()
+
+
+def page_image(path: Union[str, os.PathLike]) -> PageImage:
+    """The current page image if it is the one at path, else the image at path on its own."""
+    page = getattr(_local, 'page', None)
+    if page is not None and page.path == pathlib.Path(path):
+        return page
+    return PageImage(path)
+
+
+def as_bytes(content) -> bytes:
+    """content as bytes, copying only if it is another kind of buffer (protobuf fields need bytes)."""
+    return content if isinstance(content, bytes) else bytes(content)
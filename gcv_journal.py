@@ -0,0 +1,81 @@
+# Journal of the GCV responses of an input document, for resuming runs.
+# When an ocrmypdf run dies part way through a long document (out of memory,
+# a preempted machine, a quota error), the pages it finished are in the
+# journal, and a rerun with the same journal reuses them and only sends the
+# missing pages to the API. Each page is one file, written atomically and
+# with a checksum, so a crash while writing costs at most that page.
+
+import hashlib
+import json
+import logging
+import os
+from typing import Optional, Tuple
+
+from gcv_locking import atomic_write
+
+log = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+
+
+def document_key(path) -> str:
+    """Identifies an input document by its absolute path, size and modification time."""
+    path = os.path.abspath(os.fspath(path))
+    st = os.stat(path)
+    return hashlib.sha256(f"{path}\0{st.st_size}\0{st.st_mtime_ns}".encode('utf-8')).hexdigest()
+
+
+class PageJournal:
+    """
+    The journaled pages of one document. Each entry holds a page's
+    serialized AnnotateImageResponse, the key of the request it answers
+    (page image and settings, see gcv_cache.cache_key) and the scale factors
+    of the image that was uploaded.
+    """
+
+    def __init__(self, journal_dir, document: str):
+        self.directory = os.path.join(os.fspath(journal_dir), document[:32])
+        os.makedirs(self.directory, exist_ok=True)
+
+    def describe(self, source):
+        """Records which file the journal is for, for whoever looks into the directory."""
+        path = os.path.join(self.directory, 'document.json')
+        if not os.path.exists(path):
+            atomic_write(path, json.dumps({'input_file': os.path.abspath(os.fspath(source))}).encode('utf-8'))
+
+    def _path(self, page: int) -> str:
+        return os.path.join(self.directory, f"page-{page:06d}.gcv")
+
+    def pages(self) -> int:
+        """Number of pages in the journal."""
+        return sum(1 for name in os.listdir(self.directory) if name.startswith('page-') and name.endswith('.gcv'))
+
+    def get(self, page: int, request_key: str) -> Optional[Tuple[bytes, float, float]]:
+        """
+        Returns (payload, scale_x, scale_y) journaled for the page, or None if
+        there is none, it is damaged, or it answers a different request.
+        """
+        try:
+            with open(self._path(page), 'rb') as f:
+                header = json.loads(f.readline())
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warning(f"Ignoring unreadable GCV journal entry for page {page}: {e}")
+            return None
+        if not isinstance(header, dict) or header.get('version') != JOURNAL_VERSION \
+                or header.get('size') != len(payload) or header.get('sha256') != hashlib.sha256(payload).hexdigest():
+            log.warning(f"Ignoring damaged GCV journal entry for page {page}")
+            return None
+        if header.get('request') != request_key:
+            log.info(f"GCV journal entry for page {page} is for another page image or other settings, not using it")
+            return None
+        return payload, header['scale_x'], header['scale_y']
+
+    def put(self, page: int, request_key: str, payload: bytes, scale_x: float, scale_y: float):
+        """Journals a page's response; the entry is on disk when this returns."""
+        header = {'version': JOURNAL_VERSION, 'page': page, 'request': request_key,
+                  'scale_x': scale_x, 'scale_y': scale_y,
+                  'size': len(payload), 'sha256': hashlib.sha256(payload).hexdigest()}
+        atomic_write(self._path(page), json.dumps(header).encode('utf-8') + b'\n' + payload, durable=True)
@@ -0,0 +1,84 @@
+# Page orientation and skew estimated from a Google Vision text annotation.
+# GCV lists the vertices of every word in reading order (top-left,
+# top-right, bottom-right, bottom-left of the text as it is read), whatever
+# the rotation of the page, so the direction from vertex 0 to vertex 1 is
+# the direction the text runs in.
+
+import math
+from typing import List, Tuple
+
+# Tesseract's orientation confidences are on a similar scale; ocrmypdf
+# rotates pages at --rotate-pages-threshold, 14 by default
+MAX_CONFIDENCE = 30.0
+# Fewer words than this scale the confidence down proportionally
+FULL_CONFIDENCE_WORDS = 20
+
+
+def word_directions(annotation) -> List[Tuple[float, float]]:
+    """
+    Returns (angle, weight) for every word of a TextAnnotation (proto-plus or
+    raw protobuf). angle is the clockwise rotation of the text direction in
+    degrees, 0 <= angle < 360, in image coordinates; weight is the number of
+    symbols in the word.
+    """
+    to_pb = getattr(type(annotation), 'pb', None)
+    if to_pb is not None:
+        annotation = to_pb(annotation)
+    directions = []
+    for page in annotation.pages:
+        for block in page.blocks:
+            for paragraph in block.paragraphs:
+                for word in paragraph.words:
+                    vertices = word.bounding_box.vertices
+                    if len(vertices) < 2:
+                        continue
+                    dx = vertices[1].x - vertices[0].x
+                    dy = vertices[1].y - vertices[0].y
+                    if dx == 0 and dy == 0:
+                        continue
+                    # Image y grows downwards, so a positive angle is clockwise
+                    angle = math.degrees(math.atan2(dy, dx)) % 360.0
+                    directions.append((angle, float(max(1, len(word.symbols)))))
+    return directions
+
+
+def estimate_orientation(directions: List[Tuple[float, float]]) -> Tuple[int, float]:
+    """
+    Returns (angle, confidence): the clockwise page rotation in multiples of
+    90 degrees that most of the text agrees on, and a confidence from 0 to
+    MAX_CONFIDENCE that grows with the share of the text agreeing and with
+    the number of words.
+    """
+    if not directions:
+        return 0, 0.0
+    votes = {0: 0.0, 90: 0.0, 180: 0.0, 270: 0.0}
+    for angle, weight in directions:
+        votes[int(round(angle / 90.0)) % 4 * 90] += weight
+    orientation = max(votes, key=votes.get)
+    agreement = votes[orientation] / sum(votes.values())
+    confidence = MAX_CONFIDENCE * max(0.0, 2.0 * agreement - 1.0) * min(1.0, len(directions) / FULL_CONFIDENCE_WORDS)
+    return orientation, confidence
+
+
+def estimate_skew(directions: List[Tuple[float, float]], orientation: int = 0) -> float:
+    """
+    Returns the skew of the text relative to the given orientation in
+    degrees, as the weighted median over the words. Positive means the text
+    runs clockwise of the orientation; rotating the image counterclockwise
+    by this angle (PIL's Image.rotate) straightens it.
+    """
+    residuals = []
+    for angle, weight in directions:
+        residual = (angle - orientation + 180.0) % 360.0 - 180.0
+        if abs(residual) <= 45.0:
+            residuals.append((residual, weight))
+    if not residuals:
+        return 0.0
+    residuals.sort()
+    half = sum(weight for _, weight in residuals) / 2.0
+    running = 0.0
+    for residual, weight in residuals:
+        running += weight
+        if running >= half:
+            return residual
+    return residuals[-1][0]
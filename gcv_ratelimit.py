@@ -0,0 +1,95 @@
+# Adaptive token-bucket rate limiter shared by all workers of an ocrmypdf run.
+# The bucket state lives in a small JSON file guarded by a file lock, so every
+# worker process draws from the same budget. The refill rate follows an
+# additive-increase / multiplicative-decrease (AIMD) rule: it creeps up after
+# successful calls and is cut sharply when the API reports quota exhaustion
+# (or, optionally, when latency exceeds a target).
+
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+from gcv_locking import FileLock, atomic_write
+
+log = logging.getLogger(__name__)
+
+
+class AdaptiveRateLimiter:
+    """Cross-process AIMD token bucket. Rates are in requests (images) per second."""
+
+    def __init__(self, state_dir, max_rate: float, min_rate: float = 0.5,
+                 increase: float = 0.1, decrease: float = 0.5,
+                 latency_target: Optional[float] = None):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        # Allow up to one second's worth of requests in a burst
+        self.capacity = max(1.0, max_rate)
+        os.makedirs(os.fspath(state_dir), exist_ok=True)
+        self._state_path = os.path.join(os.fspath(state_dir), 'ratelimit.json')
+        self._lock_path = os.path.join(os.fspath(state_dir), 'ratelimit.lock')
+
+    def _load(self) -> dict:
+        try:
+            with open(self._state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'rate': self.max_rate, 'tokens': self.capacity, 'updated': time.time()}
+
+    def _save(self, state: dict):
+        atomic_write(self._state_path, json.dumps(state).encode('utf-8'))
+
+    def _refill(self, state: dict, now: float):
+        elapsed = max(0.0, now - state['updated'])
+        state['tokens'] = min(self.capacity, state['tokens'] + elapsed * state['rate'])
+        state['updated'] = now
+
+    def acquire(self, cost: float = 1.0) -> float:
+        """
+        Blocks until cost tokens are available and takes them. A cost larger
+        than the bucket (a big batch) is allowed once the bucket is full and
+        leaves it in debt. Returns the time spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with FileLock(self._lock_path):
+                state = self._load()
+                now = time.time()
+                self._refill(state, now)
+                needed = min(cost, self.capacity)
+                if state['tokens'] >= needed:
+                    state['tokens'] -= cost
+                    self._save(state)
+                    return waited
+                delay = (needed - state['tokens']) / state['rate']
+                self._save(state)
+            time.sleep(delay)
+            waited += delay
+
+    def _adjust(self, factor: float = 1.0, step: float = 0.0, drain: bool = False) -> float:
+        with FileLock(self._lock_path):
+            state = self._load()
+            self._refill(state, time.time())
+            state['rate'] = min(self.max_rate, max(self.min_rate, state['rate'] * factor + step))
+            if drain:
+                state['tokens'] = min(state['tokens'], 0.0)
+            self._save(state)
+            return state['rate']
+
+    def on_success(self, latency: float):
+        """Additive increase, or a gentle decrease if the call was slower than the latency target."""
+        if self.latency_target and latency > self.latency_target:
+            rate = self._adjust(factor=0.9)
+            log.debug(f"GCV latency {latency:.2f}s above target, rate lowered to {rate:.2f}/s")
+        else:
+            self._adjust(step=self.increase)
+
+    def on_quota_error(self) -> float:
+        """Multiplicative decrease after a 429 / RESOURCE_EXHAUSTED. Returns the new rate."""
+        rate = self._adjust(factor=self.decrease, drain=True)
+        log.warning(f"GCV quota exceeded, request rate lowered to {rate:.2f}/s")
+        return rate
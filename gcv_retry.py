@@ -0,0 +1,129 @@
+# Deadline, retry and hedged-request policy for Google Vision API calls.
+
+import collections
+import concurrent.futures
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional, Tuple, Type
+
+log = logging.getLogger(__name__)
+
+
+class CallPolicy:
+    """
+    Runs an API call with a per-attempt deadline, retries transient errors
+    with full-jitter exponential backoff and, optionally, hedges slow calls.
+
+    Hedging: once an attempt has been running longer than the given
+    percentile of recently observed latencies, an identical duplicate is
+    started, with the full per-attempt deadline, and whichever finishes
+    first wins. Percentiles are only trusted
+    after hedge_min_samples calls have completed in this process.
+
+    on_event(name) is called for 'retries', 'hedges' and 'hedge_wins' so the
+    caller can count them.
+    """
+
+    def __init__(self,
+                 deadline: Optional[float] = None,
+                 max_retries: int = 3,
+                 backoff_initial: float = 1.0,
+                 backoff_max: float = 32.0,
+                 retryable: Tuple[Type[BaseException], ...] = (),
+                 hedge_percentile: Optional[float] = None,
+                 hedge_min_samples: int = 20,
+                 history: int = 200,
+                 on_event: Optional[Callable[[str], None]] = None):
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.retryable = retryable
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.on_event = on_event or (lambda name: None)
+        self._latencies = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Latency percentile after which a hedge is sent, or None if hedging is off or untrained."""
+        if not self.hedge_percentile:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100.0))
+        return ordered[index]
+
+    def backoff(self, retry_number: int) -> float:
+        """Full jitter: uniform between 0 and the capped exponential step."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_initial * (2 ** retry_number)))
+
+    def run(self, call: Callable[[Optional[float]], object]):
+        """
+        Calls call(timeout) until it succeeds, a non-retryable error is raised,
+        or max_retries is exhausted (the last error is re-raised).
+        """
+        retry_number = 0
+        while True:
+            try:
+                return self._attempt(call)
+            except self.retryable as e:
+                if retry_number >= self.max_retries:
+                    raise
+                delay = self.backoff(retry_number)
+                retry_number += 1
+                self.on_event('retries')
+                log.warning(f"Transient GCV error ({type(e).__name__}: {e}); "
+                            f"retry {retry_number}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _timed(self, call, timeout):
+        started = time.monotonic()
+        result = call(timeout)
+        self._record_latency(time.monotonic() - started)
+        return result
+
+    def _pool(self) -> concurrent.futures.ThreadPoolExecutor:
+        """The thread pool running hedged attempts, created on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix='gcv-hedge')
+            return self._executor
+
+    def _attempt(self, call):
+        hedge_after = self.hedge_delay()
+        if hedge_after is None:
+            return self._timed(call, self.deadline)
+
+        executor = self._pool()
+        primary = executor.submit(self._timed, call, self.deadline)
+        try:
+            return primary.result(timeout=hedge_after)
+        except concurrent.futures.TimeoutError:
+            pass
+
+        self.on_event('hedges')
+        log.debug(f"GCV call slower than p{self.hedge_percentile:g} ({hedge_after:.2f}s), sending hedged request")
+        # The hedge gets a deadline of its own: what is left of the primary's
+        # can be close to nothing, and a request cancelled at once is still billed
+        hedge = executor.submit(self._timed, call, self.deadline)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.on_event('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
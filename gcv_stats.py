@@ -0,0 +1,44 @@
+# Run-wide counters for the Google Vision plugin.
+# Every worker appends increments to a file in the run directory; the main
+# process adds them up and reports them when the run ends.
+
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+log = logging.getLogger(__name__)
+
+STATS_FILENAME = 'stats.jsonl'
+
+
+def increment(run_dir: Optional[str], name: str, amount: float = 1):
+    """Adds amount to the named counter. A no-op when there is no run directory."""
+    if not run_dir:
+        return
+    line = (json.dumps({'name': name, 'value': amount}) + '\n').encode('utf-8')
+    try:
+        # A single O_APPEND write of a short line is not interleaved with other writers
+        fd = os.open(os.path.join(run_dir, STATS_FILENAME), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        log.debug(f"Could not record statistic {name}: {e}")
+
+
+def totals(run_dir: str) -> Dict[str, float]:
+    """Returns the summed counters recorded so far in run_dir."""
+    result: Dict[str, float] = {}
+    try:
+        with open(os.path.join(run_dir, STATS_FILENAME), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                result[entry['name']] = result.get(entry['name'], 0) + entry['value']
+    except FileNotFoundError:
+        pass
+    return result
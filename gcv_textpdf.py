@@ -0,0 +1,158 @@
+# Text-only PDF output for the Google Vision plugin.
+# ocrmypdf's sandwich renderer lays a PDF holding nothing but invisible text
+# over each page image. This module writes that PDF straight from the
+# converted page tree, so no hOCR file is written and parsed again.
+# Helvetica only encodes Western European text; without --gcv-pdf-font,
+# words with other characters are set in ocrmypdf's glyphless font, which
+# maps every character to one blank glyph and so covers all of Unicode.
+
+import logging
+import os
+import threading
+from typing import Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FONT = 'Helvetica'
+GLYPHLESS_FONT = 'GCVGlyphless'
+# Advance width of the glyphless glyph, in 1/1000 em, as in ocrmypdf's hOCR renderer
+GLYPHLESS_WIDTH = 500
+LETTER_SIZE = (612.0, 792.0)
+
+# reportlab's font registry is global to the process
+_fonts_lock = threading.Lock()
+_registered_fonts = {}
+
+
+def _register_font(font_path: Optional[str]) -> str:
+    """Returns the reportlab name of the font to use, registering a TrueType font on first use."""
+    if not font_path:
+        return DEFAULT_FONT
+    font_path = os.path.abspath(font_path)
+    with _fonts_lock:
+        if font_path not in _registered_fonts:
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont
+            name = f"GCVText{len(_registered_fonts)}"
+            pdfmetrics.registerFont(TTFont(name, font_path))
+            _registered_fonts[font_path] = name
+        return _registered_fonts[font_path]
+
+
+class _AnyCharacter(dict):
+    """A character to glyph map that sends every character to the glyphless glyph."""
+
+    def __contains__(self, code):
+        return True
+
+    def __missing__(self, code):
+        return 1
+
+
+def _register_glyphless_font() -> str:
+    """
+    Registers ocrmypdf's glyphless TrueType font (the one Tesseract and the
+    hOCR renderer use) on first use. reportlab cannot read its cmap, so every
+    character is mapped to its one glyph here; the PDF's ToUnicode map still
+    gives the real characters to text extraction and search.
+    """
+    with _fonts_lock:
+        if GLYPHLESS_FONT not in _registered_fonts:
+            import ocrmypdf
+            from reportlab import rl_config
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont
+            font_path = os.path.join(os.path.dirname(ocrmypdf.__file__), 'data', 'pdf.ttf')
+            # The font has no name table; this reportlab setting, unset by
+            # default, names it after its file instead
+            missing_name = getattr(rl_config, 'autoGenerateTTFMissingTTFName', False)
+            rl_config.autoGenerateTTFMissingTTFName = True
+            try:
+                font = TTFont(GLYPHLESS_FONT, font_path)
+            finally:
+                rl_config.autoGenerateTTFMissingTTFName = missing_name
+            font.face.charToGlyph = _AnyCharacter()
+            font.face.defaultWidth = GLYPHLESS_WIDTH
+            pdfmetrics.registerFont(font)
+            _registered_fonts[GLYPHLESS_FONT] = GLYPHLESS_FONT
+        return GLYPHLESS_FONT
+
+
+def _lines(element):
+    """Yields the ocr_line elements of a page tree in reading order."""
+    if element.ocr_class == 'ocr_line':
+        yield element
+    elif isinstance(element.content, list):
+        for child in element.content:
+            yield from _lines(child)
+
+
+def _unencodable(text: str) -> bool:
+    try:
+        text.encode('cp1252')
+        return False
+    except UnicodeEncodeError:
+        return True
+
+
+def write_text_pdf(document, output_pdf, blank_size: Tuple[float, float] = LETTER_SIZE,
+                   font_path: Optional[str] = None, title: Optional[str] = None,
+                   creator: Optional[str] = None):
+    """
+    Writes the pages of a gcv2hocr2.GCVDocument as a PDF of invisible text
+    (text render mode 3), one PDF page per document page, sized in points
+    like the page image. Each word is set on its line's baseline at the
+    line's estimated font size and stretched horizontally to the width of
+    its box, with a stretched space between words so that text selection
+    and search find the word boundaries. blank_size is the page size used
+    for pages without text, which carry no size of their own. With the
+    default font, words it cannot encode are set in the glyphless font.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfgen import canvas
+
+    font = _register_font(font_path)
+    pdf = canvas.Canvas(os.fspath(output_pdf), pageCompression=1)
+    if title:
+        pdf.setTitle(title)
+    if creator:
+        pdf.setCreator(creator)
+        pdf.setProducer(creator)
+
+    for page in document:
+        width = page.context.page_width_pt
+        height = page.context.page_height_pt
+        if not (width > 0 and height > 0):
+            width, height = blank_size
+        pdf.setPageSize((width, height))
+
+        text = pdf.beginText()
+        text.setTextRenderMode(3)  # invisible
+        for line in _lines(page):
+            words = [word for word in line.content if word.content and not word.content.isspace()]
+            if not words:
+                continue
+            font_size = line.font_size_pt()
+            baseline = line.baseline_pt()
+            if baseline is None:
+                baseline = line.y0
+            for index, word in enumerate(words):
+                word_font = font
+                if font == DEFAULT_FONT and _unencodable(word.content):
+                    word_font = _register_glyphless_font()
+                text.setFont(word_font, font_size)
+                text.setTextOrigin(word.x0, baseline)
+                natural_width = pdfmetrics.stringWidth(word.content, word_font, font_size)
+                box_width = word.x1 - word.x0
+                text.setHorizScale(100.0 * box_width / natural_width if natural_width > 0 and box_width > 0 else 100.0)
+                text.textOut(word.content)
+                if index + 1 < len(words):
+                    gap = words[index + 1].x0 - word.x1
+                    space_width = pdfmetrics.stringWidth(' ', word_font, font_size)
+                    if gap > 0 and space_width > 0:
+                        text.setHorizScale(100.0 * gap / space_width)
+                        text.textOut(' ')
+        pdf.drawText(text)
+        pdf.showPage()
+
+    pdf.save()
@@ -0,0 +1,259 @@
+# Per-page stage timing for the Google Vision plugin.
+# With --gcv-trace or --gcv-prometheus, every page operation (OCR, or an
+# orientation or deskew check) records how long each of its stages took,
+# the request and response sizes and the errors it ran into. Workers append
+# one JSON line per operation to a file in the run directory; when the run
+# ends, the main process copies the lines to the --gcv-trace file and
+# summarizes them in Prometheus text format for the node_exporter textfile
+# collector.
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from gcv_locking import atomic_write
+
+log = logging.getLogger(__name__)
+
+TRACE_FILENAME = 'trace.jsonl'
+
+# Upper bounds of the stage duration histogram buckets, in seconds
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_PREFIX = 'ocrmypdf_gcv'
+
+# The page operation the current thread is working on, if it is traced
+_local = threading.local()
+
+
+class PageTrace:
+    """Timings, sizes and errors of one page operation, as one trace record."""
+
+    def __init__(self, page: str, operation: str):
+        self.record = {
+            'page': page,
+            'operation': operation,
+            'pid': os.getpid(),
+            'started': round(time.time(), 6),
+            'stages': {},
+            'errors': {},
+            'counts': {},
+        }
+
+    def add_stage(self, name: str, seconds: float):
+        stages = self.record['stages']
+        stages[name] = stages.get(name, 0.0) + seconds
+
+    def add_error(self, name: str, error: BaseException):
+        key = f"{name}:{type(error).__name__}"
+        self.record['errors'][key] = self.record['errors'].get(key, 0) + 1
+
+
+@contextlib.contextmanager
+def page(run_dir: Optional[str], page_name: str, operation: str, enabled: bool = True):
+    """
+    Traces the page operation run in the with block on this thread. The
+    record is appended to the run directory's trace file when the block
+    ends, also if it raises. A no-op unless enabled and run_dir are set.
+    """
+    if not (enabled and run_dir):
+        yield None
+        return
+    trace = PageTrace(page_name, operation)
+    outer = getattr(_local, 'trace', None)
+    _local.trace = trace
+    started = time.perf_counter()
+    try:
+        yield trace
+        trace.record.setdefault('status', 'ok')
+    except BaseException as e:
+        trace.record['status'] = 'error'
+        trace.record['error'] = type(e).__name__
+        raise
+    finally:
+        trace.record['seconds'] = time.perf_counter() - started
+        _local.trace = outer
+        _append(run_dir, trace.record)
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Adds the time spent in the with block to the named stage of the current page, and counts its errors."""
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        trace.add_error(name, e)
+        raise
+    finally:
+        trace.add_stage(name, time.perf_counter() - started)
+
+
+def active() -> bool:
+    """Whether the current thread's page operation is traced; lets callers skip measuring sizes."""
+    return getattr(_local, 'trace', None) is not None
+
+
+def add_stages(timings: Dict[str, float]):
+    """Adds already measured stage times to the current page."""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        for name, seconds in timings.items():
+            trace.add_stage(name, seconds)
+
+
+def annotate(**values):
+    """Sets fields of the current page's record, e.g. request_bytes or engine."""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.record.update(values)
+
+
+def count(name: str, amount: int = 1):
+    """Counts an event, e.g. a retry, for the current page."""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        counts = trace.record['counts']
+        counts[name] = counts.get(name, 0) + amount
+
+
+def _append(run_dir: str, record: dict):
+    line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+    try:
+        # One O_APPEND write per record, as in gcv_stats
+        fd = os.open(os.path.join(run_dir, TRACE_FILENAME), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        log.debug(f"Could not record the trace of {record['page']}: {e}")
+
+
+def read_records(run_dir: str) -> List[dict]:
+    """Returns the trace records written so far in run_dir."""
+    records = []
+    try:
+        with open(os.path.join(run_dir, TRACE_FILENAME), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def _labels(**labels) -> str:
+    escaped = (name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for name, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def prometheus_text(records: Iterable[dict], counters: Optional[Dict[str, float]] = None,
+                    run_seconds: Optional[float] = None) -> str:
+    """Summarizes trace records and run counters as Prometheus text exposition."""
+    operations: Dict[tuple, int] = {}
+    operation_seconds: Dict[str, List[float]] = {}
+    stages: Dict[str, List[float]] = {}
+    errors: Dict[tuple, int] = {}
+    request_bytes = response_bytes = 0
+    for record in records:
+        key = (record.get('operation', 'unknown'), record.get('engine', 'unknown'), record.get('status', 'unknown'))
+        operations[key] = operations.get(key, 0) + 1
+        operation_seconds.setdefault(record.get('operation', 'unknown'), []).append(record.get('seconds', 0.0))
+        for name, seconds in record.get('stages', {}).items():
+            stages.setdefault(name, []).append(seconds)
+        for key, value in record.get('errors', {}).items():
+            name, _, error = key.partition(':')
+            errors[(name, error)] = errors.get((name, error), 0) + value
+        request_bytes += record.get('request_bytes', 0)
+        response_bytes += record.get('response_bytes', 0)
+
+    p = METRIC_PREFIX
+    lines = [
+        f"# HELP {p}_page_operations_total Page operations by operation, engine and outcome.",
+        f"# TYPE {p}_page_operations_total counter",
+    ]
+    for (operation, engine, status), value in sorted(operations.items()):
+        lines.append(f"{p}_page_operations_total{_labels(operation=operation, engine=engine, status=status)} {value}")
+    lines += [
+        f"# HELP {p}_page_operation_seconds Wall time of page operations.",
+        f"# TYPE {p}_page_operation_seconds summary",
+    ]
+    for operation, values in sorted(operation_seconds.items()):
+        lines.append(f"{p}_page_operation_seconds_sum{_labels(operation=operation)} {sum(values):.6f}")
+        lines.append(f"{p}_page_operation_seconds_count{_labels(operation=operation)} {len(values)}")
+    lines += [
+        f"# HELP {p}_stage_seconds Time spent per page in each stage.",
+        f"# TYPE {p}_stage_seconds histogram",
+    ]
+    for name, values in sorted(stages.items()):
+        for bound in STAGE_BUCKETS:
+            lines.append(f"{p}_stage_seconds_bucket{_labels(stage=name, le=bound)} {sum(1 for v in values if v <= bound)}")
+        lines.append(f"{p}_stage_seconds_bucket{_labels(stage=name, le='+Inf')} {len(values)}")
+        lines.append(f"{p}_stage_seconds_sum{_labels(stage=name)} {sum(values):.6f}")
+        lines.append(f"{p}_stage_seconds_count{_labels(stage=name)} {len(values)}")
+    lines += [
+        f"# HELP {p}_stage_errors_total Errors raised in each stage.",
+        f"# TYPE {p}_stage_errors_total counter",
+    ]
+    for (name, error), value in sorted(errors.items()):
+        lines.append(f"{p}_stage_errors_total{_labels(stage=name, error=error)} {value}")
+    lines += [
+        f"# HELP {p}_request_bytes_total Bytes of the requests sent to GCV.",
+        f"# TYPE {p}_request_bytes_total counter",
+        f"{p}_request_bytes_total {request_bytes}",
+        f"# HELP {p}_response_bytes_total Bytes of the responses received from GCV.",
+        f"# TYPE {p}_response_bytes_total counter",
+        f"{p}_response_bytes_total {response_bytes}",
+    ]
+    if counters:
+        lines += [
+            f"# HELP {p}_events_total Plugin run statistics (retries, quota errors, cache hits, ...).",
+            f"# TYPE {p}_events_total counter",
+        ]
+        for name, value in sorted(counters.items()):
+            lines.append(f"{p}_events_total{_labels(event=name)} {value:g}")
+    if run_seconds is not None:
+        lines += [
+            f"# HELP {p}_run_seconds Wall time of the ocrmypdf run.",
+            f"# TYPE {p}_run_seconds gauge",
+            f"{p}_run_seconds {run_seconds:.3f}",
+            f"# HELP {p}_run_timestamp_seconds When the ocrmypdf run ended.",
+            f"# TYPE {p}_run_timestamp_seconds gauge",
+            f"{p}_run_timestamp_seconds {time.time():.3f}",
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+def export(run_dir: str, trace_path: Optional[str] = None, prometheus_path: Optional[str] = None,
+           counters: Optional[Dict[str, float]] = None, run_seconds: Optional[float] = None):
+    """
+    Appends the run's trace records to trace_path and replaces
+    prometheus_path with their summary. Runs in the main process at the end
+    of the run.
+    """
+    records = read_records(run_dir)
+    if trace_path:
+        try:
+            with open(trace_path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(',', ':')) + '\n')
+        except OSError as e:
+            log.error(f"Could not write the GCV trace to {trace_path}: {e}")
+    if prometheus_path:
+        try:
+            # The textfile collector must never see a half-written file
+            atomic_write(prometheus_path, prometheus_text(records, counters, run_seconds).encode('utf-8'))
+        except OSError as e:
+            log.error(f"Could not write GCV metrics to {prometheus_path}: {e}")
@@ -4,12 +4,18 @@
 # language handling, and text extraction.
 # Added DPI detection and passing to hOCR generator.
 
+import contextlib
+import functools
+import hashlib
 import logging
 import pathlib
 import io
 import os
 import sys
-import json
+import atexit
+import shutil
+import threading
+import time
 from argparse import ArgumentParser, Namespace
 from typing import List, Tuple, Optional, Set # Added Set for languages return type
 
@@ -17,8 +23,9 @@ from typing import List, Tuple, Optional, Set # Added Set for languages return t
 try:
     from ocrmypdf import hookimpl
     import ocrmypdf.exceptions # Import the whole module
-    from ocrmypdf.pluginspec import OcrEngine
+    from ocrmypdf.pluginspec import OcrEngine, OrientationConfidence
     from ocrmypdf._exec import tesseract # Still needed for orientation/deskew AND languages
+    from ocrmypdf.builtin_plugins.tesseract_ocr import TesseractOcrEngine # OCR fallback
 except ImportError as e:
     print(f"Fatal Error importing core ocrmypdf components: {e}. "
           "Please ensure ocrmypdf v16.10.0 (or compatible) is installed correctly in the active environment.")
@@ -26,18 +33,22 @@ except ImportError as e:
 
 
 # --- Google Cloud Vision Imports ---
+# ocrmypdf imports every plugin even for --help, and google-cloud-vision takes
+# several times longer to import than the rest of the plugin. It is only
+# located here and imported on first use (see _vision, _get_client).
+import importlib.metadata
+import importlib.util
 try:
-    from google.cloud import vision
-    from google.cloud.vision_v1 import AnnotateImageResponse
-    import google.api_core.exceptions
-    import importlib.metadata
+    _gcv_available = all(importlib.util.find_spec(name) for name in ('google.cloud.vision', 'grpc'))
 except ImportError:
+    _gcv_available = False
+if not _gcv_available:
     print("Error: google-cloud-vision library not found. pip install google-cloud-vision")
     sys.exit(1)
 
 # --- Image Library Import ---
 try:
-    from PIL import Image, UnidentifiedImageError
+    from PIL import Image, ImageStat, UnidentifiedImageError
 except ImportError:
     print("Error: Pillow library not found. pip install Pillow")
     sys.exit(1)
@@ -50,10 +61,22 @@ try:
     if _plugin_dir not in sys.path:
         sys.path.insert(0, _plugin_dir)
     import gcv2hocr2
+    import gcv_cache
+    import gcv_batch
+    import gcv_stats
+    import gcv_ratelimit
+    import gcv_retry
+    import gcv_textpdf
+    import gcv_orientation
+    import gcv_trace
+    import gcv_breaker
+    import gcv_image
+    import gcv_journal
+    from gcv_locking import atomic_write
     if _plugin_dir == sys.path[0]:
         sys.path.pop(0)
 except ImportError:
-    print(f"Error: Could not import gcv2hocr2.py. Make sure it's in the same directory as gvision.py ({_plugin_dir}).")
+    print(f"Error: Could not import gcv2hocr2.py or its helper modules. Make sure they are in the same directory as gvision.py ({_plugin_dir}).")
     sys.exit(1)
 except NameError:
      print("Error determining plugin directory. Cannot reliably import gcv2hocr2.py.")
@@ -63,6 +86,135 @@ except NameError:
 # --- Setup ---
 log = logging.getLogger(__name__)
 
+__version__ = "1.1.0"
+
+GCV_FEATURE_TYPE = "DOCUMENT_TEXT_DETECTION"
+
+# A pixel counts as ink for --gcv-blank-threshold when its gray level differs
+# from the page background by more than this, darker or (on dark pages)
+# lighter. Light gray text is counted; show-through and scanner noise are not.
+BLANK_INK_CONTRAST = 40
+# A page is only taken as blank if its gray levels also vary less than this
+# (standard deviation); text of any kind spreads them further
+BLANK_MAX_STDDEV = 8.0
+
+
+
+class GCVError(ocrmypdf.exceptions.SubprocessOutputError):
+    """GCV could not OCR a page; ocrmypdf reports it like a failed Tesseract run."""
+
+
+class GCVClientError(EnvironmentError):
+    """The GCV client could not be set up: credentials, key file or endpoint."""
+
+
+# Response caches opened by this process, keyed by (directory, size cap)
+_response_caches = {}
+
+# Call policies of this process (they hold latency history and a hedging thread pool)
+_call_policies = {}
+
+
+def _vision():
+    """The google.cloud.vision module, imported on first use."""
+    from google.cloud import vision
+    return vision
+
+
+def _api_exceptions():
+    """The google.api_core.exceptions module, imported on first use."""
+    import google.api_core.exceptions
+    return google.api_core.exceptions
+
+
+def _gcv_failures() -> tuple:
+    """Errors meaning GCV could not be used for a page, as opposed to a problem with the page itself."""
+    import google.auth.exceptions
+    return (GCVError, GCVClientError, _api_exceptions().GoogleAPICallError, google.auth.exceptions.GoogleAuthError)
+
+
+# Errors worth retrying: the service or network hiccupped, or we hit a quota
+def _quota_errors() -> tuple:
+    exceptions = _api_exceptions()
+    return (
+        exceptions.ResourceExhausted,
+        exceptions.TooManyRequests,
+    )
+
+
+def _transient_errors() -> tuple:
+    exceptions = _api_exceptions()
+    return _quota_errors() + (
+        exceptions.ServiceUnavailable,
+        exceptions.DeadlineExceeded,
+        exceptions.InternalServerError,
+        exceptions.GatewayTimeout,
+        exceptions.Aborted,
+    )
+
+
+# Skew below this many degrees is not corrected, which leaves the page image
+# unchanged so that the response fetched for deskewing serves the OCR step too
+_DESKEW_MIN_DEGREES = 0.1
+
+# GCV clients of this process, keyed by (keyfile path or None for ADC,
+# endpoint or None for the real API, insecure)
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Credentials of this process, keyed by keyfile path (None for ADC). Unlike
+# clients they survive a fork, so workers reuse what _prewarm loaded.
+_credentials = {}
+_credentials_lock = threading.Lock()
+
+# Background thread started by check_options with --gcv-prewarm
+_prewarm_thread = None
+
+# Keep idle channels warm between pages instead of reconnecting
+_KEEPALIVE_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+# Tesseract language codes and the BCP-47 codes GCV takes as language hints
+_LANG_MAP = {
+    'afr': 'af', 'amh': 'am', 'ara': 'ar', 'asm': 'as', 'aze': 'az',
+    'aze_cyrl': 'az-Cyrl', 'bel': 'be', 'ben': 'bn', 'bod': 'bo',
+    'bos': 'bs', 'bre': 'br', 'bul': 'bg', 'cat': 'ca', 'ceb': 'ceb',
+    'ces': 'cs', 'chi_sim': 'zh-Hans', 'chi_tra': 'zh-Hant', 'chr': 'chr',
+    'cos': 'co', 'cym': 'cy', 'dan': 'da', 'dan_frak': 'da', 'deu': 'de',
+    'deu_frak': 'de', 'deu_latf': 'de', 'dzo': 'dz', 'ell': 'el',
+    'eng': 'en', 'enm': 'en', 'epo': 'eo', 'est': 'et', 'eus': 'eu',
+    'fao': 'fo', 'fas': 'fa', 'fil': 'fil', 'fin': 'fi', 'fra': 'fr',
+    'frk': 'de', 'frm': 'fr', 'fry': 'fy', 'gla': 'gd', 'gle': 'ga',
+    'glg': 'gl', 'grc': 'el', 'guj': 'gu', 'hat': 'ht', 'heb': 'he',
+    'hin': 'hi', 'hrv': 'hr', 'hun': 'hu', 'hye': 'hy', 'iku': 'iu',
+    'ind': 'id', 'isl': 'is', 'ita': 'it', 'ita_old': 'it', 'jav': 'jv',
+    'jpn': 'ja', 'kan': 'kn', 'kat': 'ka', 'kat_old': 'ka', 'kaz': 'kk',
+    'khm': 'km', 'kir': 'ky', 'kmr': 'ku', 'kor': 'ko', 'kor_vert': 'ko',
+    'kur': 'ku', 'lao': 'lo', 'lat': 'la', 'lav': 'lv', 'lit': 'lt',
+    'ltz': 'lb', 'mal': 'ml', 'mar': 'mr', 'mkd': 'mk', 'mlt': 'mt',
+    'mon': 'mn', 'mri': 'mi', 'msa': 'ms', 'mya': 'my', 'nep': 'ne',
+    'nld': 'nl', 'nor': 'no', 'oci': 'oc', 'ori': 'or', 'pan': 'pa',
+    'pol': 'pl', 'por': 'pt', 'pus': 'ps', 'que': 'qu', 'ron': 'ro',
+    'rus': 'ru', 'san': 'sa', 'sin': 'si', 'slk': 'sk', 'slk_frak': 'sk',
+    'slv': 'sl', 'snd': 'sd', 'spa': 'es', 'spa_old': 'es', 'sqi': 'sq',
+    'srp': 'sr-Cyrl', 'srp_latn': 'sr-Latn', 'sun': 'su', 'swa': 'sw',
+    'swe': 'sv', 'syr': 'syr', 'tam': 'ta', 'tat': 'tt', 'tel': 'te',
+    'tgk': 'tg', 'tgl': 'tl', 'tha': 'th', 'tir': 'ti', 'ton': 'to',
+    'tur': 'tr', 'uig': 'ug', 'ukr': 'uk', 'urd': 'ur', 'uzb': 'uz',
+    'uzb_cyrl': 'uz-Cyrl', 'vie': 'vi', 'yid': 'yi', 'yor': 'yo',
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _tesseract_languages() -> frozenset:
+    """The languages of the installed Tesseract; asking Tesseract starts a process, so once per process."""
+    return frozenset(tesseract.get_languages())
+
+
 # --- Plugin Hooks ---
 
 @hookimpl
@@ -77,6 +229,229 @@ def add_options(parser: ArgumentParser):
         help="Path to Google Cloud service account JSON key file. "
              "If not set, Application Default Credentials (ADC) are used."
     )
+    gcv_group.add_argument(
+        '--gcv-cache-dir',
+        help="Directory for a persistent cache of GCV responses, keyed by page image "
+             "content. Unchanged pages are not sent to the API again. Disabled if not set."
+    )
+    gcv_group.add_argument(
+        '--gcv-cache-max-mb',
+        type=int,
+        default=1024,
+        help="Maximum size of the GCV response cache in MiB. Least recently used "
+             "responses are evicted first. Default: 1024"
+    )
+    gcv_group.add_argument(
+        '--gcv-journal',
+        metavar='DIR',
+        help="Journal each page's GCV response in DIR as soon as it arrives, keyed by the "
+             "input file and page number. Rerunning an interrupted run with the same "
+             "journal reuses the finished pages and only sends the missing ones to GCV."
+    )
+    gcv_group.add_argument(
+        '--gcv-batch-size',
+        type=int,
+        default=1,
+        help="Collect page images from all workers into batch_annotate_images calls "
+             f"of up to this many images (max {gcv_batch.MAX_BATCH_SIZE}). Default: 1 (no batching)"
+    )
+    gcv_group.add_argument(
+        '--gcv-batch-flush-seconds',
+        type=float,
+        default=0.5,
+        help="Send a partial batch once its oldest page has waited this long. Default: 0.5"
+    )
+    gcv_group.add_argument(
+        '--gcv-upload-format',
+        choices=['original', 'jpeg', 'webp', 'png'],
+        default='original',
+        help="Re-encode page images in this format before uploading them to GCV. "
+             "Default: original (upload the page image unchanged)"
+    )
+    gcv_group.add_argument(
+        '--gcv-upload-color',
+        choices=['keep', 'gray', 'bilevel'],
+        default='keep',
+        help="Convert page images to grayscale or black and white before uploading. Default: keep"
+    )
+    gcv_group.add_argument(
+        '--gcv-upload-max-dpi',
+        type=float,
+        help="Downsample page images above this resolution before uploading. "
+             "hOCR coordinates are scaled back to the original page."
+    )
+    gcv_group.add_argument(
+        '--gcv-upload-quality',
+        type=int,
+        default=85,
+        help="JPEG/WebP quality used with --gcv-upload-format. Default: 85"
+    )
+    gcv_group.add_argument(
+        '--gcv-max-rps',
+        type=float,
+        help="Enable a request rate limiter shared by all workers, starting at and never "
+             "exceeding this many images per second. The rate is lowered when GCV reports "
+             "quota errors (429 / RESOURCE_EXHAUSTED) and recovers gradually afterwards. "
+             "Disabled if not set."
+    )
+    gcv_group.add_argument(
+        '--gcv-min-rps',
+        type=float,
+        default=0.5,
+        help="Lowest rate the limiter backs off to, in images per second. Default: 0.5"
+    )
+    gcv_group.add_argument(
+        '--gcv-rps-increase',
+        type=float,
+        default=0.1,
+        help="Rate added after each successful request (additive increase). Default: 0.1"
+    )
+    gcv_group.add_argument(
+        '--gcv-rps-decrease',
+        type=float,
+        default=0.5,
+        help="Factor the rate is multiplied by after a quota error (multiplicative decrease). Default: 0.5"
+    )
+    gcv_group.add_argument(
+        '--gcv-latency-target',
+        type=float,
+        help="If set, requests slower than this many seconds also lower the rate slightly."
+    )
+    gcv_group.add_argument(
+        '--gcv-deadline',
+        type=float,
+        default=120.0,
+        help="Deadline in seconds for each GCV API call attempt. Default: 120"
+    )
+    gcv_group.add_argument(
+        '--gcv-retries',
+        type=int,
+        default=3,
+        help="How often a call failing with a transient error (unavailable, deadline "
+             "exceeded, internal error, quota exceeded) is retried. Default: 3"
+    )
+    gcv_group.add_argument(
+        '--gcv-backoff-initial',
+        type=float,
+        default=1.0,
+        help="Upper bound of the first retry delay in seconds; it doubles on every retry "
+             "and the actual delay is drawn at random below it. Default: 1"
+    )
+    gcv_group.add_argument(
+        '--gcv-backoff-max',
+        type=float,
+        default=32.0,
+        help="Cap on the retry delay bound in seconds. Default: 32"
+    )
+    gcv_group.add_argument(
+        '--gcv-hedge-percentile',
+        type=float,
+        help="Send a duplicate (hedged) request when a call has run longer than this "
+             "percentile of recent call latencies, e.g. 95, and use whichever answers "
+             "first. Disabled if not set."
+    )
+    gcv_group.add_argument(
+        '--gcv-orientation',
+        choices=['tesseract', 'gcv'],
+        default='tesseract',
+        help="How --rotate-pages and --deskew find page orientation and skew: with "
+             "Tesseract (default), or from the direction of the words GCV recognizes. "
+             "With 'gcv', each check is a billed GCV request of its own: --rotate-pages "
+             "runs on ocrmypdf's low-resolution preview, whose response cannot be reused, "
+             "so it adds a request per page; the response fetched for deskewing is reused "
+             "for OCR when the page needs no skew correction. Tesseract is only used if "
+             "GCV fails."
+    )
+    gcv_group.add_argument(
+        '--gcv-line-mode',
+        choices=['breaks', 'geometry'],
+        default='breaks',
+        help="How words are grouped into text lines: by the line breaks GCV detects "
+             "(default), or by the vertical position of the words. Use 'geometry' "
+             "when GCV leaves out line breaks and lines span several rows."
+    )
+    gcv_group.add_argument(
+        '--gcv-line-tolerance',
+        type=float,
+        default=3.0,
+        metavar='POINTS',
+        help="With --gcv-line-mode geometry, the least distance (in points, 1/72 inch) "
+             "between a word's vertical centre and its line's that still puts the word "
+             "on the line; taller lines allow up to half their height. Default: 3"
+    )
+    gcv_group.add_argument(
+        '--gcv-blank-threshold',
+        type=float,
+        metavar='PERCENT',
+        help="Do not send pages with less than PERCENT of their area covered by ink "
+             "(e.g. 0.05) to GCV; they get an empty text layer. Saves requests for blank "
+             "separator sheets and empty backs of duplex scans. Disabled if not set."
+    )
+    gcv_group.add_argument(
+        '--gcv-fallback',
+        choices=['none', 'tesseract'],
+        default='none',
+        help="With 'tesseract', pages GCV fails on are OCR'd with Tesseract instead of "
+             "failing the run, and a circuit breaker shared by all workers stops sending "
+             "pages to GCV for a while after repeated failures or slow calls. Default: none"
+    )
+    gcv_group.add_argument(
+        '--gcv-breaker-failures',
+        type=int,
+        default=5,
+        help="Consecutive failed or slow GCV calls that open the circuit breaker. Default: 5"
+    )
+    gcv_group.add_argument(
+        '--gcv-breaker-latency',
+        type=float,
+        help="GCV calls slower than this many seconds count as failures for the circuit "
+             "breaker. Disabled if not set."
+    )
+    gcv_group.add_argument(
+        '--gcv-breaker-cooloff',
+        type=float,
+        default=60.0,
+        help="Seconds the circuit breaker stays open, using Tesseract for every page, "
+             "before GCV is tried again with a single page. Default: 60"
+    )
+    gcv_group.add_argument(
+        '--gcv-pdf-font',
+        help="TrueType font (.ttf) for the invisible text of the sandwich PDF renderer. "
+             "The default, Helvetica, only covers Western European characters; words "
+             "with other characters are then set in ocrmypdf's glyphless font, which "
+             "covers all of Unicode."
+    )
+    gcv_group.add_argument(
+        '--gcv-endpoint',
+        help="Send requests to this Vision API endpoint (host:port) instead of "
+             "vision.googleapis.com, e.g. a local gcv_fake_server.py for load tests."
+    )
+    gcv_group.add_argument(
+        '--gcv-insecure',
+        action='store_true',
+        help="Connect to --gcv-endpoint without TLS and without credentials. "
+             "Only for local test servers."
+    )
+    gcv_group.add_argument(
+        '--gcv-trace',
+        metavar='FILE',
+        help="Append one JSON line per page operation (OCR, orientation or deskew check) "
+             "to FILE, with the time spent in each stage (image read, API call, "
+             "conversion, rendering, Tesseract, ...), request and response sizes and errors."
+    )
+    gcv_group.add_argument(
+        '--gcv-prometheus',
+        metavar='FILE',
+        help="Write a summary of the page stage timings and the run statistics to FILE "
+             "in Prometheus text format, for the node_exporter textfile collector."
+    )
+    gcv_group.add_argument(
+        '--gcv-prewarm',
+        action='store_true',
+        help="Import the GCV client library and load the credentials in the background "
+             "while ocrmypdf prepares the run, so that the worker processes start with "
+             "them ready. Speeds up short runs."
+    )
 
 @hookimpl
 def check_options(options: Namespace):
@@ -86,9 +461,339 @@ def check_options(options: Namespace):
     if options.gcv_keyfile and not pathlib.Path(options.gcv_keyfile).is_file():
         log.error(f"Google Cloud Vision key file not found: {options.gcv_keyfile}")
         raise ValueError(f"GCV key file not found: {options.gcv_keyfile}")
+    if not hasattr(options, 'gcv_cache_dir'):
+        options.gcv_cache_dir = None
+    if options.gcv_cache_dir:
+        try:
+            pathlib.Path(options.gcv_cache_dir).mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            log.error(f"Cannot create GCV cache directory {options.gcv_cache_dir}: {e}")
+            raise ValueError(f"GCV cache directory not usable: {options.gcv_cache_dir}") from e
+    if getattr(options, 'gcv_cache_max_mb', 1024) <= 0:
+        raise ValueError("--gcv-cache-max-mb must be a positive number of MiB")
+    if not 1 <= getattr(options, 'gcv_batch_size', 1) <= gcv_batch.MAX_BATCH_SIZE:
+        raise ValueError(f"--gcv-batch-size must be between 1 and {gcv_batch.MAX_BATCH_SIZE}")
+    if getattr(options, 'gcv_batch_flush_seconds', 0.5) < 0:
+        raise ValueError("--gcv-batch-flush-seconds must not be negative")
+    if getattr(options, 'gcv_upload_max_dpi', None) is not None and options.gcv_upload_max_dpi <= 0:
+        raise ValueError("--gcv-upload-max-dpi must be positive")
+    if not 1 <= getattr(options, 'gcv_upload_quality', 85) <= 100:
+        raise ValueError("--gcv-upload-quality must be between 1 and 100")
+    if getattr(options, 'gcv_deadline', 120.0) <= 0:
+        raise ValueError("--gcv-deadline must be positive")
+    if getattr(options, 'gcv_retries', 3) < 0:
+        raise ValueError("--gcv-retries must not be negative")
+    hedge_percentile = getattr(options, 'gcv_hedge_percentile', None)
+    if hedge_percentile is not None and not 0 < hedge_percentile < 100:
+        raise ValueError("--gcv-hedge-percentile must be between 0 and 100")
+    if getattr(options, 'gcv_line_tolerance', 3.0) < 0:
+        raise ValueError("--gcv-line-tolerance must not be negative")
+    blank_threshold = getattr(options, 'gcv_blank_threshold', None)
+    if blank_threshold is not None and not 0 <= blank_threshold <= 100:
+        raise ValueError("--gcv-blank-threshold must be a percentage between 0 and 100")
+    if getattr(options, 'gcv_fallback', 'none') == 'tesseract':
+        if not shutil.which('tesseract'):
+            raise ValueError("--gcv-fallback tesseract needs Tesseract to be installed")
+        if options.gcv_breaker_failures < 1:
+            raise ValueError("--gcv-breaker-failures must be at least 1")
+        if options.gcv_breaker_cooloff < 0:
+            raise ValueError("--gcv-breaker-cooloff must not be negative")
+        if options.gcv_breaker_latency is not None and options.gcv_breaker_latency <= 0:
+            raise ValueError("--gcv-breaker-latency must be positive")
+    if getattr(options, 'gcv_pdf_font', None) and not pathlib.Path(options.gcv_pdf_font).is_file():
+        raise ValueError(f"--gcv-pdf-font file not found: {options.gcv_pdf_font}")
+    for option in ('gcv_trace', 'gcv_prometheus'):
+        path = getattr(options, option, None)
+        if path:
+            # Workers and the exit handler may run in another directory
+            path = os.path.abspath(path)
+            if not os.path.isdir(os.path.dirname(path)):
+                raise ValueError(f"--{option.replace('_', '-')}: directory does not exist: {os.path.dirname(path)}")
+            setattr(options, option, path)
+            if getattr(options, 'output_type', None) == 'none':
+                # The export runs in postprocessing, which --output-type none skips
+                raise ValueError(f"--{option.replace('_', '-')} needs a PDF output, not --output-type none")
+    if getattr(options, 'gcv_insecure', False) and not getattr(options, 'gcv_endpoint', None):
+        raise ValueError("--gcv-insecure needs --gcv-endpoint")
+    if getattr(options, 'gcv_max_rps', None) is not None:
+        if options.gcv_max_rps <= 0 or options.gcv_min_rps <= 0:
+            raise ValueError("--gcv-max-rps and --gcv-min-rps must be positive")
+        if not 0 < options.gcv_rps_decrease < 1:
+            raise ValueError("--gcv-rps-decrease must be between 0 and 1")
+    if getattr(options, 'gcv_journal', None):
+        _open_journal(options)
+    if getattr(options, 'gcv_prewarm', False):
+        # An insecure endpoint takes no credentials
+        _start_prewarm(options.gcv_keyfile, load_credentials=not getattr(options, 'gcv_insecure', False))
     log.info("Google Vision plugin options checked.")
 
 
+def _open_journal(options: Namespace):
+    """
+    Identifies the input document for --gcv-journal. The key is handed to
+    the workers with the options, like the run directory.
+    """
+    input_file = options.input_file
+    if not isinstance(input_file, (str, os.PathLike)) or os.fspath(input_file) == '-' \
+            or not os.path.isfile(input_file):
+        raise ValueError("--gcv-journal needs the input PDF as a file, not a stream")
+    options.gcv_journal = os.path.abspath(options.gcv_journal)
+    try:
+        options.gcv_journal_document = gcv_journal.document_key(input_file)
+        journal = gcv_journal.PageJournal(options.gcv_journal, options.gcv_journal_document)
+        journal.describe(input_file)
+    except OSError as e:
+        log.error(f"Cannot use GCV journal directory {options.gcv_journal}: {e}")
+        raise ValueError(f"GCV journal directory not usable: {options.gcv_journal}") from e
+    pages = journal.pages()
+    if pages:
+        log.info(f"GCV journal has {pages} pages of {input_file}; these are not sent to GCV again")
+
+
+@hookimpl
+def validate(pdfinfo, options: Namespace):
+    # ocrmypdf has opened the input as origin.pdf in its work folder
+    _create_run_dir(options, pathlib.Path(pdfinfo.filename).parent)
+
+
+def _create_run_dir(options: Namespace, work_folder: pathlib.Path):
+    """
+    Creates a scratch directory shared by all workers of this ocrmypdf run,
+    inside ocrmypdf's work folder, so that it is removed with the work folder
+    at the end of the run (or kept with --keep-temporary-files). validate
+    runs in the main process before the workers start, and the options
+    namespace (including this path) is handed to every worker.
+    """
+    run_dir = work_folder / 'gcv'
+    run_dir.mkdir(exist_ok=True)
+    options.gcv_run_dir = os.fspath(run_dir)
+    options.gcv_run_started = time.monotonic()
+    options.gcv_run_finished = False
+    owner_pid = os.getpid()
+
+    def _finish_at_exit():
+        if os.getpid() == owner_pid:  # forked workers inherit atexit handlers
+            _finish_run(options)
+
+    # In case is_optimization_enabled is never called for this run;
+    # _finish_run unregisters it, so handlers do not pile up over many runs
+    _run_finishers[options.gcv_run_dir] = _finish_at_exit
+    atexit.register(_finish_at_exit)
+    log.debug(f"Google Vision plugin run directory: {run_dir}")
+
+
+# Exit handlers of the runs not finished yet, by run directory
+_run_finishers = {}
+
+
+@hookimpl
+def is_optimization_enabled(context):
+    """
+    Finishes the run. ocrmypdf has no hook for the end of a run; this is the
+    first one it calls after the last page is done, in the main process while
+    the work folder still exists. Being a firstresult hook, another plugin
+    may answer it first or ocrmypdf may skip it (--output-type none), so
+    _finish_run is also registered to run at exit, and runs only once.
+    Returns None, leaving the answer to the optimizer plugin.
+    """
+    _finish_run(context.options)
+    return None
+
+
+def _finish_run(options: Namespace):
+    """
+    Logs the run statistics and exports the --gcv-trace and --gcv-prometheus
+    timings, once per run.
+    """
+    run_dir = getattr(options, 'gcv_run_dir', None)
+    if not run_dir or getattr(options, 'gcv_run_finished', True):
+        return
+    options.gcv_run_finished = True
+    finisher = _run_finishers.pop(run_dir, None)
+    if finisher is not None:
+        atexit.unregister(finisher)
+    if not os.path.isdir(run_dir):
+        # Removed with ocrmypdf's work folder; an export now would replace
+        # the metrics file with an empty one
+        log.debug(f"Google Vision plugin run directory {run_dir} is gone, no statistics to report")
+        return
+    stats = gcv_stats.totals(run_dir)
+    if stats:
+        summary = ", ".join(f"{name}={value:g}" for name, value in sorted(stats.items()))
+        log.info(f"Google Vision plugin statistics: {summary}")
+    trace_path = getattr(options, 'gcv_trace', None)
+    prometheus_path = getattr(options, 'gcv_prometheus', None)
+    if trace_path or prometheus_path:
+        gcv_trace.export(run_dir, trace_path, prometheus_path, counters=stats,
+                         run_seconds=time.monotonic() - options.gcv_run_started)
+
+
+# --- GCV Client Pool ---
+
+def _forget_clients_after_fork():
+    # gRPC channels are not fork-safe. A child must not use (or close) the
+    # parent's channels, so it starts with an empty pool and connects lazily.
+    # Credentials are plain objects and are kept, see _prewarm.
+    global _clients_lock, _credentials_lock, _prewarm_thread
+    _clients.clear()
+    _call_policies.clear()
+    _clients_lock = threading.Lock()
+    _credentials_lock = threading.Lock()
+    _prewarm_thread = None
+
+
+def _join_prewarm():
+    # A fork while the prewarm thread is importing would leave the child
+    # with the import lock held forever, so forks wait for it to finish
+    thread = _prewarm_thread
+    if thread is not None and thread is not threading.current_thread():
+        thread.join()
+
+
+os.register_at_fork(before=_join_prewarm, after_in_child=_forget_clients_after_fork)
+
+
+def _get_credentials(keyfile: Optional[str]):
+    """
+    Returns this process's credentials for the key file, or the Application
+    Default Credentials if keyfile is None, loading them on first use.
+    """
+    with _credentials_lock:
+        credentials = _credentials.get(keyfile)
+        if credentials is not None:
+            return credentials
+        from google.cloud.vision_v1.services.image_annotator.transports import ImageAnnotatorGrpcTransport
+        if keyfile:
+            from google.oauth2 import service_account
+            credentials = service_account.Credentials.from_service_account_file(keyfile)
+        else:
+            import google.auth
+            # The default scopes are what the client library would ask for
+            credentials, _ = google.auth.default(default_scopes=ImageAnnotatorGrpcTransport.AUTH_SCOPES)
+        _credentials[keyfile] = credentials
+        return credentials
+
+
+def _prewarm(keyfile: Optional[str], load_credentials: bool = True):
+    """
+    Imports the GCV client library and loads the credentials, fetching an
+    access token for ADC, in the main process while ocrmypdf prepares the
+    run. Forked workers inherit all of it.
+    """
+    started = time.monotonic()
+    try:
+        _vision()
+        if load_credentials:
+            credentials = _get_credentials(keyfile)
+            from google.oauth2 import service_account
+            # Service accounts sign their own tokens, there is nothing to fetch
+            if not isinstance(credentials, service_account.Credentials) and not credentials.valid:
+                import google.auth.transport.requests
+                credentials.refresh(google.auth.transport.requests.Request())
+    except Exception as e:
+        log.debug(f"Could not prewarm the GCV client, workers will load it themselves: {e}")
+        return
+    log.debug(f"Prewarmed the GCV client in {time.monotonic() - started:.2f}s")
+
+
+def _start_prewarm(keyfile: Optional[str], load_credentials: bool = True):
+    global _prewarm_thread
+    _prewarm_thread = threading.Thread(target=_prewarm, args=(keyfile, load_credentials),
+                                       name='gcv-prewarm', daemon=True)
+    _prewarm_thread.start()
+
+
+def _get_client(keyfile: Optional[str], run_dir: Optional[str], endpoint: Optional[str] = None,
+                insecure: bool = False) -> 'vision.ImageAnnotatorClient':
+    """
+    Returns this process's shared GCV client for the given credentials and
+    endpoint, creating it on first use. Every engine instance in a worker
+    reuses the same warm channel, so credentials are loaded and TLS is
+    negotiated once per worker instead of once per page. With insecure, the
+    client connects to endpoint in plain text and sends no credentials.
+    """
+    client_key = (keyfile, endpoint, insecure)
+    with _clients_lock:
+        client = _clients.get(client_key)
+        if client is not None:
+            return client
+
+        import grpc
+        from google.cloud.vision_v1.services.image_annotator.transports import ImageAnnotatorGrpcTransport
+
+        if insecure:
+            from google.auth.credentials import AnonymousCredentials
+            log.info(f"Using GCV endpoint {endpoint} without TLS or credentials.")
+            credentials = AnonymousCredentials()
+        else:
+            if keyfile:
+                log.info(f"Using GCV key file: {keyfile}")
+            else:
+                log.info("Using Application Default Credentials (ADC) for GCV.")
+            if endpoint:
+                log.info(f"Using GCV endpoint {endpoint}")
+            credentials = _get_credentials(keyfile)
+
+        def _on_connectivity_change(state):
+            if state == grpc.ChannelConnectivity.READY:
+                # Each transition to READY is a fresh connection, i.e. a TLS handshake
+                gcv_stats.increment(run_dir, 'tls_handshakes')
+
+        def _create_channel(host, *args, options=(), **kwargs):
+            options = list(options) + _KEEPALIVE_OPTIONS
+            if insecure:
+                channel = grpc.insecure_channel(host, options=options)
+            else:
+                channel = ImageAnnotatorGrpcTransport.create_channel(host, *args, options=options, **kwargs)
+            channel.subscribe(_on_connectivity_change)
+            return channel
+
+        transport_args = {'host': endpoint} if endpoint else {}
+        transport = ImageAnnotatorGrpcTransport(credentials=credentials, channel=_create_channel, **transport_args)
+        client = _vision().ImageAnnotatorClient(transport=transport)
+        gcv_stats.increment(run_dir, 'clients_created')
+        log.debug(f"Created GCV client for process {os.getpid()}")
+        _clients[client_key] = client
+        return client
+
+
+def _ink_coverage(img: 'Image.Image') -> Tuple[float, float]:
+    """
+    Returns the share of the image's pixels that are ink, i.e. clearly darker
+    or lighter than the background (its most common gray level), and the
+    standard deviation of its gray levels.
+    """
+    histogram = img.convert('L').histogram()
+    background = max(range(256), key=histogram.__getitem__)
+    ink = (sum(histogram[:max(0, background - BLANK_INK_CONTRAST)])
+           + sum(histogram[background + BLANK_INK_CONTRAST + 1:]))
+    return ink / max(1, sum(histogram)), ImageStat.Stat(histogram).stddev[0]
+
+
+def _page_number(input_file: pathlib.Path) -> Optional[int]:
+    """The page number of an ocrmypdf page image, named like 000012_ocr.png, or None."""
+    prefix, _, _ = input_file.name.partition('_')
+    return int(prefix) if len(prefix) == 6 and prefix.isdigit() else None
+
+
+@contextlib.contextmanager
+def _page_operation(options: Namespace, input_file: pathlib.Path, operation: str):
+    """
+    Runs one page operation: traced if --gcv-trace or --gcv-prometheus is
+    set (see gcv_trace), and reading the page image at most once for all of
+    its stages (see gcv_image).
+    """
+    run_dir = getattr(options, 'gcv_run_dir', None)
+    enabled = bool(getattr(options, 'gcv_trace', None) or getattr(options, 'gcv_prometheus', None))
+    with gcv_trace.page(run_dir, input_file.name, operation, enabled), gcv_image.loaded(input_file) as page:
+        try:
+            yield
+        finally:
+            if page.bytes_read:
+                gcv_stats.increment(run_dir, 'bytes_read', page.bytes_read)
+                gcv_trace.annotate(bytes_read=page.bytes_read)
+
+
 # --- OCR Engine Implementation ---
 
 class GVisionOcrEngine(OcrEngine):
@@ -110,19 +815,16 @@ class GVisionOcrEngine(OcrEngine):
 
 
     def _initialize_client(self):
-        """Initializes the GCV client based on options."""
+        """Attaches the process-wide GCV client for the configured credentials."""
         if self.gcv_client is None:
             keyfile = getattr(self.options, 'gcv_keyfile', None)
             try:
-                if keyfile:
-                    log.info(f"Using GCV key file: {keyfile}")
-                    self.gcv_client = vision.ImageAnnotatorClient.from_service_account_json(keyfile)
-                else:
-                    log.info("Using Application Default Credentials (ADC) for GCV.")
-                    self.gcv_client = vision.ImageAnnotatorClient()
+                self.gcv_client = _get_client(keyfile, getattr(self.options, 'gcv_run_dir', None),
+                                              endpoint=getattr(self.options, 'gcv_endpoint', None),
+                                              insecure=getattr(self.options, 'gcv_insecure', False))
             except Exception as e:
                 log.exception(f"Failed to initialize Google Cloud Vision client: {e}")
-                raise EnvironmentError("Could not initialize GCV client. Check credentials/keyfile.") from e
+                raise GCVClientError("Could not initialize GCV client. Check credentials/keyfile.") from e
 
     @staticmethod
     def get_name():
@@ -159,7 +861,7 @@ class GVisionOcrEngine(OcrEngine):
         Return the set of *all* languages supported by the installed Tesseract.
         """
         try:
-            tess_langs = tesseract.get_languages()
+            tess_langs = set(_tesseract_languages())
             log.debug(f"Reporting all available Tesseract languages to OCRmyPDF core: {tess_langs}")
             return tess_langs
         except Exception as e:
@@ -177,38 +879,10 @@ class GVisionOcrEngine(OcrEngine):
         tesseract_langs_str = getattr(current_options, 'language', 'eng')
         tesseract_langs = tesseract_langs_str.split('+')
 
-        lang_map = {
-            'afr': 'af', 'amh': 'am', 'ara': 'ar', 'asm': 'as', 'aze': 'az',
-            'aze_cyrl': 'az-Cyrl', 'bel': 'be', 'ben': 'bn', 'bod': 'bo',
-            'bos': 'bs', 'bre': 'br', 'bul': 'bg', 'cat': 'ca', 'ceb': 'ceb',
-            'ces': 'cs', 'chi_sim': 'zh-Hans', 'chi_tra': 'zh-Hant', 'chr': 'chr',
-            'cos': 'co', 'cym': 'cy', 'dan': 'da', 'dan_frak': 'da', 'deu': 'de',
-            'deu_frak': 'de', 'deu_latf': 'de', 'dzo': 'dz', 'ell': 'el',
-            'eng': 'en', 'enm': 'en', 'epo': 'eo', 'est': 'et', 'eus': 'eu',
-            'fao': 'fo', 'fas': 'fa', 'fil': 'fil', 'fin': 'fi', 'fra': 'fr',
-            'frk': 'de', 'frm': 'fr', 'fry': 'fy', 'gla': 'gd', 'gle': 'ga',
-            'glg': 'gl', 'grc': 'el', 'guj': 'gu', 'hat': 'ht', 'heb': 'he',
-            'hin': 'hi', 'hrv': 'hr', 'hun': 'hu', 'hye': 'hy', 'iku': 'iu',
-            'ind': 'id', 'isl': 'is', 'ita': 'it', 'ita_old': 'it', 'jav': 'jv',
-            'jpn': 'ja', 'kan': 'kn', 'kat': 'ka', 'kat_old': 'ka', 'kaz': 'kk',
-            'khm': 'km', 'kir': 'ky', 'kmr': 'ku', 'kor': 'ko', 'kor_vert': 'ko',
-            'kur': 'ku', 'lao': 'lo', 'lat': 'la', 'lav': 'lv', 'lit': 'lt',
-            'ltz': 'lb', 'mal': 'ml', 'mar': 'mr', 'mkd': 'mk', 'mlt': 'mt',
-            'mon': 'mn', 'mri': 'mi', 'msa': 'ms', 'mya': 'my', 'nep': 'ne',
-            'nld': 'nl', 'nor': 'no', 'oci': 'oc', 'ori': 'or', 'pan': 'pa',
-            'pol': 'pl', 'por': 'pt', 'pus': 'ps', 'que': 'qu', 'ron': 'ro',
-            'rus': 'ru', 'san': 'sa', 'sin': 'si', 'slk': 'sk', 'slk_frak': 'sk',
-            'slv': 'sl', 'snd': 'sd', 'spa': 'es', 'spa_old': 'es', 'sqi': 'sq',
-            'srp': 'sr-Cyrl', 'srp_latn': 'sr-Latn', 'sun': 'su', 'swa': 'sw',
-            'swe': 'sv', 'syr': 'syr', 'tam': 'ta', 'tat': 'tt', 'tel': 'te',
-            'tgk': 'tg', 'tgl': 'tl', 'tha': 'th', 'tir': 'ti', 'ton': 'to',
-            'tur': 'tr', 'uig': 'ug', 'ukr': 'uk', 'urd': 'ur', 'uzb': 'uz',
-            'uzb_cyrl': 'uz-Cyrl', 'vie': 'vi', 'yid': 'yi', 'yor': 'yo',
-        }
         gcv_langs = []
         unmapped = []
         for lang in tesseract_langs:
-            mapped_lang = lang_map.get(lang)
+            mapped_lang = _LANG_MAP.get(lang)
             if mapped_lang:
                 gcv_langs.append(mapped_lang)
             else:
@@ -220,10 +894,326 @@ class GVisionOcrEngine(OcrEngine):
         log.info(f"Mapping Tesseract languages '{tesseract_langs_str}' to GCV hints for API call: {gcv_langs}")
         return gcv_langs
 
+    def _get_cache(self) -> Optional['gcv_cache.ResponseCache']:
+        """Returns this process's response cache for the configured directory, if any."""
+        cache_dir = getattr(self.options, 'gcv_cache_dir', None)
+        if not cache_dir:
+            return None
+        max_bytes = getattr(self.options, 'gcv_cache_max_mb', 1024) * 1024 * 1024
+        cache_id = (os.path.abspath(cache_dir), max_bytes)
+        if cache_id not in _response_caches:
+            _response_caches[cache_id] = gcv_cache.ResponseCache(cache_dir, max_bytes=max_bytes)
+        return _response_caches[cache_id]
+
+    def _run_dir(self, input_file: pathlib.Path) -> pathlib.Path:
+        """Directory shared by all workers of this run, see _create_run_dir."""
+        run_dir = getattr(self.options, 'gcv_run_dir', None)
+        # Without check_options (e.g. engine used directly), fall back to
+        # ocrmypdf's work folder, which holds all page images of the run
+        return pathlib.Path(run_dir) if run_dir else input_file.parent
+
+    def _get_rate_limiter(self) -> Optional['gcv_ratelimit.AdaptiveRateLimiter']:
+        """Returns the run-wide rate limiter, or None if --gcv-max-rps is not set."""
+        max_rps = getattr(self.options, 'gcv_max_rps', None)
+        run_dir = getattr(self.options, 'gcv_run_dir', None)
+        if not max_rps or not run_dir:
+            return None
+        return gcv_ratelimit.AdaptiveRateLimiter(
+            run_dir,
+            max_rate=max_rps,
+            min_rate=getattr(self.options, 'gcv_min_rps', 0.5),
+            increase=getattr(self.options, 'gcv_rps_increase', 0.1),
+            decrease=getattr(self.options, 'gcv_rps_decrease', 0.5),
+            latency_target=getattr(self.options, 'gcv_latency_target', None),
+        )
+
+    def _get_breaker(self, input_file: pathlib.Path) -> Optional['gcv_breaker.CircuitBreaker']:
+        """Returns the run-wide circuit breaker, or None unless --gcv-fallback tesseract is set."""
+        if getattr(self.options, 'gcv_fallback', 'none') != 'tesseract':
+            return None
+        return gcv_breaker.CircuitBreaker(
+            self._run_dir(input_file),
+            failure_threshold=getattr(self.options, 'gcv_breaker_failures', 5),
+            cooloff=getattr(self.options, 'gcv_breaker_cooloff', 60.0),
+            latency_threshold=getattr(self.options, 'gcv_breaker_latency', None),
+        )
+
+    def _gcv_allowed(self, input_file: pathlib.Path) -> bool:
+        """False while the circuit breaker keeps pages away from GCV. Pair with _release_probe."""
+        breaker = self._get_breaker(input_file)
+        return breaker is None or breaker.allow()
+
+    def _release_probe(self, input_file: pathlib.Path):
+        """Frees the breaker's probe slot if _gcv_allowed gave it to this page but no request was sent."""
+        breaker = self._get_breaker(input_file)
+        if breaker is not None:
+            breaker.release()
+
+    def _get_call_policy(self) -> 'gcv_retry.CallPolicy':
+        """Returns this process's call policy for the configured deadline, retry and hedging settings."""
+        run_dir = getattr(self.options, 'gcv_run_dir', None)
+        settings = (
+            getattr(self.options, 'gcv_deadline', 120.0),
+            getattr(self.options, 'gcv_retries', 3),
+            getattr(self.options, 'gcv_backoff_initial', 1.0),
+            getattr(self.options, 'gcv_backoff_max', 32.0),
+            getattr(self.options, 'gcv_hedge_percentile', None),
+            run_dir,
+        )
+        if settings not in _call_policies:
+            deadline, retries, backoff_initial, backoff_max, hedge_percentile, _ = settings
+            _call_policies[settings] = gcv_retry.CallPolicy(
+                deadline=deadline,
+                max_retries=retries,
+                backoff_initial=backoff_initial,
+                backoff_max=backoff_max,
+                retryable=_transient_errors(),
+                hedge_percentile=hedge_percentile,
+                on_event=lambda name: (gcv_stats.increment(run_dir, name), gcv_trace.count(name)),
+            )
+        return _call_policies[settings]
+
+    def _call_gcv(self, call, cost: int = 1):
+        """
+        Runs one GCV API call, call(timeout), under the call policy (deadline,
+        retries with backoff, hedging) and the rate limiter, if enabled.
+        Quota errors lower the shared rate before they are retried.
+        """
+        limiter = self._get_rate_limiter()
+        run_dir = getattr(self.options, 'gcv_run_dir', None)
+
+        def attempt(timeout):
+            if limiter is not None:
+                waited = limiter.acquire(cost)
+                if waited:
+                    log.debug(f"[{self.get_name()}] Rate limiter delayed request by {waited:.2f}s")
+            started = time.monotonic()
+            try:
+                result = call(timeout)
+            except _quota_errors():
+                gcv_stats.increment(run_dir, 'quota_errors')
+                gcv_trace.count('quota_errors')
+                if limiter is not None:
+                    limiter.on_quota_error()
+                raise
+            if limiter is not None:
+                limiter.on_success(time.monotonic() - started)
+            return result
+
+        return self._get_call_policy().run(attempt)
+
+    def _send_batch(self, payloads: List[bytes]) -> List[bytes]:
+        """Sends serialized requests from several workers in one batch_annotate_images call."""
+        self._initialize_client()
+        vision = _vision()
+        requests = [vision.AnnotateImageRequest.deserialize(p) for p in payloads]
+        log.debug(f"[{self.get_name()}] Sending batch of {len(requests)} images to GCV API...")
+        batch_response = self._call_gcv(
+            lambda timeout: self.gcv_client.batch_annotate_images(requests=requests, retry=None, timeout=timeout),
+            cost=len(requests))
+        log.debug(f"[{self.get_name()}] Received batch response from GCV API.")
+        return [vision.AnnotateImageResponse.serialize(r) for r in batch_response.responses]
+
+    def _request_annotation(self, content: bytes, language_hints: List[str], input_file: pathlib.Path) -> 'vision.AnnotateImageResponse':
+        """Sends one page image to the GCV API and reports the outcome to the circuit breaker, if any."""
+        breaker = self._get_breaker(input_file)
+        if breaker is None:
+            return self._send_request(content, language_hints, input_file)
+        started = time.monotonic()
+        try:
+            response = self._send_request(content, language_hints, input_file)
+        except _gcv_failures():
+            self._circuit_opened(breaker.on_failure())
+            raise
+        self._circuit_opened(breaker.on_success(time.monotonic() - started))
+        return response
+
+    def _circuit_opened(self, opened: bool):
+        if opened:
+            gcv_stats.increment(getattr(self.options, 'gcv_run_dir', None), 'circuit_opened')
+            gcv_trace.count('circuit_opened')
+
+    def _send_request(self, content: bytes, language_hints: List[str], input_file: pathlib.Path) -> 'vision.AnnotateImageResponse':
+        """Sends one page image to the GCV API. Error responses raise GCVError."""
+        with gcv_trace.stage('request_build'):
+            vision = _vision()
+            image = vision.Image(content=gcv_image.as_bytes(content))  # copies only memory-mapped images
+            features = [vision.Feature(type_=vision.Feature.Type[GCV_FEATURE_TYPE])]
+            image_context = vision.ImageContext(language_hints=language_hints)
+            request = vision.AnnotateImageRequest(image=image, features=features, image_context=image_context)
+        if gcv_trace.active():
+            gcv_trace.annotate(request_bytes=vision.AnnotateImageRequest.pb(request).ByteSize())
+
+        batch_size = getattr(self.options, 'gcv_batch_size', 1)
+        if batch_size > 1:
+            spool = gcv_batch.BatchSpool(
+                self._run_dir(input_file) / 'batch',
+                batch_size=batch_size,
+                flush_seconds=getattr(self.options, 'gcv_batch_flush_seconds', 0.5),
+            )
+            log.debug(f"[{self.get_name()}] Queueing {input_file.name} for a batched GCV request...")
+            try:
+                with gcv_trace.stage('api'):  # includes waiting for the batch to fill
+                    payload = spool.submit(vision.AnnotateImageRequest.serialize(request), self._send_batch)
+            except gcv_batch.BatchError as e:
+                log.error(f"Batched GCV request failed for {input_file.name}: {e}")
+                raise GCVError(f"GCV batch request failed: {e}") from e
+            response = vision.AnnotateImageResponse.deserialize(payload)
+        else:
+            with gcv_trace.stage('client_init'):
+                self._initialize_client()
+            log.debug(f"[{self.get_name()}] Sending request to GCV API...")
+            with gcv_trace.stage('api'):
+                response = self._call_gcv(
+                    lambda timeout: self.gcv_client.annotate_image(request=request, retry=None, timeout=timeout))
+            log.debug(f"[{self.get_name()}] Received response from GCV API.")
+
+        if response.error.message:
+            log.error(f"GCV API Error for {input_file.name}: {response.error.message}")
+            gcv_trace.count('api_errors')
+            raise GCVError(f"GCV API Error: {response.error.message}")
+        return response
+
+    def _annotate(self, content: bytes, language_hints: List[str], input_file: pathlib.Path) -> 'vision.AnnotateImageResponse':
+        """
+        Returns the GCV response for a page image, served from the response
+        cache when one is configured and already holds this exact request.
+        """
+        cache = self._get_cache()
+        if cache is None:
+            return self._request_annotation(content, language_hints, input_file)
+
+        key = gcv_cache.cache_key(content, language_hints, GCV_FEATURE_TYPE, self._response_version())
+        payload, hit = cache.get_or_fetch(
+            key,
+            lambda: _vision().AnnotateImageResponse.serialize(self._request_annotation(content, language_hints, input_file))
+        )
+        gcv_trace.annotate(cache_hit=hit)
+        if hit:
+            log.info(f"[{self.get_name()}] Using cached GCV response for {input_file.name}")
+        return _vision().AnnotateImageResponse.deserialize(payload)
+
+    def _response_version(self) -> str:
+        # Responses of another endpoint (e.g. a fake server) must not be served for the real API
+        endpoint = getattr(self.options, 'gcv_endpoint', None)
+        return f"{__version__}@{endpoint}" if endpoint else __version__
+
+    def _journal_entry(self, input_file: pathlib.Path) -> Optional[Tuple['gcv_journal.PageJournal', int, str]]:
+        """
+        The journal, page number and request key for a page image, or None
+        without --gcv-journal. The key covers the page image as rasterized
+        by ocrmypdf and every setting that changes the request.
+        """
+        journal_dir = getattr(self.options, 'gcv_journal', None)
+        page = _page_number(input_file)
+        if not journal_dir or page is None:
+            return None
+        upload = (getattr(self.options, 'gcv_upload_format', 'original'), getattr(self.options, 'gcv_upload_color', 'keep'),
+                  getattr(self.options, 'gcv_upload_max_dpi', None), getattr(self.options, 'gcv_upload_quality', 85))
+        key = gcv_cache.cache_key(gcv_image.page_image(input_file).data, self._map_languages_for_gcv(self.options),
+                                  GCV_FEATURE_TYPE, f"{self._response_version()}:{upload}")
+        return gcv_journal.PageJournal(journal_dir, self.options.gcv_journal_document), page, key
+
+    def _journaled_response(self, input_file: pathlib.Path) -> Optional[Tuple['vision.AnnotateImageResponse', float, float]]:
+        """Returns the response and upload scale factors journaled for this page by an earlier run, or None."""
+        entry = self._journal_entry(input_file)
+        if entry is None:
+            return None
+        journal, page, key = entry
+        with gcv_trace.stage('journal_read'):
+            journaled = journal.get(page, key)
+        if journaled is None:
+            return None
+        payload, scale_x, scale_y = journaled
+        gcv_stats.increment(getattr(self.options, 'gcv_run_dir', None), 'journal_pages_reused')
+        log.info(f"[{self.get_name()}] Using the journaled GCV response for page {page} ({input_file.name})")
+        return _vision().AnnotateImageResponse.deserialize(payload), scale_x, scale_y
+
+    def _journal_response(self, input_file: pathlib.Path, response: 'vision.AnnotateImageResponse',
+                          scale_x: float, scale_y: float):
+        entry = self._journal_entry(input_file)
+        if entry is None:
+            return
+        journal, page, key = entry
+        try:
+            with gcv_trace.stage('journal_write'):
+                journal.put(page, key, _vision().AnnotateImageResponse.serialize(response), scale_x, scale_y)
+        except OSError as e:
+            # The page itself is fine; a rerun would only have to send it again
+            log.warning(f"[{self.get_name()}] Could not journal the GCV response for {input_file.name}: {e}")
+
+    @staticmethod
+    def _pixel_hash(image_path: pathlib.Path) -> str:
+        """Hash of the decoded pixels, equal for re-saved copies of the same image."""
+        with gcv_image.page_image(image_path).open() as img:
+            img.load()
+            digest = hashlib.sha256(f"{img.mode}:{img.width}x{img.height}:".encode('ascii'))
+            digest.update(img.tobytes())
+        return digest.hexdigest()
+
+    def _remembered_response_path(self, input_file: pathlib.Path, pixel_hash: str) -> pathlib.Path:
+        return self._run_dir(input_file) / 'page-responses' / f"{pixel_hash}.pb"
+
+    def _remember_response(self, input_file: pathlib.Path, response: 'vision.AnnotateImageResponse'):
+        """Keeps a response for an image that ocrmypdf will hand to generate_hocr unchanged."""
+        path = self._remembered_response_path(input_file, self._pixel_hash(input_file))
+        path.parent.mkdir(exist_ok=True)
+        atomic_write(path, _vision().AnnotateImageResponse.serialize(response))
+
+    def _recall_response(self, input_file: pathlib.Path) -> Optional[Tuple['vision.AnnotateImageResponse', float, float]]:
+        """
+        Returns a response remembered for an image with the same pixels, with
+        the scale factors of the image that was uploaded, or None.
+        """
+        if getattr(self.options, 'gcv_orientation', 'tesseract') != 'gcv' or not getattr(self.options, 'deskew', False):
+            return None
+        path = self._remembered_response_path(input_file, self._pixel_hash(input_file))
+        try:
+            payload = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        path.unlink()
+        response = _vision().AnnotateImageResponse.deserialize(payload)
+        scale_x = scale_y = 1.0
+        pages = response.full_text_annotation.pages
+        if pages:
+            # GCV reports the size of the uploaded image
+            with gcv_image.page_image(input_file).open() as img:
+                scale_x = pages[0].width / img.width
+                scale_y = pages[0].height / img.height
+        gcv_stats.increment(getattr(self.options, 'gcv_run_dir', None), 'responses_reused')
+        log.info(f"[{self.get_name()}] Reusing the GCV response from deskewing for {input_file.name}")
+        return response, scale_x, scale_y
+
+    def _page_dpi(self, input_file: pathlib.Path) -> Tuple[float, float]:
+        with gcv_trace.stage('dpi_probe'):
+            image_dpi_x, image_dpi_y = self._get_image_dpi(input_file)
+        if image_dpi_x is None or image_dpi_y is None:
+             log.warning(f"Using default DPI of 72 for {input_file.name} due to detection issues. Text placement may be inaccurate.")
+             # Use a default DPI if detection fails, common default is 72 but 300 might be better for scans
+             image_dpi_x = image_dpi_y = getattr(self.options, 'image_dpi', 300.0) # Allow override or default to 300
+        return image_dpi_x, image_dpi_y
+
+    def _annotate_file(self, input_file: pathlib.Path, image_dpi_x: float, image_dpi_y: float) -> Tuple['vision.AnnotateImageResponse', float, float]:
+        """Reads, prepares and annotates a page image; returns the response and upload scale factors."""
+        # The page image buffer is shared with the other stages of this page
+        content = gcv_image.page_image(input_file).data
+
+        with gcv_trace.stage('upload_prepare'):
+            content, scale_x, scale_y = self._prepare_upload(content, image_dpi_x, image_dpi_y, input_file)
+        gcv_trace.annotate(upload_bytes=len(content))
+
+        # Make the API call, unless the response cache already has it
+        language_hints = self._map_languages_for_gcv(self.options)
+        response = self._annotate(content, language_hints, input_file)
+        if gcv_trace.active():
+            gcv_trace.annotate(response_bytes=_vision().AnnotateImageResponse.pb(response).ByteSize())
+        return response, scale_x, scale_y
+
     def _get_image_dpi(self, image_path: pathlib.Path) -> Tuple[Optional[float], Optional[float]]:
         """Helper function to get DPI from an image file using Pillow."""
         try:
-            with Image.open(image_path) as img:
+            with gcv_image.page_image(image_path).open() as img:  # only parses the header
                 dpi = img.info.get('dpi')
                 if dpi and isinstance(dpi, (tuple, list)) and len(dpi) == 2:
                     log.debug(f"Detected DPI for {image_path.name}: {dpi}")
@@ -239,157 +1229,339 @@ class GVisionOcrEngine(OcrEngine):
             return None, None
 
 
-    def generate_hocr(self, input_file: pathlib.Path, output_hocr: pathlib.Path, output_text: pathlib.Path, options: Namespace):
+    def _prepare_upload(self, content: bytes, dpi_x: float, dpi_y: float, input_file: pathlib.Path) -> Tuple[bytes, float, float]:
         """
-        Perform OCR using GCV and produce hOCR and plain text files.
+        Optionally reduces the page image before upload: color conversion,
+        downsampling to --gcv-upload-max-dpi and re-encoding. Returns the
+        bytes to send and the scale factors (uploaded pixels per original
+        pixel) the hOCR converter needs to map coordinates back.
+        """
+        upload_format = getattr(self.options, 'gcv_upload_format', 'original')
+        color = getattr(self.options, 'gcv_upload_color', 'keep')
+        max_dpi = getattr(self.options, 'gcv_upload_max_dpi', None)
+        if upload_format == 'original' and color == 'keep' and not max_dpi:
+            return content, 1.0, 1.0
+
+        try:
+            with Image.open(gcv_image.BufferReader(content)) as img:
+                img.load()
+                source_format = img.format
+                original_size = img.size
+                if color == 'gray' and img.mode != 'L':
+                    img = img.convert('L')
+                elif color == 'bilevel' and img.mode != '1':
+                    img = img.convert('L').convert('1', dither=Image.Dither.NONE)
+
+                if max_dpi and max(dpi_x, dpi_y) > max_dpi:
+                    factor = max_dpi / max(dpi_x, dpi_y)
+                    new_size = (max(1, round(img.width * factor)), max(1, round(img.height * factor)))
+                    resample = Image.Resampling.NEAREST if img.mode == '1' else Image.Resampling.LANCZOS
+                    img = img.resize(new_size, resample)
+
+                if upload_format == 'original':
+                    save_format = 'jpeg' if source_format == 'JPEG' else 'png'
+                else:
+                    save_format = upload_format
+                save_args = {}
+                if save_format in ('jpeg', 'webp'):
+                    save_args['quality'] = getattr(self.options, 'gcv_upload_quality', 85)
+                    if img.mode not in ('L', 'RGB'):
+                        img = img.convert('L' if img.mode in ('1', 'LA') else 'RGB')
+                buffer = io.BytesIO()
+                img.save(buffer, format=save_format, **save_args)
+                scale_x = img.width / original_size[0]
+                scale_y = img.height / original_size[1]
+        except Exception as e:
+            log.warning(f"Could not reduce {input_file.name} before upload, sending original: {e}")
+            return content, 1.0, 1.0
+
+        reduced = buffer.getvalue()
+        if len(reduced) >= len(content) and scale_x == scale_y == 1.0:
+            log.debug(f"[{self.get_name()}] Re-encoding did not shrink {input_file.name}, sending original")
+            return content, 1.0, 1.0
+        log.debug(f"[{self.get_name()}] Upload for {input_file.name} reduced from {len(content)} "
+                  f"to {len(reduced)} bytes (scale {scale_x:.3f} x {scale_y:.3f})")
+        return reduced, scale_x, scale_y
+
+    def _ocr_page(self, input_file: pathlib.Path, options: Namespace) -> Tuple[Optional['gcv2hocr2.GCVDocument'], str, float, float]:
+        """
+        Runs GCV on one page image and converts the response. Returns the
+        converted document (None if GCV found no text), the plain text and the
+        DPI the page was converted with.
         """
         self.options = options if options else Namespace()
         if not hasattr(self.options, 'gcv_keyfile'):
              self.options.gcv_keyfile = None
 
-        self._initialize_client()
-
         log.info(f"[{self.get_name()}] Performing OCR on {input_file.name}")
 
         # --- Get image DPI ---
-        image_dpi_x, image_dpi_y = self._get_image_dpi(input_file)
-        if image_dpi_x is None or image_dpi_y is None:
-             log.warning(f"Using default DPI of 72 for {input_file.name} due to detection issues. Text placement may be inaccurate.")
-             # Use a default DPI if detection fails, common default is 72 but 300 might be better for scans
-             image_dpi_x = image_dpi_y = getattr(options, 'image_dpi', 300.0) # Allow override or default to 300
+        image_dpi_x, image_dpi_y = self._page_dpi(input_file)
 
         try:
-            # Read image content
-            with io.open(input_file, 'rb') as image_file:
-                content = image_file.read()
-            image = vision.Image(content=content)
-
-            # Prepare GCV request
-            features = [vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)]
-            language_hints = self._map_languages_for_gcv(options)
-            image_context = vision.ImageContext(language_hints=language_hints)
-            request = vision.AnnotateImageRequest(image=image, features=features, image_context=image_context)
-
-            # Make the API call
-            log.debug(f"[{self.get_name()}] Sending request to GCV API...")
-            response = self.gcv_client.annotate_image(request=request)
-            log.debug(f"[{self.get_name()}] Received response from GCV API.")
-
-            if response.error.message:
-                log.error(f"GCV API Error for {input_file.name}: {response.error.message}")
-                raise ocrmypdf.exceptions.ExecError(f"GCV API Error: {response.error.message}")
+            journaled = self._journaled_response(input_file)
+            recalled = self._recall_response(input_file) if journaled is None else None
+            if journaled is not None:
+                response, scale_x, scale_y = journaled
+                gcv_trace.annotate(journaled_response=True)
+            elif recalled is not None:
+                response, scale_x, scale_y = recalled
+                gcv_trace.annotate(reused_response=True)
+                self._journal_response(input_file, response, scale_x, scale_y)
+            else:
+                response, scale_x, scale_y = self._annotate_file(input_file, image_dpi_x, image_dpi_y)
+                self._journal_response(input_file, response, scale_x, scale_y)
 
             if not response.full_text_annotation:
                  log.warning(f"[{self.get_name()}] GCV returned no text annotation for {input_file.name}. Generating empty output.")
-                 output_hocr.touch()
-                 output_text.touch()
-                 return
+                 return None, "", image_dpi_x, image_dpi_y
 
-            # Convert GCV JSON response to hOCR using gcv2hocr2 module
-            json_response_str = AnnotateImageResponse.to_json(response)
-            gcv_dict = json.loads(json_response_str)
-            resp_for_gcv = {"responses": [gcv_dict]}
-
-            log.debug(f"[{self.get_name()}] Converting GCV response to hOCR using gcv2hocr2...")
+            log.debug(f"[{self.get_name()}] Converting GCV response using gcv2hocr2...")
+            # Convert the response protobuf directly; no JSON round trip
             # --- Pass DPI to the converter ---
-            hocr_page_obj = gcv2hocr2.fromResponse(
-                resp_for_gcv,
-                input_file.stem,
-                image_dpi_x=image_dpi_x, # Pass detected DPI X
-                image_dpi_y=image_dpi_y  # Pass detected DPI Y
-            )
-            hocr_content = hocr_page_obj.render()
-
-            if hocr_content:
-                log.debug(f"[{self.get_name()}] Generated hOCR content (first 500 chars): {hocr_content[:500]}")
-            else:
-                log.warning(f"[{self.get_name()}] Generated hOCR content is EMPTY for {input_file.name}")
-            log.debug(f"[{self.get_name()}] Attempting to write hOCR to: {output_hocr}")
-            log.debug(f"[{self.get_name()}] hOCR conversion complete.")
-
-            plain_text_content = response.full_text_annotation.text
-
-            # Write the output files
-            try:
-                log.debug(f"[{self.get_name()}] Writing hOCR file...")
-                with open(output_hocr, "w", encoding="utf-8") as f_hocr:
-                    f_hocr.write(hocr_content)
-                log.debug(f"[{self.get_name()}] Finished writing hOCR file.")
+            # The converter takes the line tolerance in pixels of the uploaded image
+            line_tolerance_px = getattr(self.options, 'gcv_line_tolerance', 3.0) * image_dpi_y * scale_y / 72.0
+            with gcv_trace.stage('convert'):
+                document = gcv2hocr2.fromAnnotation(
+                    response.full_text_annotation,
+                    input_file.stem,
+                    image_dpi_x=image_dpi_x, # Pass detected DPI X
+                    image_dpi_y=image_dpi_y, # Pass detected DPI Y
+                    scale_x=scale_x, # Uploaded image may have been downsampled
+                    scale_y=scale_y,
+                    line_mode=getattr(self.options, 'gcv_line_mode', 'breaks'),
+                    baseline_tolerance=line_tolerance_px
+                )
+            if not response.full_text_annotation.pages:
+                log.warning(f"[{self.get_name()}] Converted page is EMPTY for {input_file.name}")
+            return document, response.full_text_annotation.text or "", image_dpi_x, image_dpi_y
 
-                log.debug(f"[{self.get_name()}] Writing plain text file to: {output_text}")
-                with open(output_text, "w", encoding="utf-8") as f_text:
-                    f_text.write(plain_text_content if plain_text_content else "")
-                log.debug(f"[{self.get_name()}] Finished writing plain text file.")
-
-                log.info(f"[{self.get_name()}] Successfully generated and wrote hOCR and text for {input_file.name}")
-            except IOError as e:
-                 log.error(f"Failed to write output files for {input_file.name}: {e}")
-                 raise ocrmypdf.exceptions.ExecError(f"IOError writing output: {e}") from e
-
-        except google.api_core.exceptions.GoogleAPICallError as e:
-            log.exception(f"Google API Call Error during GCV OCR for {input_file.name}: {e}")
-            raise ocrmypdf.exceptions.ExecError(f"GCV API Call Error: {e}") from e
-        except ocrmypdf.exceptions.ExecError:
+        except (GCVError, GCVClientError):
              raise
+        except _gcv_failures() as e:
+            log.exception(f"Google API Call Error during GCV OCR for {input_file.name}: {e}")
+            raise GCVError(f"GCV API Call Error: {e}") from e
         except Exception as e:
             log.exception(f"Unexpected error during GCV OCR for {input_file.name}: {e}")
             raise RuntimeError(f"Plugin error during GCV OCR: {e}") from e
 
-    def generate_text_only_pdf(self, input_file: pathlib.Path, output_pdf: pathlib.Path, output_text: pathlib.Path, options: Namespace):
+    def generate_hocr(self, input_file: pathlib.Path, output_hocr: pathlib.Path, output_text: pathlib.Path, options: Namespace):
+        """
+        Perform OCR using GCV and produce hOCR and plain text files.
         """
-        Perform OCR and produce a text-only PDF.
+        with _page_operation(options, input_file, 'ocr'):
+            page = self._ocr_page_or_fallback(input_file, options)
+            if page is None:
+                with gcv_trace.stage('tesseract_ocr'):
+                    TesseractOcrEngine.generate_hocr(input_file, output_hocr, output_text, options)
+                return
+            self._write_hocr(input_file, page, output_hocr, output_text)
+
+    def _ocr_page_or_fallback(self, input_file: pathlib.Path, options: Namespace) -> Optional[Tuple[Optional['gcv2hocr2.GCVDocument'], str, float, float]]:
+        """
+        Runs _ocr_page, or returns None if the page is to be OCR'd with
+        Tesseract instead (--gcv-fallback tesseract): while the circuit
+        breaker is open, or when GCV failed on this page. Blank pages get an
+        empty page without either.
         """
         self.options = options if options else Namespace()
-        if not hasattr(self.options, 'gcv_keyfile'):
-             self.options.gcv_keyfile = None
+        blank = self._blank_page(input_file)
+        if blank is not None:
+            return blank
+        if getattr(self.options, 'gcv_fallback', 'none') != 'tesseract':
+            gcv_trace.annotate(engine='gcv')
+            return self._ocr_page(input_file, options)
+        if not self._gcv_allowed(input_file):
+            log.info(f"[{self.get_name()}] GCV circuit breaker is open, using Tesseract for {input_file.name}")
+        else:
+            gcv_trace.annotate(engine='gcv')
+            try:
+                return self._ocr_page(input_file, options)
+            except _gcv_failures() as e:
+                log.warning(f"[{self.get_name()}] GCV failed on {input_file.name}, using Tesseract instead: {e}")
+            finally:
+                self._release_probe(input_file)
+        gcv_trace.annotate(engine='tesseract')
+        gcv_stats.increment(getattr(self.options, 'gcv_run_dir', None), 'tesseract_pages')
+        return None
 
-        log.warning(
-            f"[{self.get_name()}] generate_text_only_pdf is not fully implemented. "
-            f"Generating hOCR+text and an empty PDF for {input_file.name}."
-        )
-        hocr_temp = output_pdf.parent / f"{output_pdf.stem}.hocr"
-        log.debug(f"[{self.get_name()}] Temp hOCR path for text_only_pdf: {hocr_temp}")
+    def _blank_page(self, input_file: pathlib.Path) -> Optional[Tuple['gcv2hocr2.GCVDocument', str, float, float]]:
+        """
+        With --gcv-blank-threshold, returns an empty page of the image's size
+        if the image has less ink than the threshold and almost uniform gray
+        levels, so that it is not sent to GCV; otherwise None.
+        """
+        threshold = getattr(self.options, 'gcv_blank_threshold', None)
+        if threshold is None:
+            return None
+        try:
+            with gcv_trace.stage('blank_check'):
+                with gcv_image.page_image(input_file).open() as img:
+                    width_px, height_px = img.size
+                    coverage, stddev = _ink_coverage(img)
+        except Exception as e:
+            log.warning(f"[{self.get_name()}] Could not check whether {input_file.name} is blank: {e}")
+            return None
+        gcv_trace.annotate(ink_coverage=round(coverage, 6), gray_stddev=round(stddev, 2))
+        log.debug(f"[{self.get_name()}] {input_file.name}: {coverage:.4%} ink, gray level deviation {stddev:.1f}")
+        if coverage * 100 >= threshold or stddev >= BLANK_MAX_STDDEV:
+            return None
 
+        log.info(f"[{self.get_name()}] {input_file.name} is blank ({coverage:.4%} ink), not sending it to GCV")
+        gcv_stats.increment(getattr(self.options, 'gcv_run_dir', None), 'blank_pages_skipped')
+        gcv_trace.annotate(engine='none', blank=True)
+        image_dpi_x, image_dpi_y = self._page_dpi(input_file)
+        document = gcv2hocr2.blankDocument(input_file.stem, width_px, height_px,
+                                           image_dpi_x=image_dpi_x, image_dpi_y=image_dpi_y)
+        return document, "", image_dpi_x, image_dpi_y
+
+    def _write_hocr(self, input_file: pathlib.Path, page: Tuple[Optional['gcv2hocr2.GCVDocument'], str, float, float],
+                    output_hocr: pathlib.Path, output_text: pathlib.Path):
+        hocr_document, plain_text_content, _, _ = page
+        if hocr_document is None:
+            output_hocr.touch()
+            output_text.touch()
+            return
+
+        # Write the output files
         try:
-            # generate_hocr needs to be called to get text output
-            self.generate_hocr(input_file, hocr_temp, output_text, options)
+            # Building and rendering the pages happens while the file is written;
+            # file_write is what remains
+            timings = {}
+            started = time.perf_counter()
+            log.debug(f"[{self.get_name()}] Writing hOCR file to: {output_hocr}")
+            with open(output_hocr, "w", encoding="utf-8") as f_hocr:
+                hocr_document.write(f_hocr, timings=timings) # Streamed element by element
+            log.debug(f"[{self.get_name()}] Finished writing hOCR file.")
 
-            try:
-                from reportlab.pdfgen import canvas
-                c = canvas.Canvas(str(output_pdf))
-                c.setTitle(f"Text Layer for {input_file.name}")
-                c.setAuthor(self.creator_tag(options))
-                c.save()
-                log.info(f"[{self.get_name()}] Created empty placeholder PDF: {output_pdf.name}")
-            except ImportError:
-                log.error("reportlab not found, cannot create empty PDF for text-only output.")
-                output_pdf.touch()
-            except Exception as e:
-                 log.error(f"Failed to create empty PDF: {e}")
-                 output_pdf.touch()
+            log.debug(f"[{self.get_name()}] Writing plain text file to: {output_text}")
+            with open(output_text, "w", encoding="utf-8") as f_text:
+                f_text.write(plain_text_content)
+            log.debug(f"[{self.get_name()}] Finished writing plain text file.")
+            timings['file_write'] = time.perf_counter() - started - sum(timings.values())
+            gcv_trace.add_stages(timings)
 
-        finally:
-            if hocr_temp.exists():
-                try:
-                    log.debug(f"[{self.get_name()}] Keeping temporary hOCR file for inspection: {hocr_temp}")
-                    pass # Keep hocr file for inspection
-                except OSError as e:
-                    log.warning(f"Could not remove temporary hOCR file {hocr_temp}: {e}")
-            else:
-                 log.warning(f"[{self.get_name()}] Temporary hOCR file not found at expected path: {hocr_temp}")
+            log.info(f"[{self.get_name()}] Successfully generated and wrote hOCR and text for {input_file.name}")
+        except IOError as e:
+             log.error(f"Failed to write output files for {input_file.name}: {e}")
+             raise GCVError(f"IOError writing output: {e}") from e
+
+    def _image_size_pt(self, input_file: pathlib.Path, dpi_x: float, dpi_y: float) -> Tuple[float, float]:
+        """Size of the page image in points at the given resolution."""
+        with gcv_image.page_image(input_file).open() as img:
+            width_px, height_px = img.size
+        return width_px * 72.0 / dpi_x, height_px * 72.0 / dpi_y
+
+    def generate_text_only_pdf(self, input_file: pathlib.Path, output_pdf: pathlib.Path, output_text: pathlib.Path, options: Namespace):
+        """
+        Perform OCR and produce a text-only PDF: the page's words as invisible
+        text, which ocrmypdf's sandwich renderer lays over the page image.
+        """
+        with _page_operation(options, input_file, 'ocr'):
+            page = self._ocr_page_or_fallback(input_file, options)
+            if page is None:
+                with gcv_trace.stage('tesseract_ocr'):
+                    TesseractOcrEngine.generate_pdf(input_file, output_pdf, output_text, options)
+                return
+            self._write_text_only_pdf(input_file, page, output_pdf, output_text, options)
 
+    def _write_text_only_pdf(self, input_file: pathlib.Path, page: Tuple[Optional['gcv2hocr2.GCVDocument'], str, float, float],
+                             output_pdf: pathlib.Path, output_text: pathlib.Path, options: Namespace):
+        document, plain_text_content, image_dpi_x, image_dpi_y = page
+        if document is None:
+            # A blank page of the image's size
+            document = gcv2hocr2.fromAnnotation(None, input_file.stem)
+        try:
+            blank_size = self._image_size_pt(input_file, image_dpi_x, image_dpi_y)
+            with gcv_trace.stage('text_pdf'):  # builds the pages and writes the PDF
+                gcv_textpdf.write_text_pdf(
+                    document, output_pdf,
+                    blank_size=blank_size,
+                    font_path=getattr(self.options, 'gcv_pdf_font', None),
+                    title=f"Text Layer for {input_file.name}",
+                    creator=self.creator_tag(options),
+                )
+            with gcv_trace.stage('file_write'):
+                with open(output_text, "w", encoding="utf-8") as f_text:
+                    f_text.write(plain_text_content)
+            log.info(f"[{self.get_name()}] Successfully generated text-only PDF and text for {input_file.name}")
+        except ImportError as e:
+            log.error("reportlab not found, cannot create the text-only PDF. pip install reportlab")
+            raise GCVError("reportlab is required for the sandwich PDF renderer") from e
+        except IOError as e:
+             log.error(f"Failed to write output files for {input_file.name}: {e}")
+             raise GCVError(f"IOError writing output: {e}") from e
 
     def generate_pdf(self, input_file: pathlib.Path, output_pdf: pathlib.Path, output_text: pathlib.Path, options: Namespace):
         """
-        Delegate to generate_text_only_pdf to satisfy the interface call.
+        Produce the text-only PDF that ocrmypdf's sandwich renderer asks for.
         """
-        log.warning(f"[{self.get_name()}] generate_pdf called unexpectedly; delegating to generate_text_only_pdf.")
         self.generate_text_only_pdf(input_file, output_pdf, output_text, options)
 
 
-    # --- Delegate Orientation/Deskew to Tesseract ---
+    # --- Orientation/Deskew: from GCV word directions, or delegated to Tesseract ---
+    def _gcv_orientation(self, input_file: pathlib.Path) -> OrientationConfidence:
+        response, _, _ = self._annotate_file(input_file, *self._page_dpi(input_file))
+        with gcv_trace.stage('orientation_estimate'):
+            directions = gcv_orientation.word_directions(response.full_text_annotation)
+            angle, confidence = gcv_orientation.estimate_orientation(directions)
+        log.debug(f"[{self.get_name()}] GCV orientation for {input_file.name}: {angle} degrees, "
+                  f"confidence {confidence:.1f} from {len(directions)} words")
+        gcv_stats.increment(getattr(self.options, 'gcv_run_dir', None), 'gcv_orientations')
+        return OrientationConfidence(angle=angle, confidence=confidence)
+
+    def _gcv_deskew(self, input_file: pathlib.Path) -> float:
+        response, _, _ = self._annotate_file(input_file, *self._page_dpi(input_file))
+        with gcv_trace.stage('skew_estimate'):
+            directions = gcv_orientation.word_directions(response.full_text_annotation)
+            orientation, _ = gcv_orientation.estimate_orientation(directions)
+            skew = gcv_orientation.estimate_skew(directions, orientation)
+        log.debug(f"[{self.get_name()}] GCV skew for {input_file.name}: {skew:.2f} degrees from {len(directions)} words")
+        gcv_stats.increment(getattr(self.options, 'gcv_run_dir', None), 'gcv_deskews')
+        if abs(skew) < _DESKEW_MIN_DEGREES:
+            # The image will be OCR'd as it is; save the second API call
+            self._remember_response(input_file, response)
+            return 0.0
+        return skew
+
     @staticmethod
-    def get_orientation(input_file: pathlib.Path, options: Namespace) -> Tuple[int, float]:
+    def get_orientation(input_file: pathlib.Path, options: Namespace) -> OrientationConfidence:
+        """Estimate orientation from GCV with --gcv-orientation gcv, else (or on failure) with Tesseract."""
+        with _page_operation(options, input_file, 'orientation'):
+            engine = GVisionOcrEngine(options)
+            if getattr(options, 'gcv_orientation', 'tesseract') == 'gcv' and engine._gcv_allowed(input_file):
+                try:
+                    gcv_trace.annotate(engine='gcv')
+                    return engine._gcv_orientation(input_file)
+                except Exception as e:
+                    log.warning(f"[{GVisionOcrEngine.get_name()}] GCV orientation check failed for {input_file.name}, "
+                                f"falling back to Tesseract: {e}")
+                    gcv_stats.increment(getattr(options, 'gcv_run_dir', None), 'tesseract_fallbacks')
+                finally:
+                    engine._release_probe(input_file)
+            gcv_trace.annotate(engine='tesseract')
+            return GVisionOcrEngine._tesseract_orientation(input_file, options)
+
+    @staticmethod
+    def get_deskew(input_file: pathlib.Path, options: Namespace) -> float:
+        """Estimate skew from GCV with --gcv-orientation gcv, else (or on failure) with Tesseract."""
+        with _page_operation(options, input_file, 'deskew'):
+            engine = GVisionOcrEngine(options)
+            if getattr(options, 'gcv_orientation', 'tesseract') == 'gcv' and engine._gcv_allowed(input_file):
+                try:
+                    gcv_trace.annotate(engine='gcv')
+                    return engine._gcv_deskew(input_file)
+                except Exception as e:
+                    log.warning(f"[{GVisionOcrEngine.get_name()}] GCV deskew check failed for {input_file.name}, "
+                                f"falling back to Tesseract: {e}")
+                    gcv_stats.increment(getattr(options, 'gcv_run_dir', None), 'tesseract_fallbacks')
+                finally:
+                    engine._release_probe(input_file)
+            gcv_trace.annotate(engine='tesseract')
+            return GVisionOcrEngine._tesseract_deskew(input_file, options)
+
+    @staticmethod
+    def _tesseract_orientation(input_file: pathlib.Path, options: Namespace) -> OrientationConfidence:
         """Delegate orientation check to Tesseract."""
         current_options = options if options else Namespace()
         if not hasattr(current_options, 'tesseract_oem'): current_options.tesseract_oem = None
@@ -397,20 +1569,21 @@ class GVisionOcrEngine(OcrEngine):
 
         log.debug(f"[{GVisionOcrEngine.get_name()}] Delegating orientation check to Tesseract for {input_file.name}")
         try:
-            return tesseract.get_orientation(
-                input_file,
-                engine_mode=current_options.tesseract_oem,
-                timeout=current_options.tesseract_timeout,
-            )
+            with gcv_trace.stage('tesseract_orientation'):
+                return tesseract.get_orientation(
+                    input_file,
+                    engine_mode=current_options.tesseract_oem,
+                    timeout=current_options.tesseract_timeout,
+                )
         except FileNotFoundError:
             log.error("Tesseract not found. Orientation check requires Tesseract.")
-            return (0, 0.0)
+            return OrientationConfidence(angle=0, confidence=0.0)
         except Exception as e:
             log.exception(f"Error during Tesseract orientation check: {e}")
-            return (0, 0.0)
+            return OrientationConfidence(angle=0, confidence=0.0)
 
     @staticmethod
-    def get_deskew(input_file: pathlib.Path, options: Namespace) -> float:
+    def _tesseract_deskew(input_file: pathlib.Path, options: Namespace) -> float:
         """Delegate deskew check to Tesseract."""
         current_options = options if options else Namespace()
         if not hasattr(current_options, 'language'): current_options.language = 'eng'
@@ -420,12 +1593,13 @@ class GVisionOcrEngine(OcrEngine):
         log.debug(f"[{GVisionOcrEngine.get_name()}] Delegating deskew check to Tesseract for {input_file.name}")
         try:
              tess_langs_list = list(getattr(current_options, 'language', 'eng').split('+'))
-             return tesseract.get_deskew(
-                 input_file,
-                 languages=tess_langs_list,
-                 engine_mode=current_options.tesseract_oem,
-                 timeout=current_options.tesseract_timeout,
-             )
+             with gcv_trace.stage('tesseract_deskew'):
+                 return tesseract.get_deskew(
+                     input_file,
+                     languages=tess_langs_list,
+                     engine_mode=current_options.tesseract_oem,
+                     timeout=current_options.tesseract_timeout,
+                 )
         except FileNotFoundError:
             log.error("Tesseract not found. Deskew check requires Tesseract.")
             return 0.0
@@ -433,9 +1607,3 @@ class GVisionOcrEngine(OcrEngine):
             log.exception(f"Error during Tesseract deskew check: {e}")
             return 0.0
 
-# --- OCRmyPDF Engine Registration ---
-
-@hookimpl
-def get_ocr_engine() -> OcrEngine:
-    """Registers the GVisionOcrEngine with OCRmyPDF."""
-    return GVisionOcrEngine()
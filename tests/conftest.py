@@ -0,0 +1,25 @@
+import argparse
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The synthetic responses of the benchmarks
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import gvision  # noqa: E402
+
+
+@pytest.fixture
+def plugin_options():
+    """Returns a function building an options namespace with the plugin's defaults and the given values."""
+    def make(**values):
+        parser = argparse.ArgumentParser()
+        gvision.add_options(parser)
+        options = parser.parse_args([], namespace=argparse.Namespace(language='eng', gcv_keyfile=None))
+        for name, value in values.items():
+            setattr(options, name, value)
+        return options
+    return make
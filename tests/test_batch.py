@@ -0,0 +1,88 @@
+import os
+import threading
+
+import pytest
+
+import gcv_batch
+from gcv_locking import atomic_write
+
+
+def _echo(payloads):
+    return [b'response ' + payload for payload in payloads]
+
+
+def test_concurrent_submitters_share_batches(tmp_path):
+    spool = gcv_batch.BatchSpool(tmp_path, batch_size=4, flush_seconds=0.2)
+    batches = []
+
+    def send(payloads):
+        batches.append(len(payloads))
+        return _echo(payloads)
+
+    results = {}
+
+    def submit(n):
+        results[n] = spool.submit(f'{n}'.encode(), send)
+
+    threads = [threading.Thread(target=submit, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {n: f'response {n}'.encode() for n in range(8)}
+    assert sum(batches) == 8 and len(batches) < 8
+    assert os.listdir(tmp_path) == ['leader.lock']
+
+
+def test_failed_batch_reaches_every_submitter(tmp_path):
+    spool = gcv_batch.BatchSpool(tmp_path, flush_seconds=0)
+
+    def send(payloads):
+        raise RuntimeError('quota')
+
+    with pytest.raises(gcv_batch.BatchError, match='quota'):
+        spool.submit(b'page', send)
+
+
+def test_leader_skips_claims_of_submitters_that_gave_up(tmp_path, monkeypatch):
+    spool = gcv_batch.BatchSpool(tmp_path, flush_seconds=0)
+    for request_id in ('a', 'b', 'c'):
+        atomic_write(spool._path(request_id, 'req'), request_id.encode())
+    rename = os.rename
+
+    def rename_then_time_out(source, destination):
+        rename(source, destination)
+        if destination == spool._path('b', 'claimed'):
+            os.unlink(destination)  # as submit does on timeout
+
+    monkeypatch.setattr(gcv_batch.os, 'rename', rename_then_time_out)
+    sent = []
+
+    def send(payloads):
+        sent.extend(payloads)
+        return _echo(payloads)
+
+    assert spool._lead(send)
+    assert sorted(sent) == [b'a', b'c']
+    for request_id in ('a', 'c'):
+        with open(spool._path(request_id, 'resp'), 'rb') as f:
+            assert f.read() == b'response ' + request_id.encode()
+    assert sorted(os.listdir(tmp_path)) == ['a.resp', 'c.resp', 'leader.lock']
+
+
+def test_claims_get_an_error_when_the_leader_fails_before_sending(tmp_path, monkeypatch):
+    spool = gcv_batch.BatchSpool(tmp_path, flush_seconds=0)
+    atomic_write(spool._path('a', 'req'), b'a')
+    real_open = open
+
+    def broken_open(path, *args, **kwargs):
+        if os.fspath(path).endswith('.claimed'):
+            raise PermissionError('unreadable')
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr('builtins.open', broken_open)
+    assert spool._lead(_echo)
+    monkeypatch.undo()
+    with open(spool._path('a', 'err'), 'rb') as f:
+        assert f.read() == b'unreadable'
+    assert not os.path.exists(spool._path('a', 'claimed'))
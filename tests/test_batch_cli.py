@@ -0,0 +1,86 @@
+import json
+import os
+
+import pytest
+
+import gcv2hocr2
+from synthetic import make_response
+
+
+@pytest.fixture
+def responses(tmp_path):
+    source = tmp_path / 'in'
+    (source / 'sub').mkdir(parents=True)
+    for index, path in enumerate([source / 'a.json', source / 'sub' / 'b.json']):
+        path.write_text(json.dumps(make_response(words=10, seed=index)), encoding='utf-8')
+    return source
+
+
+def _item(source, output_path, skip, **settings):
+    return (str(source), str(source), None, str(output_path), settings, skip)
+
+
+def test_converts_next_to_the_inputs(responses):
+    summary = gcv2hocr2.run_batch([str(responses)], jobs=1)
+    assert (summary['converted'], summary['skipped'], summary['failed']) == (2, 0, 0)
+    assert summary['pages'] == 2
+    assert (responses / 'a.hocr').exists() and (responses / 'sub' / 'b.hocr').exists()
+
+
+def test_output_dir_keeps_the_relative_layout(responses, tmp_path):
+    summary = gcv2hocr2.run_batch([str(responses / '**' / '*.json')], output_dir=str(tmp_path / 'out'), jobs=2)
+    assert summary['converted'] == 2
+    assert (tmp_path / 'out' / 'a.hocr').exists() and (tmp_path / 'out' / 'sub' / 'b.hocr').exists()
+
+
+def test_skip_by_mtime(responses):
+    source = responses / 'a.json'
+    output = responses / 'a.hocr'
+    assert gcv2hocr2._convert_batch_item(_item(source, output, 'mtime'))[1] == 'converted'
+    assert gcv2hocr2._convert_batch_item(_item(source, output, 'mtime'))[1] == 'skipped'
+    # A response newer than its output is converted again
+    os.utime(source, (os.path.getmtime(output) + 10,) * 2)
+    assert gcv2hocr2._convert_batch_item(_item(source, output, 'mtime'))[1] == 'converted'
+    assert gcv2hocr2._convert_batch_item(_item(source, output, 'none'))[1] == 'converted'
+
+
+def test_skip_by_hash(responses):
+    source = responses / 'a.json'
+    output = responses / 'a.hocr'
+    assert gcv2hocr2._convert_batch_item(_item(source, output, 'hash'))[1] == 'converted'
+    assert (responses / 'a.hocr.sha256').exists()
+    # Touching the response does not change its hash
+    os.utime(source, (os.path.getmtime(output) + 10,) * 2)
+    assert gcv2hocr2._convert_batch_item(_item(source, output, 'hash'))[1] == 'skipped'
+    # Different settings or content do
+    assert gcv2hocr2._convert_batch_item(_item(source, output, 'hash', image_dpi_x=150))[1] == 'converted'
+    source.write_text(json.dumps(make_response(words=11)), encoding='utf-8')
+    assert gcv2hocr2._convert_batch_item(_item(source, output, 'hash', image_dpi_x=150))[1] == 'converted'
+    # A missing output is written again even if the hash matches
+    output.unlink()
+    assert gcv2hocr2._convert_batch_item(_item(source, output, 'hash', image_dpi_x=150))[1] == 'converted'
+
+
+def test_ndjson_records_are_compared_by_hash(tmp_path):
+    stream = tmp_path / 'pages.ndjson'
+    stream.write_text('\n'.join(json.dumps(make_response(words=5, seed=seed)) for seed in range(3)) + '\n\n',
+                      encoding='utf-8')
+    summary = gcv2hocr2.run_batch([str(stream)], ndjson=True, jobs=1)
+    assert summary['converted'] == 3
+    assert sorted(path.name for path in tmp_path.glob('*.hocr')) == \
+        ['pages-000001.hocr', 'pages-000002.hocr', 'pages-000003.hocr']
+    assert gcv2hocr2.run_batch([str(stream)], ndjson=True, jobs=1)['skipped'] == 3
+
+
+def test_failures_are_counted_and_leave_no_output(responses):
+    (responses / 'broken.json').write_text('{"responses": [', encoding='utf-8')
+    summary = gcv2hocr2.run_batch([str(responses)], jobs=1)
+    assert (summary['converted'], summary['failed']) == (2, 1)
+    assert summary['failures'][0][0] == str(responses / 'broken.json')
+    assert not (responses / 'broken.hocr').exists()
+    assert not list(responses.glob('.tmp-*'))
+
+
+def test_unknown_skip_mode():
+    with pytest.raises(ValueError):
+        gcv2hocr2.run_batch([], skip='size')
@@ -0,0 +1,63 @@
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+import gvision
+
+SIZE = (2550, 3300)
+
+
+def text_page(path, background, ink, lines=30):
+    img = Image.new('L', SIZE, background)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=40)
+    for line in range(lines):
+        draw.text((200, 200 + line * 90), "The quick brown fox jumps over the lazy dog 0123456789", fill=ink, font=font)
+    img.save(path, dpi=(300, 300))
+    return path
+
+
+def speck_page(path):
+    img = Image.new('L', SIZE, 240)
+    draw = ImageDraw.Draw(img)
+    rnd = random.Random(1)
+    for _ in range(300):
+        x, y = rnd.randrange(SIZE[0]), rnd.randrange(SIZE[1])
+        draw.ellipse((x, y, x + 3, y + 3), fill=30)
+    img.save(path, dpi=(300, 300))
+    return path
+
+
+def blank_page(plugin_options, path):
+    engine = gvision.GVisionOcrEngine(plugin_options(gcv_blank_threshold=0.05))
+    return engine._blank_page(path)
+
+
+def test_specks_are_blank(plugin_options, tmp_path):
+    page = blank_page(plugin_options, speck_page(tmp_path / '000001_ocr.png'))
+    assert page is not None
+    document, text, _, _ = page
+    assert text == "" and document.page_count == 1
+
+
+def test_white_text_on_dark_page_is_not_blank(plugin_options, tmp_path):
+    path = text_page(tmp_path / '000001_ocr.png', background=0, ink=255)
+    with Image.open(path) as img:
+        coverage, _ = gvision._ink_coverage(img)
+    assert coverage > 0.01
+    assert blank_page(plugin_options, path) is None
+
+
+def test_light_text_is_not_blank(plugin_options, tmp_path):
+    path = text_page(tmp_path / '000001_ocr.png', background=255, ink=200)
+    assert blank_page(plugin_options, path) is None
+
+
+def test_single_line_of_light_text_is_not_blank(plugin_options, tmp_path):
+    path = text_page(tmp_path / '000001_ocr.png', background=255, ink=210, lines=1)
+    assert blank_page(plugin_options, path) is None
+
+
+def test_show_through_is_blank(plugin_options, tmp_path):
+    path = text_page(tmp_path / '000001_ocr.png', background=255, ink=235)
+    assert blank_page(plugin_options, path) is not None
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+import gcv_cache
+
+
+def test_key_covers_everything_that_changes_the_response():
+    key = gcv_cache.cache_key(b'image', ['en'], 'DOCUMENT_TEXT_DETECTION', '1.0')
+    assert key == gcv_cache.cache_key(b'image', ['en'], 'DOCUMENT_TEXT_DETECTION', '1.0')
+    assert key != gcv_cache.cache_key(b'image2', ['en'], 'DOCUMENT_TEXT_DETECTION', '1.0')
+    assert key != gcv_cache.cache_key(b'image', ['de'], 'DOCUMENT_TEXT_DETECTION', '1.0')
+    assert key != gcv_cache.cache_key(b'image', ['en'], 'TEXT_DETECTION', '1.0')
+    assert key != gcv_cache.cache_key(b'image', ['en'], 'DOCUMENT_TEXT_DETECTION', '1.1')
+
+
+def test_put_and_get(tmp_path):
+    cache = gcv_cache.ResponseCache(tmp_path)
+    assert cache.get('a') is None
+    cache.put('a', b'response')
+    assert cache.get('a') == b'response'
+    # Another instance (another worker) sees the same entries
+    assert gcv_cache.ResponseCache(tmp_path).get('a') == b'response'
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = gcv_cache.ResponseCache(tmp_path, max_bytes=25)
+    cache.put('a', b'x' * 10)
+    time.sleep(0.01)
+    cache.put('b', b'x' * 10)
+    time.sleep(0.01)
+    cache.get('a')  # a is now more recently used than b
+    time.sleep(0.01)
+    cache.put('c', b'x' * 10)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+
+def test_concurrent_misses_fetch_once(tmp_path):
+    cache = gcv_cache.ResponseCache(tmp_path, poll_interval=0.01)
+    fetches = []
+    barrier = threading.Barrier(6)
+    results = []
+
+    def fetch():
+        fetches.append(1)
+        time.sleep(0.2)
+        return b'response'
+
+    def worker():
+        barrier.wait()
+        results.append(cache.get_or_fetch('page', fetch))
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(fetches) == 1
+    assert sorted(results) == [(b'response', False)] + [(b'response', True)] * 5
+
+
+def test_failed_fetch_stores_nothing_and_drops_the_claim(tmp_path):
+    cache = gcv_cache.ResponseCache(tmp_path)
+
+    def fetch():
+        raise RuntimeError('quota')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch('page', fetch)
+    assert cache.get('page') is None
+    assert not cache._is_claimed('page')
+    assert cache.get_or_fetch('page', lambda: b'response') == (b'response', False)
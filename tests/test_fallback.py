@@ -0,0 +1,105 @@
+import time
+
+import pytest
+from google.auth.exceptions import DefaultCredentialsError
+from PIL import Image
+
+import gcv_breaker
+import gcv_journal
+import gcv_stats
+import gvision
+
+
+@pytest.fixture
+def page_image(tmp_path):
+    path = tmp_path / '000001_ocr.png'
+    Image.new('L', (850, 1100), 255).save(path, dpi=(100, 100))
+    return path
+
+
+@pytest.fixture
+def fallback_options(plugin_options, tmp_path, monkeypatch):
+    # check_options would ask for a Tesseract installation; Tesseract itself is replaced below
+    run_dir = tmp_path / 'run'
+    run_dir.mkdir()
+    options = plugin_options(gcv_fallback='tesseract', gcv_run_dir=str(run_dir), gcv_breaker_failures=2,
+                             gcv_breaker_cooloff=0.0)
+    tesseract_pages = []
+
+    def fake_tesseract(input_file, output_hocr, output_text, options):
+        tesseract_pages.append(input_file.name)
+        output_hocr.write_text('tesseract')
+        output_text.write_text('')
+
+    monkeypatch.setattr(gvision.TesseractOcrEngine, 'generate_hocr', staticmethod(fake_tesseract))
+    options.tesseract_pages = tesseract_pages
+    return options
+
+
+def breaker(options):
+    return gcv_breaker.CircuitBreaker(options.gcv_run_dir, failure_threshold=options.gcv_breaker_failures,
+                                      cooloff=options.gcv_breaker_cooloff)
+
+
+def test_client_setup_failure_falls_back_to_tesseract(fallback_options, page_image, tmp_path, monkeypatch):
+    def no_credentials(*args, **kwargs):
+        raise DefaultCredentialsError("no credentials")
+
+    monkeypatch.setattr(gvision, '_get_client', no_credentials)
+    engine = gvision.GVisionOcrEngine(fallback_options)
+    engine.generate_hocr(page_image, tmp_path / 'page.hocr', tmp_path / 'page.txt', fallback_options)
+
+    assert fallback_options.tesseract_pages == [page_image.name]
+    assert (tmp_path / 'page.hocr').read_text() == 'tesseract'
+    assert gcv_stats.totals(fallback_options.gcv_run_dir)['tesseract_pages'] == 1
+    # The failed client setup counts against GCV
+    assert breaker(fallback_options)._load()['failures'] == 1
+
+
+def test_api_call_error_falls_back_to_tesseract(fallback_options, page_image, tmp_path, monkeypatch):
+    def unavailable(self, content, language_hints, input_file):
+        raise gvision._api_exceptions().PermissionDenied("Vision API disabled")
+
+    monkeypatch.setattr(gvision.GVisionOcrEngine, '_send_request', unavailable)
+    engine = gvision.GVisionOcrEngine(fallback_options)
+    engine.generate_hocr(page_image, tmp_path / 'page.hocr', tmp_path / 'page.txt', fallback_options)
+
+    assert fallback_options.tesseract_pages == [page_image.name]
+
+
+def test_probe_served_from_journal_releases_the_probe(fallback_options, page_image, tmp_path, monkeypatch):
+    fallback_options.gcv_journal = str(tmp_path / 'journal')
+    fallback_options.gcv_journal_document = 'document'
+    engine = gvision.GVisionOcrEngine(fallback_options)
+    journal, page, key = engine._journal_entry(page_image)
+    journal.put(page, key, gvision._vision().AnnotateImageResponse.serialize(gvision._vision().AnnotateImageResponse()),
+                1.0, 1.0)
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("the page should not be sent to GCV")
+
+    monkeypatch.setattr(gvision.GVisionOcrEngine, '_send_request', unexpected)
+    circuit = breaker(fallback_options)
+    circuit.on_failure()
+    circuit.on_failure()
+    assert circuit.state() == gcv_breaker.OPEN
+    time.sleep(0.01)  # cool-off of 0 seconds has passed
+
+    engine.generate_hocr(page_image, tmp_path / 'page.hocr', tmp_path / 'page.txt', fallback_options)
+
+    assert fallback_options.tesseract_pages == []
+    assert circuit.state() == gcv_breaker.HALF_OPEN
+    # The next page gets to probe GCV instead of waiting for the probe timeout
+    assert circuit.allow()
+
+
+def test_release_leaves_other_probes_alone(tmp_path):
+    circuit = gcv_breaker.CircuitBreaker(tmp_path, failure_threshold=1, cooloff=0.0)
+    circuit.on_failure()
+    time.sleep(0.01)
+    assert circuit.allow()
+    state = circuit._load()
+    state['probe_owner'] = 'another worker'
+    circuit._save(state)
+    circuit.release()
+    assert not circuit.allow()
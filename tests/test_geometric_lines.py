@@ -0,0 +1,53 @@
+import gcv2hocr2
+
+
+def _word(text, x, top, bottom):
+    return [(x, top), (x + 100, top), (x + 100, bottom), (x, bottom)], text, False
+
+
+def _lines(words, tolerance=2):
+    lines, line = [], []
+    for _, text, ends_line in gcv2hocr2._geometric_lines(words, tolerance):
+        line.append(text)
+        if ends_line:
+            lines.append(line)
+            line = []
+    return lines
+
+
+def test_descenders_stay_on_their_line():
+    # 'gap' and 'yes' reach 12 px below the other words' bottoms
+    words = [_word('the', 0, 100, 140), _word('gap', 120, 108, 152), _word('is', 240, 100, 140),
+             _word('yes', 360, 108, 152)]
+    assert _lines(words) == [['the', 'gap', 'is', 'yes']]
+
+
+def test_rows_are_split_in_reading_order():
+    words = [_word('one', 0, 100, 140), _word('three', 0, 160, 200), _word('two', 120, 101, 141),
+             _word('four', 120, 161, 201)]
+    assert _lines(words) == [['one', 'two'], ['three', 'four']]
+
+
+def test_tilted_line_with_descenders_stays_whole():
+    # A 1 px tilt per word, every other word with a 10 px descender; at the
+    # default 2 px tolerance neighbouring bottom edges are up to 12 px apart
+    words = [_word(f'w{n}', 120 * n, 100 + n, 140 + n + (10 if n % 2 else 0)) for n in range(10)]
+    assert _lines(words) == [[f'w{n}' for n in range(10)]]
+
+
+def test_tolerance_does_not_chain():
+    # Each word 10 px below the last, within a 12 px tolerance of its
+    # neighbour, but not all on one line
+    words = [_word(f'w{n}', 120 * n, 92 + 10 * n, 100 + 10 * n) for n in range(6)]
+    lines = _lines(words, tolerance=12)
+    assert len(lines) > 1
+    for line in lines:
+        bottoms = [100 + 10 * int(text[1:]) for text in line]
+        assert max(bottoms) - min(bottoms) <= 2 * 12
+
+
+def test_tolerance_is_never_below_baseline_tolerance():
+    # Flat boxes (no height) still join within the pixel tolerance
+    words = [_word('a', 0, 100, 100), _word('b', 120, 103, 103)]
+    assert _lines(words, tolerance=4) == [['a', 'b']]
+    assert _lines(words, tolerance=2) == [['a'], ['b']]
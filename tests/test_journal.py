@@ -0,0 +1,66 @@
+import os
+
+import gcv_journal
+
+PAYLOAD = b'\x0a\x04text' * 100
+
+
+def _journal(tmp_path, document='d' * 64):
+    return gcv_journal.PageJournal(tmp_path / 'journal', document)
+
+
+def test_put_and_get(tmp_path):
+    journal = _journal(tmp_path)
+    assert journal.get(1, 'key') is None
+    journal.put(1, 'key', PAYLOAD, 0.5, 0.25)
+    journal.put(3, 'other', b'', 1.0, 1.0)
+    assert journal.get(1, 'key') == (PAYLOAD, 0.5, 0.25)
+    assert journal.get(3, 'other') == (b'', 1.0, 1.0)
+    assert journal.pages() == 2
+    # A rerun opens the same journal
+    assert _journal(tmp_path).get(1, 'key') == (PAYLOAD, 0.5, 0.25)
+
+
+def test_entry_for_another_request_is_not_used(tmp_path):
+    journal = _journal(tmp_path)
+    journal.put(1, 'key', PAYLOAD, 1.0, 1.0)
+    assert journal.get(1, 'key for other settings') is None
+    assert journal.get(2, 'key') is None
+
+
+def test_damaged_entries_are_ignored(tmp_path):
+    journal = _journal(tmp_path)
+    for page in (1, 2, 3):
+        journal.put(page, 'key', PAYLOAD, 1.0, 1.0)
+    path = journal._path(1)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 10)
+    path = journal._path(2)
+    data = open(path, 'rb').read()
+    with open(path, 'wb') as f:
+        f.write(data[:-1] + b'X')
+    with open(journal._path(3), 'wb') as f:
+        f.write(b'not json\n' + PAYLOAD)
+    assert [journal.get(page, 'key') for page in (1, 2, 3)] == [None, None, None]
+
+
+def test_documents_are_kept_apart(tmp_path):
+    source = tmp_path / 'in.pdf'
+    source.write_bytes(b'%PDF-1.7 first')
+    first = gcv_journal.document_key(source)
+    assert gcv_journal.document_key(source) == first
+    source.write_bytes(b'%PDF-1.7 second version')
+    second = gcv_journal.document_key(source)
+    assert second != first
+    _journal(tmp_path, first).put(1, 'key', PAYLOAD, 1.0, 1.0)
+    assert _journal(tmp_path, second).get(1, 'key') is None
+    assert _journal(tmp_path, second).pages() == 0
+
+
+def test_describe_names_the_input(tmp_path):
+    journal = _journal(tmp_path)
+    journal.describe(tmp_path / 'in.pdf')
+    journal.describe(tmp_path / 'elsewhere.pdf')
+    with open(os.path.join(journal.directory, 'document.json'), encoding='utf-8') as f:
+        assert str(tmp_path / 'in.pdf') in f.read()
+    assert journal.pages() == 0
@@ -0,0 +1,56 @@
+import io
+import re
+
+import gcv2hocr2
+from synthetic import make_response
+
+
+def _page_boxes(hocr):
+    return re.findall(r"class='ocr_page'[^>]*bbox 0 0 (\d+) (\d+)", hocr)
+
+
+def _two_page_file(language='de'):
+    # A file annotation result holds one response per PDF page, nested in a list per file
+    first = make_response(words=12, width=1700, height=2200, seed=5)
+    second = make_response(words=4, width=2200, height=1700, seed=6)
+    first['fullTextAnnotation']['language'] = language
+    return {'responses': [first, second]}
+
+
+def test_every_response_and_page_is_converted():
+    resp = {'responses': [make_response(words=20, width=1000, height=2000), {}, _two_page_file()]}
+    document = gcv2hocr2.fromResponse(resp, 'doc')
+    hocr = document.render()
+    assert document.page_count == 4
+    assert "<meta name='ocr-number-of-pages' content='4' />" in hocr
+    assert _page_boxes(hocr) == [('1000', '2000'), ('0', '0'), ('1700', '2200'), ('2200', '1700')]
+    assert hocr.count("class='ocrx_word'") == 20 + 12 + 4
+
+
+def test_pages_of_one_annotation_are_all_kept():
+    response = make_response(words=6, width=800, height=600, seed=7)
+    second = make_response(words=3, width=600, height=800, seed=8)['fullTextAnnotation']['pages'][0]
+    response['fullTextAnnotation']['pages'].append(second)
+    document = gcv2hocr2.fromResponse({'responses': [response]}, 'doc')
+    assert document.page_count == 2
+    assert _page_boxes(document.render()) == [('800', '600'), ('600', '800')]
+
+
+def test_language_comes_from_the_first_response():
+    document = gcv2hocr2.fromResponse({'responses': [_two_page_file('fr')]}, 'doc')
+    assert document.lang == 'fr'
+    assert 'xml:lang="fr"' in document.render()
+
+
+def test_pages_are_built_again_on_each_pass():
+    document = gcv2hocr2.fromResponse(_two_page_file(), 'doc')
+    assert document.render() == document.render()
+    streamed = io.StringIO()
+    document.write(streamed)
+    assert streamed.getvalue() == document.render()
+
+
+def test_missing_responses_give_one_empty_page():
+    document = gcv2hocr2.fromResponse({'responses': []}, 'doc')
+    assert document.page_count == 1
+    assert len(_page_boxes(document.render())) == 1
@@ -0,0 +1,61 @@
+# The NumPy geometry engine must give the same page tree and hOCR as the
+# Python engine, box by box, including on the irregular pages real
+# responses contain.
+
+import pytest
+
+import gcv2hocr2
+from synthetic import make_response
+
+pytest.importorskip('numpy')
+
+
+def _nodes(element):
+    """Yields (class, id, box, baseline_bottom) for every element of a page tree, depth first."""
+    yield (element.ocr_class, element.htmlid, (element.x0, element.y0, element.x1, element.y1),
+           getattr(element, 'bottom_px', None))
+    if isinstance(element.content, list):
+        for child in element.content:
+            yield from _nodes(child)
+
+
+def _irregular():
+    response = make_response(words=200, seed=3)
+    paragraphs = response['fullTextAnnotation']['pages'][0]['blocks'][0]['paragraphs']
+    paragraphs[0]['words'][0]['boundingBox']['vertices'] = paragraphs[0]['words'][0]['boundingBox']['vertices'][:3]
+    paragraphs[0]['words'][1]['boundingBox']['vertices'].append({'x': 5000, 'y': 5})
+    paragraphs[0]['words'][2]['boundingBox']['vertices'][0].pop('x')
+    paragraphs[1]['words'] = []
+    return response
+
+
+def _zero_height():
+    response = make_response(words=2000, seed=1)
+    response['fullTextAnnotation']['pages'][0]['height'] = 0
+    return response
+
+
+def _no_blocks():
+    response = make_response(words=50, seed=4)
+    response['fullTextAnnotation']['pages'][0]['blocks'] = []
+    return response
+
+
+CASES = {
+    'regular': lambda: make_response(words=2000, seed=1),
+    'missing breaks': lambda: make_response(words=2000, seed=2, missing_breaks=True),
+    'irregular vertices and empty paragraph': _irregular,
+    'zero page height': _zero_height,
+    'no blocks': _no_blocks,
+}
+
+
+@pytest.mark.parametrize('dpi,scale', [(300, 1.0), (200, 0.5), (None, 1.0)])
+@pytest.mark.parametrize('case', sorted(CASES))
+def test_numpy_engine_matches_python_engine(case, dpi, scale):
+    response = {'responses': [CASES[case]()]}
+    kwargs = dict(image_dpi_x=dpi, image_dpi_y=dpi, scale_x=scale, scale_y=scale)
+    reference = gcv2hocr2.fromResponse(response, 'page', **kwargs)
+    candidate = gcv2hocr2.fromResponse(response, 'page', engine='numpy', **kwargs)
+    assert [list(_nodes(page)) for page in candidate] == [list(_nodes(page)) for page in reference]
+    assert candidate.render() == reference.render()
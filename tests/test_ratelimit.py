@@ -0,0 +1,52 @@
+import json
+import time
+
+import pytest
+
+import gcv_ratelimit
+
+
+def _rate(limiter):
+    with open(limiter._state_path, encoding='utf-8') as f:
+        return json.load(f)['rate']
+
+
+def test_burst_then_paced(tmp_path):
+    limiter = gcv_ratelimit.AdaptiveRateLimiter(tmp_path, max_rate=20)
+    started = time.monotonic()
+    for _ in range(20):
+        assert limiter.acquire() == 0.0  # a full bucket holds one second's worth
+    limiter.acquire(5)
+    assert time.monotonic() - started == pytest.approx(5 / 20, abs=0.1)
+
+
+def test_quota_error_halves_the_rate_and_drains_the_bucket(tmp_path):
+    limiter = gcv_ratelimit.AdaptiveRateLimiter(tmp_path, max_rate=10, min_rate=1)
+    assert limiter.on_quota_error() == pytest.approx(5)
+    assert limiter.acquire() > 0
+    for _ in range(5):
+        limiter.on_quota_error()
+    assert _rate(limiter) == pytest.approx(1)  # never below min_rate
+
+
+def test_success_raises_the_rate_up_to_max(tmp_path):
+    limiter = gcv_ratelimit.AdaptiveRateLimiter(tmp_path, max_rate=2, increase=0.5)
+    limiter.on_quota_error()
+    limiter.on_success(0.1)
+    assert _rate(limiter) == pytest.approx(1.5)
+    for _ in range(5):
+        limiter.on_success(0.1)
+    assert _rate(limiter) == pytest.approx(2)
+
+
+def test_slow_calls_lower_the_rate(tmp_path):
+    limiter = gcv_ratelimit.AdaptiveRateLimiter(tmp_path, max_rate=10, latency_target=1.0)
+    limiter.on_success(2.0)
+    assert _rate(limiter) == pytest.approx(9)
+
+
+def test_limiters_share_their_state(tmp_path):
+    first = gcv_ratelimit.AdaptiveRateLimiter(tmp_path, max_rate=10)
+    second = gcv_ratelimit.AdaptiveRateLimiter(tmp_path, max_rate=10)
+    first.on_quota_error()
+    assert _rate(second) == pytest.approx(5)
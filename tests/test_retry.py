@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+import gcv_retry
+
+
+class Transient(Exception):
+    pass
+
+
+def _policy(events=None, **kwargs):
+    kwargs.setdefault('backoff_initial', 0)
+    return gcv_retry.CallPolicy(retryable=(Transient,), on_event=None if events is None else events.append,
+                                **kwargs)
+
+
+def test_transient_errors_are_retried():
+    events = []
+    attempts = []
+
+    def call(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise Transient('unavailable')
+        return 'ok'
+
+    assert _policy(events, deadline=5.0).run(call) == 'ok'
+    assert attempts == [5.0, 5.0, 5.0]
+    assert events == ['retries', 'retries']
+
+
+def test_last_error_is_raised_when_retries_run_out():
+    def call(timeout):
+        raise Transient('unavailable')
+
+    with pytest.raises(Transient):
+        _policy(max_retries=2).run(call)
+
+
+def test_other_errors_are_not_retried():
+    attempts = []
+
+    def call(timeout):
+        attempts.append(timeout)
+        raise ValueError('bad request')
+
+    with pytest.raises(ValueError):
+        _policy().run(call)
+    assert len(attempts) == 1
+
+
+def test_backoff_is_capped():
+    policy = gcv_retry.CallPolicy(backoff_initial=1.0, backoff_max=4.0)
+    assert all(0 <= policy.backoff(10) <= 4.0 for _ in range(100))
+
+
+def test_slow_call_is_hedged_with_its_own_deadline():
+    events = []
+    policy = _policy(events, deadline=10.0, hedge_percentile=50, hedge_min_samples=5)
+    for _ in range(5):
+        policy._record_latency(0.05)
+    timeouts = []
+    first = threading.Event()
+
+    def call(timeout):
+        timeouts.append(timeout)
+        if not first.is_set():
+            first.set()
+            time.sleep(1.0)  # the primary is slow
+            return 'primary'
+        return 'hedge'
+
+    assert policy.run(call) == 'hedge'
+    assert events == ['hedges', 'hedge_wins']
+    assert timeouts == [10.0, 10.0]
+
+
+def test_untrained_policy_does_not_hedge():
+    events = []
+    policy = _policy(events, hedge_percentile=50, hedge_min_samples=5)
+    assert policy.hedge_delay() is None
+    assert policy.run(lambda timeout: 'ok') == 'ok'
+    assert events == []
+
+
+def test_hedge_pool_is_created_once():
+    policy = _policy()
+    barrier = threading.Barrier(8)
+    pools = []
+
+    def get():
+        barrier.wait()
+        pools.append(policy._pool())
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(pool) for pool in pools}) == 1
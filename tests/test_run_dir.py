@@ -0,0 +1,70 @@
+import json
+import os
+import shutil
+import types
+
+import pytest
+
+import gcv_stats
+import gcv_trace
+import gvision
+
+
+def test_run_dir_is_in_the_work_folder(tmp_path, plugin_options):
+    options = plugin_options()
+    gvision.validate(pdfinfo=types.SimpleNamespace(filename=tmp_path / 'origin.pdf'), options=options)
+    assert os.path.dirname(options.gcv_run_dir) == os.fspath(tmp_path)
+    assert os.path.isdir(options.gcv_run_dir)
+
+
+def test_statistics_are_exported_at_the_end_of_the_run(tmp_path, plugin_options):
+    prometheus = tmp_path / 'gcv.prom'
+    options = plugin_options(gcv_prometheus=os.fspath(prometheus))
+    work_folder = tmp_path / 'work'
+    work_folder.mkdir()
+    gvision.validate(pdfinfo=types.SimpleNamespace(filename=work_folder / 'origin.pdf'), options=options)
+    gcv_stats.increment(options.gcv_run_dir, 'blank_pages_skipped', 3)
+    # Returns None, so ocrmypdf's optimizer decides
+    assert gvision.is_optimization_enabled(context=types.SimpleNamespace(options=options)) is None
+    assert 'blank_pages_skipped' in prometheus.read_text()
+
+
+def test_trace_needs_a_pdf_output(tmp_path, plugin_options):
+    options = plugin_options(gcv_trace=os.fspath(tmp_path / 'trace.jsonl'), output_type='none')
+    with pytest.raises(ValueError, match='--gcv-trace'):
+        gvision.check_options(options)
+
+
+def _run_with_trace(tmp_path, plugin_options):
+    trace = tmp_path / 'trace.jsonl'
+    options = plugin_options(gcv_trace=os.fspath(trace))
+    work_folder = tmp_path / 'work'
+    work_folder.mkdir()
+    gvision.validate(pdfinfo=types.SimpleNamespace(filename=work_folder / 'origin.pdf'), options=options)
+    with open(os.path.join(options.gcv_run_dir, gcv_trace.TRACE_FILENAME), 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'operation': 'ocr', 'page': '000001_ocr.png'}) + '\n')
+    return options, trace
+
+
+def test_run_is_finished_once(tmp_path, plugin_options):
+    options, trace = _run_with_trace(tmp_path, plugin_options)
+    context = types.SimpleNamespace(options=options)
+    gvision.is_optimization_enabled(context=context)
+    gvision.is_optimization_enabled(context=context)
+    gvision._finish_run(options)
+    assert len(trace.read_text().splitlines()) == 1
+    assert options.gcv_run_dir not in gvision._run_finishers
+
+
+def test_exit_handler_finishes_a_run_the_hook_missed(tmp_path, plugin_options):
+    options, trace = _run_with_trace(tmp_path, plugin_options)
+    gvision._run_finishers[options.gcv_run_dir]()
+    assert len(trace.read_text().splitlines()) == 1
+    assert options.gcv_run_dir not in gvision._run_finishers
+
+
+def test_nothing_is_exported_once_the_work_folder_is_gone(tmp_path, plugin_options):
+    options, trace = _run_with_trace(tmp_path, plugin_options)
+    shutil.rmtree(tmp_path / 'work')
+    gvision._run_finishers[options.gcv_run_dir]()
+    assert not trace.exists()
@@ -0,0 +1,69 @@
+import io
+import json
+
+import pytest
+
+import gcv2hocr2
+from synthetic import make_response
+
+pytest.importorskip('ijson')
+
+
+@pytest.fixture(autouse=True)
+def always_stream(monkeypatch):
+    monkeypatch.setattr(gcv2hocr2, 'STREAM_THRESHOLD', 0)
+
+
+def _language_last(language):
+    response = make_response(words=30, seed=9)
+    # Saved responses may hold the language after the pages
+    response['fullTextAnnotation']['language'] = language
+    return response
+
+
+CASES = {
+    'one image response': make_response(words=40),
+    'batch': {'responses': [make_response(words=40, seed=1), {}, _language_last('it')]},
+    'file annotation': {'responses': [{'responses': [_language_last('nl'), make_response(words=8, seed=2)]},
+                                      {'responses': [{}]}]},
+    'two pages in one annotation': {'responses': [{'fullTextAnnotation': {
+        'pages': [make_response(words=5, seed=seed)['fullTextAnnotation']['pages'][0] for seed in (3, 4)],
+        'text': 'x'}}]},
+    'no responses': {'responses': []},
+    'error response': {'responses': [{'error': {'code': 3, 'message': 'Bad image data.'}}]},
+}
+
+
+@pytest.mark.parametrize('case', CASES)
+@pytest.mark.parametrize('line_mode', gcv2hocr2.LINE_MODES)
+def test_stream_matches_response(case, line_mode):
+    resp = CASES[case]
+    expected = gcv2hocr2.fromResponse(gcv2hocr2._wrap_response(resp), 'doc', image_dpi_x=300, image_dpi_y=300,
+                                      line_mode=line_mode)
+    document = gcv2hocr2.fromStream(io.BytesIO(json.dumps(resp).encode('utf-8')), 'doc', image_dpi_x=300,
+                                    image_dpi_y=300, line_mode=line_mode)
+    assert document.page_count == expected.page_count
+    assert document.render() == expected.render()
+
+
+class _Pipe(io.BytesIO):
+    def seekable(self):
+        return False
+
+
+def test_unseekable_stream_is_spooled():
+    resp = CASES['batch']
+    document = gcv2hocr2.fromStream(_Pipe(json.dumps(resp).encode('utf-8')), 'doc')
+    assert document.render() == gcv2hocr2.fromResponse(resp, 'doc').render()
+
+
+def test_stream_is_read_from_its_position():
+    data = json.dumps(CASES['batch']).encode('utf-8')
+    stream = io.BytesIO(b'header' + data)
+    stream.seek(len(b'header'))
+    assert gcv2hocr2.fromStream(stream, 'doc').page_count == 3
+
+
+def test_invalid_json_is_reported_before_anything_is_written():
+    with pytest.raises(ValueError, match='Invalid JSON'):
+        gcv2hocr2.fromStream(io.BytesIO(b'{"responses": [{"fullTextAnnotation": '), 'doc')
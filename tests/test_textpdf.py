@@ -0,0 +1,77 @@
+import pathlib
+
+import pytest
+
+import gcv2hocr2
+import gcv_textpdf
+
+pdfminer = pytest.importorskip('pdfminer.high_level')
+pytest.importorskip('reportlab')
+
+
+def _response(words, width=2550, height=3300):
+    """An AnnotateImageResponse dict of one line with the given words, 300 px apart."""
+    entries = []
+    for index, text in enumerate(words):
+        x = 200 + 300 * index
+        vertices = [{'x': x, 'y': 400}, {'x': x + 240, 'y': 400},
+                    {'x': x + 240, 'y': 460}, {'x': x, 'y': 460}]
+        symbols = [{'text': char} for char in text]
+        last = index == len(words) - 1
+        symbols[-1]['property'] = {'detectedBreak': {'type': 'LINE_BREAK' if last else 'SPACE'}}
+        entries.append({'boundingBox': {'vertices': vertices}, 'symbols': symbols})
+    block = {'boundingBox': {'vertices': [{'x': 200, 'y': 400}, {'x': 200 + 300 * len(words), 'y': 400},
+                                          {'x': 200 + 300 * len(words), 'y': 460}, {'x': 200, 'y': 460}]},
+             'paragraphs': [{'boundingBox': {'vertices': []}, 'words': entries}]}
+    page = {'width': width, 'height': height, 'blocks': [block]}
+    return {'fullTextAnnotation': {'pages': [page], 'text': ' '.join(words)}}
+
+
+def _write(tmp_path, words):
+    document = gcv2hocr2.fromResponse({'responses': [_response(words)]}, 'page',
+                                      image_dpi_x=300, image_dpi_y=300)
+    output = tmp_path / 'text.pdf'
+    gcv_textpdf.write_text_pdf(document, output)
+    return output
+
+
+def _words(output: pathlib.Path):
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTChar
+
+    chars = []
+
+    def walk(element):
+        if isinstance(element, LTChar):
+            chars.append(element)
+        elif hasattr(element, '__iter__'):
+            for child in element:
+                walk(child)
+
+    pages = list(extract_pages(output))
+    for page in pages:
+        walk(page)
+    return pages, chars
+
+
+def test_latin_text_uses_default_font(tmp_path):
+    pages, chars = _words(_write(tmp_path, ['Grüße', 'café']))
+    assert ''.join(char.get_text() for char in chars) == 'Grüße café'
+    assert all('Helvetica' in char.fontname for char in chars)
+
+
+def test_non_latin_text_is_kept(tmp_path):
+    pages, chars = _words(_write(tmp_path, ['漢字', 'Ελληνικά', 'Grüße']))
+    assert len(pages) == 1
+    assert pages[0].width == pytest.approx(612, abs=0.5)
+    assert pages[0].height == pytest.approx(792, abs=0.5)
+    assert ''.join(char.get_text() for char in chars) == '漢字 Ελληνικά Grüße'
+    # Only the words Helvetica cannot encode are set in the glyphless font
+    fonts = {char.get_text(): char.fontname for char in chars}
+    assert 'Helvetica' not in fonts['漢'] and 'Helvetica' not in fonts['λ']
+    assert 'Helvetica' in fonts['G']
+    # Each word fills its box: 200 + 300 n to 440 + 300 n px at 300 dpi
+    for n, word in enumerate(['漢字', 'Ελληνικά', 'Grüße']):
+        word_chars = [char for char in chars if char.get_text() in word]
+        assert min(char.x0 for char in word_chars) == pytest.approx((200 + 300 * n) * 72 / 300, abs=1)
+        assert max(char.x1 for char in word_chars) == pytest.approx((440 + 300 * n) * 72 / 300, abs=1)
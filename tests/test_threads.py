@@ -0,0 +1,28 @@
+# gcv2hocr2 conversions run from many threads at once (the plugin's page
+# threads, the batch CLI's pool) must not share state: each concurrent
+# result has to match the same conversion run on its own.
+
+import concurrent.futures
+
+import gcv2hocr2
+from synthetic import make_response
+
+# Each job has its own page, resolution and upload scale
+JOBS = [(f'job{i}', i, dpi, scale) for i, (dpi, scale) in enumerate(
+    [(72, 1.0), (150, 1.0), (200, 0.5), (300, 1.0), (300, 0.25), (400, 0.75), (600, 0.5), (96, 2.0)])]
+
+
+def _convert(job):
+    name, seed, dpi, scale = job
+    response = {'responses': [make_response(words=200, seed=seed)]}
+    document = gcv2hocr2.fromResponse(response, name, image_dpi_x=dpi, image_dpi_y=dpi,
+                                      scale_x=scale, scale_y=scale)
+    return document.render()
+
+
+def test_concurrent_conversions_match_serial_ones():
+    expected = {job[0]: _convert(job) for job in JOBS}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as pool:
+        futures = {pool.submit(_convert, job): job[0] for job in JOBS * 6}
+        for future in concurrent.futures.as_completed(futures):
+            assert future.result() == expected[futures[future]], futures[future]
@@ -0,0 +1,87 @@
+import io
+
+import pytest
+from PIL import Image, ImageDraw
+
+import gcv2hocr2
+import gvision
+
+
+def _page(size=(2550, 3300), noise=False):
+    if noise:
+        image = Image.effect_noise(size, 64).convert('RGB')
+    else:
+        image = Image.new('RGB', size, 'white')
+    ImageDraw.Draw(image).text((100, 100), 'page', fill='black')
+    buffer = io.BytesIO()
+    image.save(buffer, format='png')
+    return buffer.getvalue()
+
+
+def _prepare(plugin_options, content, dpi=300, **values):
+    engine = gvision.GVisionOcrEngine(plugin_options(**values))
+    return engine._prepare_upload(content, dpi, dpi, gvision.pathlib.Path('000001_ocr.png'))
+
+
+def test_defaults_send_the_original(plugin_options):
+    content = _page()
+    assert _prepare(plugin_options, content) == (content, 1.0, 1.0)
+
+
+def test_downsampling_reports_its_scale(plugin_options):
+    upload, scale_x, scale_y = _prepare(plugin_options, _page(), gcv_upload_max_dpi=150)
+    with Image.open(io.BytesIO(upload)) as image:
+        assert image.size == (1275, 1650)
+    assert (scale_x, scale_y) == (0.5, 0.5)
+
+
+def test_pages_under_the_limit_keep_their_size(plugin_options):
+    upload, scale_x, scale_y = _prepare(plugin_options, _page(), dpi=150, gcv_upload_max_dpi=200,
+                                        gcv_upload_color='gray')
+    with Image.open(io.BytesIO(upload)) as image:
+        assert image.size == (2550, 3300) and image.mode == 'L'
+    assert (scale_x, scale_y) == (1.0, 1.0)
+
+
+@pytest.mark.parametrize('upload_format,color,mode', [('jpeg', 'keep', 'RGB'), ('jpeg', 'gray', 'L'),
+                                                      ('png', 'bilevel', '1'), ('webp', 'gray', 'RGB')])
+def test_reencoding(plugin_options, upload_format, color, mode):
+    upload, _, _ = _prepare(plugin_options, _page((850, 1100), noise=True), gcv_upload_format=upload_format,
+                            gcv_upload_color=color)
+    with Image.open(io.BytesIO(upload)) as image:
+        assert image.format == upload_format.upper() and image.mode == mode
+
+
+def test_reencoding_that_does_not_shrink_sends_the_original(plugin_options):
+    content = _page()
+    assert _prepare(plugin_options, content, gcv_upload_format='jpeg') == (content, 1.0, 1.0)
+
+
+def test_unreadable_image_is_sent_as_it_is(plugin_options):
+    assert _prepare(plugin_options, b'not an image', gcv_upload_max_dpi=150) == (b'not an image', 1.0, 1.0)
+
+
+def test_downsampled_coordinates_map_back_to_the_page():
+    # A word at (200, 400)-(440, 460) px of a 300 dpi page, uploaded at half size
+    vertices = [{'x': 100, 'y': 200}, {'x': 220, 'y': 200}, {'x': 220, 'y': 230}, {'x': 100, 'y': 230}]
+    word = {'boundingBox': {'vertices': vertices},
+            'symbols': [{'text': 'w', 'property': {'detectedBreak': {'type': 'LINE_BREAK'}}}]}
+    block = {'boundingBox': {'vertices': vertices}, 'paragraphs': [{'boundingBox': {'vertices': vertices},
+                                                                    'words': [word]}]}
+    response = {'responses': [{'fullTextAnnotation': {'pages': [{'width': 1275, 'height': 1650, 'blocks': [block]}],
+                                                      'text': 'w'}}]}
+    page = next(iter(gcv2hocr2.fromResponse(response, 'page', image_dpi_x=300, image_dpi_y=300,
+                                            scale_x=0.5, scale_y=0.5)))
+    assert (page.context.page_width_pt, page.context.page_height_pt) == pytest.approx((612, 792))
+    words = []
+
+    def walk(element):
+        if element.ocr_class == 'ocrx_word':
+            words.append(element)
+        elif isinstance(element.content, list):
+            for child in element.content:
+                walk(child)
+
+    walk(page)
+    assert (words[0].x0, words[0].x1) == pytest.approx((48, 105.6))
+    assert (words[0].y0, words[0].y1) == pytest.approx((792 - 110.4, 792 - 96))